@@ -209,6 +209,63 @@ class NativeUIElement(
         """Return the localized name of the application."""
         return self.getApplication().AXTitle
 
+    def dump(
+        self,
+        stream,
+        depth=None,
+        attributes=None,
+        workers=4,
+        budget=30.0,
+        visible_only=False,
+    ):
+        """Write the tree below the element to stream, one JSON object per
+        element. Dump the system-wide element to dump every application.
+
+        Args:
+            depth: the number of levels to write, or None for all
+            attributes: the attributes to write, or None for all of them
+            workers: the number of applications dumped at the same time
+            budget: seconds after which the dump of an application stops
+            visible_only: leave out the elements which are not on screen
+
+        Returns: the status records of the applications; read the dump
+            back with atomacos.load_dump
+        """
+        from atomacos import _dump
+
+        return _dump.dump(
+            self, stream, depth, attributes, workers, budget, visible_only
+        )
+
+    def _generateVisibleChildren(self, recursive=False):
+        from atomacos import _visible
+
+        return _visible.visible_children(self, recursive)
+
+    def snapshot(self, attributes=None):
+        """Read the tree below the element into a local model, which
+        refresh() keeps up to date from the notifications of the application.
+
+        Args:
+            attributes: the attributes to keep, or None for all of them
+
+        Returns: a Snapshot, with the findFirst*/findAll* search methods
+        """
+        from atomacos import _snapshot
+
+        return _snapshot.Snapshot(self, attributes)
+
+    def locator(self, **criteria):
+        """Return a locator of the first element below this one matching
+        criteria, like findFirstR. Its get() method returns the element,
+        finding it again by its recorded path once it went stale.
+
+        Returns: a Locator
+        """
+        from atomacos import _locator
+
+        return _locator.Locator(self, **criteria)
+
     def __getattr__(self, name):
         """Handle attribute requests in several ways:
 
@@ -222,7 +279,7 @@ class NativeUIElement(
 
             def performSpecifiedAction():
                 # activate the app before performing the specified action
-                self._activate()
+                self._ensure_active()
                 return action()
 
             return performSpecifiedAction
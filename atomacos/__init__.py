@@ -2,13 +2,28 @@
 # flake8: noqa: F401
 __version__ = "3.2.0"
 
-from atomacos import _a11y, errors, keyboard, mouse
+import importlib
+
+from atomacos import (
+    _a11y,
+    _activation,
+    _breaker,
+    _input_backend,
+    _retry,
+    _slowlog,
+    _trace,
+    errors,
+    keyboard,
+    mouse,
+)
 from atomacos.AXClasses import NativeUIElement
 
 Error = errors.AXError
 ErrorAPIDisabled = errors.AXErrorAPIDisabled
 ErrorInvalidUIElement = errors.AXErrorInvalidUIElement
 ErrorCannotComplete = errors.AXErrorCannotComplete
+ErrorTimeout = errors.AXErrorTimeout
+ErrorAppNotResponding = errors.AXErrorAppNotResponding
 ErrorUnsupported = errors.AXErrorUnsupported
 ErrorNotImplemented = errors.AXErrorNotImplemented
 
@@ -20,3 +35,35 @@ getAppRefByBundleId = NativeUIElement.getAppRefByBundleId
 launchAppByBundleId = NativeUIElement.launchAppByBundleId
 getFrontmostApp = NativeUIElement.getFrontmostApp
 getAppRefByPid = NativeUIElement.getAppRefByPid
+set_input_backend = _input_backend.set_input_backend
+set_auto_activate = _activation.set_auto_activate
+trace = _trace.trace
+set_slow_search_threshold = _slowlog.set_slow_search_threshold
+set_circuit_breaker = _breaker.set_circuit_breaker
+set_retry_policy = _retry.set_retry_policy
+
+
+def _deferred(module, name):
+    """Return a function calling name from module, imported on first use"""
+
+    def call(*args, **kwargs):
+        return getattr(importlib.import_module(module), name)(*args, **kwargs)
+
+    call.__name__ = name
+    call.__doc__ = "See %s.%s" % (module, name)
+    return call
+
+
+# Less common functions, imported on first use to keep `import atomacos` fast
+load_dump = _deferred("atomacos._dump", "load_dump")
+diff = _deferred("atomacos._diff", "diff")
+save_snapshot = _deferred("atomacos._snapshot_file", "save_snapshot")
+open_snapshot = _deferred("atomacos._snapshot_file", "open_snapshot")
+record_cassette = _deferred("atomacos.backends.cassette", "record_cassette")
+replay_cassette = _deferred("atomacos.backends.cassette", "replay_cassette")
+crawl_all = _deferred("atomacos._crawl", "crawl_all")
+find_in_apps = _deferred("atomacos._find", "find_in_apps")
+app_workers = _deferred("atomacos._executor", "app_workers")
+deadline = _deferred("atomacos._executor", "deadline")
+spatial_index = _deferred("atomacos._spatial", "spatial_index")
+text_index = _deferred("atomacos._text_index", "text_index")
@@ -1,14 +1,7 @@
 import fnmatch
 import logging
 
-import AppKit
-from ApplicationServices import (
-    AXIsProcessTrusted,
-    AXUIElementCreateApplication,
-    AXUIElementCreateSystemWide,
-    CFEqual,
-)
-from atomacos import _converter
+from atomacos import _activation, _batch, _converter, _slowlog, metrics
 from atomacos._macos import (
     PAXUIElementCopyActionNames,
     PAXUIElementCopyAttributeNames,
@@ -20,6 +13,7 @@ from atomacos._macos import (
     PAXUIElementSetAttributeValue,
     PAXUIElementSetMessagingTimeout,
 )
+from atomacos.backends import get_backend
 from atomacos.errors import (
     AXError,
     AXErrorAPIDisabled,
@@ -29,12 +23,13 @@ from atomacos.errors import (
     AXErrorNoValue,
     AXErrorUnsupported,
 )
-from PyObjCTools import AppHelper
 
 logger = logging.getLogger(__name__)
 
 
 class AXUIElement(object):
+    _pid = None
+
     def __init__(self, ref=None):
         self.ref = ref
         self.converter = _converter.Converter(self.__class__)
@@ -60,7 +55,7 @@ class AXUIElement(object):
         if self.ref is None or other.ref is None:
             return False
 
-        return CFEqual(self.ref, other.ref)
+        return get_backend().refs_equal(self.ref, other.ref)
 
     def __ne__(self, other):
         return not self.__eq__(other)
@@ -131,7 +126,7 @@ class AXUIElement(object):
         Creates an instance with the AXUIElementRef for the application with
         the specified process ID.
         """
-        app_ref = AXUIElementCreateApplication(pid)
+        app_ref = get_backend().create_application(pid)
 
         return cls(ref=app_ref)
 
@@ -166,7 +161,7 @@ class AXUIElement(object):
         Creates an instance with the AXUIElementRef for the system-wide
         accessibility object.
         """
-        app_ref = AXUIElementCreateSystemWide()
+        app_ref = get_backend().create_systemwide()
         return cls(ref=app_ref)
 
     @classmethod
@@ -208,14 +203,15 @@ class AXUIElement(object):
     @property
     def pid(self):
         """Gets the AXUIElement's process ID"""
-        pid = PAXUIElementGetPid(self.ref)
-        return pid
+        # The pid of a reference never changes
+        metrics.count_cache("pid", self._pid is not None)
+        if self._pid is None:
+            self._pid = PAXUIElementGetPid(self.ref)
+        return self._pid
 
     @property
     def _running_app(self):
-        ra = AppKit.NSRunningApplication
-        app = ra.runningApplicationWithProcessIdentifier_(self.pid)
-        return app
+        return get_backend().running_application_with_pid(self.pid)
 
     def get_element_at_position(self, x, y):
         if self.ref is None:
@@ -227,6 +223,16 @@ class AXUIElement(object):
 
         return self.__class__(element)
 
+    def batch(self, check_settable=True):
+        """
+        Returns a context manager collecting actions and attribute changes,
+        which all run when the block exits, after a single activation.
+
+        Args:
+            check_settable: check that the attributes are settable first
+        """
+        return _batch.Batch(self, check_settable=check_settable)
+
     def set_timeout(self, timeout):
         """
         Sets the timeout value used in the accessibility API
@@ -242,10 +248,17 @@ class AXUIElement(object):
         # == 3 - PyObjC in 10.6 does not expose these constants though so I have
         # to use the int instead of the symbolic names
         self._running_app.activateWithOptions_(3)
+        _activation.tracker.activated(self.pid)
+
+    def _ensure_active(self):
+        """Activates the application unless it is already frontmost"""
+        _activation.tracker.ensure_active(self)
 
     def _get_ax_attribute(self, item):
         """Gets the value of the the specified attribute"""
         if item in self.ax_attributes:
+            if _slowlog.active:
+                _slowlog.count_attribute()
             try:
                 attr_value = PAXUIElementCopyAttributeValue(self.ref, item)
                 return self.converter.convert_value(attr_value)
@@ -256,6 +269,13 @@ class AXUIElement(object):
 
         raise AttributeError("'%s' object has no attribute '%s'" % (type(self), item))
 
+    def _is_ax_attribute_settable(self, name):
+        """Returns whether the specified attribute can be set"""
+        try:
+            return bool(PAXUIElementIsAttributeSettable(self.ref, name))
+        except AXError:
+            return False
+
     def _set_ax_attribute(self, name, value):
         """Sets the specified attribute to the specified value"""
         settable = PAXUIElementIsAttributeSettable(self.ref, name)
@@ -272,55 +292,37 @@ class AXUIElement(object):
 
 def axenabled():
     """Return the status of accessibility on the system"""
-    return AXIsProcessTrusted()
+    return get_backend().is_process_trusted()
 
 
 def get_frontmost_pid():
     """Return the process ID of the application in the foreground"""
-    frontmost_app = AppKit.NSWorkspace.sharedWorkspace().frontmostApplication()
+    frontmost_app = get_backend().frontmost_application()
     pid = frontmost_app.processIdentifier()
     return pid
 
 
 def get_running_apps():
     """Get a list of the running applications"""
-    AppHelper.callLater(1, AppHelper.stopEventLoop)
-    AppHelper.runConsoleEventLoop()
-    # Get a list of running applications
-    ws = AppKit.NSWorkspace.sharedWorkspace()
-    apps = ws.runningApplications()
-    return apps
+    return get_backend().running_applications()
+
+
+def set_pasteboard_text(text):
+    """Replace the contents of the general pasteboard with text"""
+    get_backend().set_pasteboard_text(text)
 
 
 def launch_app_by_bundle_id(bundle_id):
-    # NSWorkspaceLaunchAllowingClassicStartup does nothing on any
-    # modern system that doesn't have the classic environment installed.
-    # Encountered a bug when passing 0 for no options on 10.6 PyObjC.
-    ws = AppKit.NSWorkspace.sharedWorkspace()
-
-    r = ws.launchAppWithBundleIdentifier_options_additionalEventParamDescriptor_launchIdentifier_(  # noqa: B950
-        bundle_id,
-        AppKit.NSWorkspaceLaunchAllowingClassicStartup,
-        AppKit.NSAppleEventDescriptor.nullDescriptor(),
-        None,
-    )
-    # On 10.6, this returns a tuple - first element bool result, second is
-    # a number. Let's use the bool result.
-    if not r[0]:
-        raise RuntimeError("Error launching specified application. %s" % str(r))
+    _activation.tracker.reset()
+    get_backend().launch_app_by_bundle_id(bundle_id)
 
 
 def launch_app_by_bundle_path(bundle_path, arguments=None):
     if arguments is None:
         arguments = []
 
-    bundleUrl = AppKit.NSURL.fileURLWithPath_(bundle_path)
-    workspace = AppKit.NSWorkspace.sharedWorkspace()
-    configuration = {AppKit.NSWorkspaceLaunchConfigurationArguments: arguments}
-
-    return workspace.launchApplicationAtURL_options_configuration_error_(
-        bundleUrl, AppKit.NSWorkspaceLaunchAllowingClassicStartup, configuration, None
-    )
+    _activation.tracker.reset()
+    return get_backend().launch_app_by_bundle_path(bundle_path, arguments)
 
 
 def terminate_app_by_bundle_id(bundle_id):
@@ -329,6 +331,7 @@ def terminate_app_by_bundle_id(bundle_id):
     if not apps:
         return False
 
+    _activation.tracker.reset()
     return apps[0].terminate()
 
 
@@ -337,6 +340,4 @@ def _running_apps_with_bundle_id(bundle_id):
     Returns an array of NSRunningApplications, or an empty array if
     no applications match the bundle identifier.
     """
-    ra = AppKit.NSRunningApplication
-    app_list = ra.runningApplicationsWithBundleIdentifier_(bundle_id)
-    return app_list
+    return get_backend().running_applications_with_bundle_id(bundle_id)
@@ -0,0 +1,83 @@
+"""Track the frontmost application, to activate applications only when needed"""
+import logging
+import threading
+
+from atomacos.backends import get_backend
+
+logger = logging.getLogger(__name__)
+
+
+class ActivationTracker(object):
+    """Follows the application activations reported by the backend.
+
+    Workspace notifications are delivered by the main run loop, which is
+    pumped without blocking before every check made from the main thread.
+    Other threads never see them, so they ask the backend instead.
+    """
+
+    def __init__(self):
+        self.auto_activate = True
+        self._frontmost_pid = None
+        self._observer = None
+        self._backend = None
+
+    def ensure_active(self, element):
+        """Activate the application of element unless it is frontmost"""
+        if not self.auto_activate:
+            return
+        if element.pid == self.frontmost_pid():
+            return
+        element._activate()
+
+    def frontmost_pid(self):
+        """Return the process ID of the frontmost application, if known"""
+        backend = get_backend()
+        if threading.current_thread() is not threading.main_thread():
+            frontmost_app = backend.frontmost_application()
+            if frontmost_app is None:
+                return None
+            return frontmost_app.processIdentifier()
+        if self._observer is None or self._backend is not backend:
+            self._start(backend)
+        else:
+            backend.pump_run_loop()
+        return self._frontmost_pid
+
+    def activated(self, pid):
+        """Record that the application with the given pid was activated"""
+        self._frontmost_pid = pid
+
+    def reset(self):
+        """Forget the frontmost application, e.g. after launching an app"""
+        self._frontmost_pid = None
+
+    def _start(self, backend):
+        if self._observer is not None:
+            # Proxies like trace() forward to the same backend, which would
+            # otherwise call back every observer registered through them
+            self._backend.remove_activation_observer(self._observer)
+        self._backend = backend
+        self._observer = backend.observe_activations(self._on_activation)
+        frontmost_app = backend.frontmost_application()
+        if frontmost_app is not None:
+            self._frontmost_pid = frontmost_app.processIdentifier()
+
+    def _on_activation(self, pid):
+        self._frontmost_pid = pid
+        logger.debug("Application %s activated", self._frontmost_pid)
+
+
+tracker = ActivationTracker()
+
+
+def set_auto_activate(enabled):
+    """Enable or disable activating the application before actions.
+
+    When disabled, actions and menu lookups never bring the application
+    forward and the caller is responsible for activating it.
+
+    Returns: the previous setting
+    """
+    previous = tracker.auto_activate
+    tracker.auto_activate = bool(enabled)
+    return previous
@@ -0,0 +1,134 @@
+"""Run several actions and attribute changes back to back"""
+import logging
+
+from atomacos._macos import (
+    PAXUIElementIsAttributeSettable,
+    PAXUIElementPerformAction,
+    PAXUIElementSetAttributeValue,
+)
+from atomacos.errors import AXError, AXErrorUnsupported
+
+logger = logging.getLogger(__name__)
+
+
+class BatchStep(object):
+    def __init__(self, element, action=None, attribute=None, value=None):
+        self.element = element
+        self.action = action
+        self.attribute = attribute
+        self.value = value
+        self.done = False
+        self.error = None
+
+    def __repr__(self):
+        if self.action is not None:
+            return "<BatchStep %s %r>" % (self.action, self.element)
+        return "<BatchStep %s=%r %r>" % (self.attribute, self.value, self.element)
+
+
+class Batch(object):
+    """Collects steps and runs them when the with block exits.
+
+    The element is activated once for the whole batch, and the error of a
+    step is kept on the step instead of interrupting the batch.
+
+    Args:
+        element: the element (usually the application) activated before
+            the first action
+        check_settable: check that every attribute is settable before
+            running any step, like a plain attribute assignment does
+    """
+
+    def __init__(self, element, check_settable=True):
+        self.element = element
+        self.check_settable = check_settable
+        self.steps = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.run()
+        return False
+
+    def press(self, element):
+        """Queue an AXPress action on element"""
+        return self.perform(element, "AXPress")
+
+    def perform(self, element, action):
+        """Queue an action on element, with or without its AX prefix"""
+        if not action.startswith("AX"):
+            action = "AX" + action
+        return self._add(BatchStep(element, action=action))
+
+    def set(self, element, attribute, value):
+        """Queue setting an attribute of element to value.
+
+        Setting the same attribute of the same element twice in a row only
+        keeps the last value.
+        """
+        if self.steps:
+            last = self.steps[-1]
+            if (
+                last.attribute == attribute
+                and last.element is element
+                and last.action is None
+            ):
+                self.steps.pop()
+        return self._add(BatchStep(element, attribute=attribute, value=value))
+
+    @property
+    def errors(self):
+        """Return the steps that failed"""
+        return [step for step in self.steps if step.error is not None]
+
+    def run(self):
+        """Run all queued steps that did not run yet.
+
+        Returns: the list of failed steps
+        """
+        pending = [step for step in self.steps if not step.done]
+        if self.check_settable:
+            self._check_settable(pending)
+        if any(step.action is not None for step in pending):
+            self.element._ensure_active()
+
+        for step in pending:
+            if step.error is None:
+                try:
+                    if step.action is not None:
+                        PAXUIElementPerformAction(step.element.ref, step.action)
+                    else:
+                        PAXUIElementSetAttributeValue(
+                            step.element.ref, step.attribute, step.value
+                        )
+                except AXError as e:
+                    step.error = e
+            step.done = True
+            if step.error is not None:
+                logger.debug("%r failed: %s", step, step.error)
+        return self.errors
+
+    def _add(self, step):
+        self.steps.append(step)
+        return step
+
+    def _check_settable(self, steps):
+        settable = {}
+        for step in steps:
+            if step.action is not None:
+                continue
+            key = (id(step.element), step.attribute)
+            if key not in settable:
+                try:
+                    settable[key] = PAXUIElementIsAttributeSettable(
+                        step.element.ref, step.attribute
+                    )
+                except AXError as e:
+                    settable[key] = e
+            result = settable[key]
+            if isinstance(result, AXError):
+                step.error = result
+            elif not result:
+                step.error = AXErrorUnsupported("Attribute is not settable")
@@ -0,0 +1,115 @@
+"""Fail fast on applications which stopped responding"""
+import threading
+import time
+
+from atomacos import backends
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+breaker = None
+
+
+class _Circuit(object):
+    __slots__ = ("state", "failures", "opened_at")
+
+    def __init__(self):
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+
+
+class CircuitBreaker(object):
+    """The circuits of the applications which failed recently.
+
+    After failures in a row, calls to an application raise
+    AXErrorAppNotResponding at once for cooldown seconds. Then a single call
+    goes through as a probe, which closes the circuit if it succeeds.
+
+    Args:
+        failures: failures in a row which open the circuit of an application
+        cooldown: seconds a circuit stays open before a probe goes through
+    """
+
+    def __init__(self, failures=3, cooldown=10.0):
+        self.failures = failures
+        self.cooldown = cooldown
+        # Only applications with failures have a circuit, so that nothing
+        # is looked up while every application answers
+        self.circuits = {}
+        self._lock = threading.Lock()
+
+    def state(self, pid):
+        circuit = self.circuits.get(pid)
+        return circuit.state if circuit is not None else CLOSED
+
+    def allow(self, pid):
+        """Return whether a call to pid may go through"""
+        with self._lock:
+            circuit = self.circuits.get(pid)
+            if circuit is None or circuit.state == CLOSED:
+                return True
+            if circuit.state == HALF_OPEN:
+                # A probe is in flight
+                return False
+            if time.monotonic() - circuit.opened_at < self.cooldown:
+                return False
+            circuit.state = HALF_OPEN
+            return True
+
+    def record(self, pid, answered):
+        """Count a call to pid, which the application answered or not"""
+        with self._lock:
+            circuit = self.circuits.get(pid)
+            if answered:
+                if circuit is not None:
+                    del self.circuits[pid]
+                return
+            if circuit is None:
+                circuit = self.circuits[pid] = _Circuit()
+            circuit.failures += 1
+            if circuit.state == HALF_OPEN or circuit.failures >= self.failures:
+                circuit.state = OPEN
+                circuit.opened_at = time.monotonic()
+
+
+def _pid(element):
+    error, pid = backends.get_backend().get_pid(element)
+    return pid if error == 0 and pid else None
+
+
+def allow(element):
+    """Return whether a call to the application of element may go through"""
+    current = breaker
+    if current is None or not current.circuits:
+        return True
+    pid = _pid(element)
+    return pid is None or current.allow(pid)
+
+
+def record(element, answered):
+    """Count a call to the application of element"""
+    current = breaker
+    if current is None or (answered and not current.circuits):
+        return
+    pid = _pid(element)
+    if pid is not None:
+        current.record(pid, answered)
+
+
+def set_circuit_breaker(failures=3, cooldown=10.0):
+    """Fail fast on the applications which stop responding, or stop doing
+    so with failures=None.
+
+    Args:
+        failures: AXErrorCannotComplete errors or timeouts in a row after
+            which calls to an application fail at once
+        cooldown: seconds after which a call goes through again, to check
+            whether the application recovered
+
+    Returns: the CircuitBreaker, or None
+    """
+    global breaker
+    breaker = CircuitBreaker(failures, cooldown) if failures is not None else None
+    return breaker
@@ -1,17 +1,10 @@
-import re
 from collections import namedtuple
 
-from ApplicationServices import (
-    AXUIElementGetTypeID,
-    AXValueGetType,
-    NSPointFromString,
-    NSRangeFromString,
-    NSSizeFromString,
-    kAXValueCFRangeType,
-    kAXValueCGPointType,
-    kAXValueCGSizeType,
-)
-from CoreFoundation import CFArrayGetTypeID, CFGetTypeID, CFStringGetTypeID
+from atomacos import backends
+
+CGSize = namedtuple("CGSize", ["width", "height"])
+CGPoint = namedtuple("CGPoint", ["x", "y"])
+CFRange = namedtuple("CFRange", ["location", "length"])
 
 
 class Converter:
@@ -19,20 +12,21 @@ class Converter:
         self.app_ref_class = axuielementclass
 
     def convert_value(self, value):
-        if CFGetTypeID(value) == CFStringGetTypeID():
+        kind = backends.get_backend().value_kind(value)
+        if kind == backends.STRING:
             try:
                 return str(value)
             except UnicodeEncodeError:
                 return str(value.encode("utf-8"))
-        if CFGetTypeID(value) == AXUIElementGetTypeID():
+        if kind == backends.ELEMENT:
             return self.convert_app_ref(value)
-        if CFGetTypeID(value) == CFArrayGetTypeID():
+        if kind == backends.ARRAY:
             return self.convert_list(value)
-        if AXValueGetType(value) == kAXValueCGSizeType:
+        if kind == backends.SIZE:
             return self.convert_size(value)
-        if AXValueGetType(value) == kAXValueCGPointType:
+        if kind == backends.POINT:
             return self.convert_point(value)
-        if AXValueGetType(value) == kAXValueCFRangeType:
+        if kind == backends.RANGE:
             return self.convert_range(value)
         else:
             return value
@@ -44,22 +38,10 @@ class Converter:
         return self.app_ref_class(ref=value)
 
     def convert_size(self, value):
-        repr_searched = re.search("{.*}", str(value)).group()
-        CGSize = namedtuple("CGSize", ["width", "height"])
-        size = NSSizeFromString(repr_searched)
-
-        return CGSize(size.width, size.height)
+        return CGSize(*backends.get_backend().struct_value(value))
 
     def convert_point(self, value):
-        repr_searched = re.search("{.*}", str(value)).group()
-        CGPoint = namedtuple("CGPoint", ["x", "y"])
-        point = NSPointFromString(repr_searched)
-
-        return CGPoint(point.x, point.y)
+        return CGPoint(*backends.get_backend().struct_value(value))
 
     def convert_range(self, value):
-        repr_searched = re.search("{.*}", str(value)).group()
-        CFRange = namedtuple("CFRange", ["location", "length"])
-        range = NSRangeFromString(repr_searched)
-
-        return CFRange(range.location, range.length)
+        return CFRange(*backends.get_backend().struct_value(value))
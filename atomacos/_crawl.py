@@ -0,0 +1,96 @@
+"""Inventory the trees of every running application in worker processes"""
+import json
+import multiprocessing
+import os
+import queue
+import time
+
+from atomacos import _dump, backends
+from atomacos.AXClasses import NativeUIElement
+
+# The ids of the elements of an application start at a multiple of this,
+# so they are unique across the inventory without the workers agreeing
+ID_BLOCK = 2**32
+
+# Seconds a worker may take past the budget of an application, for the
+# call in progress to reach the messaging timeout
+GRACE = 10.0
+
+
+def _crawl_app(pid, first_id, depth, attributes, budget):
+    """Dump the tree of pid in a worker, returning (text, status record)"""
+    lines = []
+    writer = _dump._Writer(lambda record: lines.append(_line(record)), first_id)
+    root = NativeUIElement.from_pid(pid)
+    status = _dump._dump_app(writer, root, depth, attributes, budget)
+    return "".join(lines), status
+
+
+def _line(record):
+    return json.dumps(record, separators=(",", ":")) + "\n"
+
+
+def crawl_all(stream, processes=None, per_app_budget=30.0, depth=None, attributes=None):
+    """Write the trees of every running application to stream as JSON
+    lines, crawling several applications at a time in worker processes.
+
+    An application which holds a worker past its budget is reported as not
+    responding, and its worker is terminated at the end of the crawl.
+
+    Args:
+        processes: the number of worker processes, or None for one per CPU
+        per_app_budget: seconds after which the crawl of an application stops
+        depth: the number of levels to write below each application
+        attributes: the attributes to write, or None for all of them
+
+    Returns: the status records of the applications, in the order of the
+        running applications; read the inventory back with atomacos.load_dump
+    """
+    pids = [
+        app.processIdentifier() for app in backends.get_backend().running_applications()
+    ]
+    if not pids:
+        return []
+    processes = min(processes or os.cpu_count() or 1, len(pids))
+    done = queue.Queue()
+    pool = multiprocessing.Pool(processes)
+    try:
+        for index, pid in enumerate(pids):
+            pool.apply_async(
+                _crawl_app,
+                (pid, (index + 1) * ID_BLOCK, depth, attributes, per_app_budget),
+                callback=lambda result, pid=pid: done.put((pid, result, None)),
+                error_callback=lambda error, pid=pid: done.put((pid, None, error)),
+            )
+        pool.close()
+        # Applications wait for a free worker, so the last ones may start
+        # after several budgets
+        rounds = -(-len(pids) // processes)
+        deadline = time.monotonic() + rounds * (per_app_budget + GRACE)
+        statuses = {}
+        while len(statuses) < len(pids):
+            try:
+                pid, result, error = done.get(
+                    timeout=max(deadline - time.monotonic(), 0)
+                )
+            except queue.Empty:
+                break
+            if error is not None:
+                statuses[pid] = _status(pid, "failed: %s" % error)
+                stream.write(_line(statuses[pid]))
+                continue
+            text, statuses[pid] = result
+            stream.write(text)
+        for pid in pids:
+            if pid not in statuses:
+                statuses[pid] = _status(pid, _dump.NOT_RESPONDING)
+                stream.write(_line(statuses[pid]))
+    finally:
+        # Stops the workers stuck in applications which never answered
+        pool.terminate()
+        pool.join()
+    return [statuses[pid] for pid in pids]
+
+
+def _status(pid, status):
+    return {"app": pid, "status": status, "nodes": 0, "seconds": None}
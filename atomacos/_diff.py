@@ -0,0 +1,199 @@
+"""Differences between two snapshots of the same tree"""
+import collections
+
+Change = collections.namedtuple("Change", ["kind", "path", "old", "new", "attributes"])
+
+ADDED = "added"
+REMOVED = "removed"
+MOVED = "moved"
+CHANGED = "changed"
+
+
+class _Entry(object):
+    __slots__ = (
+        "node",
+        "parent",
+        "index",
+        "attributes",
+        "role",
+        "label",
+        "children",
+        "match",
+        "_path",
+    )
+
+    def __init__(self, node, parent, index):
+        self.node = node
+        self.parent = parent
+        self.index = index
+        self.attributes = attributes = node.attributes
+        self.role = attributes.get("AXRole")
+        self.label = attributes.get("AXIdentifier") or attributes.get("AXTitle")
+        self.children = []
+        self.match = None
+        self._path = None
+
+    @property
+    def path(self):
+        """The roles from the root, numbering siblings with the same role"""
+        if self._path is None:
+            # Number all the siblings at once, rows can be many thousands
+            siblings = self.parent.children
+            prefix = self.parent.path
+            seen = collections.Counter()
+            for sibling in siblings:
+                number = seen[sibling.role]
+                seen[sibling.role] += 1
+                sibling._path = "%s/%s[%d]" % (prefix, sibling.role, number)
+        return self._path
+
+
+def _entries(tree):
+    """Return the entries of the elements of tree, in depth first order,
+    along with the entries of the top elements"""
+    entries = []
+    roots = []
+    stack = [(node, None) for node in reversed(tree.AXChildren)]
+    while stack:
+        node, parent = stack.pop()
+        siblings = parent.children if parent is not None else roots
+        entry = _Entry(node, parent, len(siblings))
+        siblings.append(entry)
+        entries.append(entry)
+        for child in reversed(node.AXChildren):
+            stack.append((child, entry))
+    seen = collections.Counter()
+    for root in roots:
+        root._path = "/%s[%d]" % (root.role, seen[root.role])
+        seen[root.role] += 1
+    return entries, roots
+
+
+def _link(old, new):
+    old.match = new
+    new.match = old
+
+
+def _match_refs(old_entries, new_entries):
+    by_ref = {}
+    for entry in new_entries:
+        ref = getattr(entry.node, "ref", None)
+        if ref is None:
+            return
+        try:
+            by_ref[ref] = entry
+        except TypeError:
+            return
+    for entry in old_entries:
+        match = by_ref.get(getattr(entry.node, "ref", None))
+        if match is not None and match.match is None:
+            _link(entry, match)
+
+
+class _Pools(object):
+    """Unmatched entries by key, built on first use"""
+
+    def __init__(self, entries, key):
+        self.entries = entries
+        self.key = key
+        self.pools = None
+
+    def take(self, key):
+        """Return the first entry with key which is not matched yet"""
+        if self.pools is None:
+            self.pools = collections.defaultdict(collections.deque)
+            for entry in self.entries:
+                if entry.match is None:
+                    self.pools[self.key(entry)].append(entry)
+        pool = self.pools.get(key)
+        while pool:
+            entry = pool.popleft()
+            if entry.match is None:
+                return entry
+        return None
+
+
+def _match_heuristics(old_entries, new_entries, new_roots):
+    siblings = {}
+    paths = _Pools(new_entries, lambda e: (e.role, e.path, e.label))
+    labels = _Pools(new_entries, lambda e: (e.role, e.label))
+    # Parents come first, so their matches are known when children are
+    # looked up among the children of the parent's match
+    for entry in old_entries:
+        if entry.match is not None:
+            continue
+        parent = entry.parent
+        match = None
+        if parent is None or parent.match is not None:
+            candidates = parent.match.children if parent else new_roots
+            # Most elements are still at the same place
+            if entry.index < len(candidates):
+                candidate = candidates[entry.index]
+                if (
+                    candidate.match is None
+                    and candidate.role == entry.role
+                    and candidate.label == entry.label
+                ):
+                    match = candidate
+            if match is None:
+                key = id(candidates)
+                if key not in siblings:
+                    siblings[key] = _Pools(candidates, lambda e: (e.role, e.label))
+                match = siblings[key].take((entry.role, entry.label))
+        if match is None:
+            match = paths.take((entry.role, entry.path, entry.label))
+        if match is None and entry.label:
+            match = labels.take((entry.role, entry.label))
+        if match is not None:
+            _link(entry, match)
+
+
+def _changed_attributes(old, new):
+    changes = {}
+    for name in set(old) | set(new):
+        before = old.get(name)
+        after = new.get(name)
+        if before != after:
+            changes[name] = (before, after)
+    return changes
+
+
+def diff(old, new):
+    """Compare two snapshots of the same tree.
+
+    Elements are matched by reference when both sides have them, then by
+    role and label (AXIdentifier or AXTitle) below the match of their
+    parent, then by role, path and label, and last by role and label alone,
+    which finds the elements which moved.
+
+    Args:
+        old, new: snapshots, dumps loaded with load_dump, or snapshot files
+
+    Returns: a list of Change(kind, path, old, new, attributes), kind being
+        "added", "removed", "moved" or "changed", path the role path of the
+        element, and attributes the (old, new) values of changed attributes
+    """
+    old_entries = _entries(old)[0]
+    new_entries, new_roots = _entries(new)
+    _match_refs(old_entries, new_entries)
+    _match_heuristics(old_entries, new_entries, new_roots)
+    changes = []
+    for entry in old_entries:
+        match = entry.match
+        if match is None:
+            changes.append(Change(REMOVED, entry.path, entry.node, None, None))
+            continue
+        old_parent = entry.parent.match if entry.parent is not None else None
+        if old_parent is not match.parent:
+            changes.append(Change(MOVED, match.path, entry.node, match.node, None))
+        if entry.attributes == match.attributes:
+            continue
+        attributes = _changed_attributes(entry.attributes, match.attributes)
+        if attributes:
+            changes.append(
+                Change(CHANGED, match.path, entry.node, match.node, attributes)
+            )
+    for entry in new_entries:
+        if entry.match is None:
+            changes.append(Change(ADDED, entry.path, None, entry.node, None))
+    return changes
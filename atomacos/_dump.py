@@ -0,0 +1,302 @@
+"""Stream element trees to JSON lines, and query them offline"""
+import itertools
+import json
+import threading
+import time
+
+from atomacos import _visible, backends
+from atomacos._macos import (
+    PAXUIElementCopyAttributeNames,
+    PAXUIElementCopyMultipleAttributeValues,
+)
+from atomacos._mixin._search import SearchMethodsMixin
+from atomacos.errors import AXError, AXErrorCannotComplete, AXErrorInvalidUIElement
+
+COMPLETE = "complete"
+BUDGET_EXCEEDED = "budget exceeded"
+NOT_RESPONDING = "not responding"
+
+# Marks attribute values which are not written, e.g. elements
+_SKIP = object()
+
+
+class _Writer(object):
+    """Passes the records of several threads to sink, one at a time"""
+
+    def __init__(self, sink, first_id=1):
+        self.sink = sink
+        self.ids = itertools.count(first_id)
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        with self._lock:
+            self.sink(record)
+
+
+def dump(
+    element,
+    stream,
+    depth=None,
+    attributes=None,
+    workers=4,
+    budget=30.0,
+    visible_only=False,
+):
+    """Write the tree below element to stream as JSON lines.
+
+    Every element is written as soon as it is read, with its "id", the id
+    of its "parent", its "pid", its "depth" and its "attributes", read in a
+    single batched call. A status line {"app": pid, "status": ...} ends
+    every application.
+
+    Args:
+        element: the element to start from; the system-wide element stands
+            for every running application
+        depth: the number of levels below element to write, or None for all
+        attributes: the attributes to write, or None for all of them
+        workers: the number of applications dumped at the same time
+        budget: seconds after which the dump of an application is cut short
+        visible_only: leave out the elements which are not on screen, and
+            the elements below them
+
+    Returns: the status records of the applications, as dicts
+    """
+
+    def write_line(record):
+        stream.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    return dump_records(
+        element, write_line, depth, attributes, workers, budget, visible_only
+    )
+
+
+def dump_records(
+    element,
+    sink,
+    depth=None,
+    attributes=None,
+    workers=4,
+    budget=30.0,
+    visible_only=False,
+):
+    """Like dump, passing every record to sink(record) instead of writing it.
+    sink is never called from two threads at the same time."""
+    writer = _Writer(sink)
+    backend = backends.get_backend()
+    if not backend.refs_equal(element.ref, backend.create_systemwide()):
+        return [_dump_app(writer, element, depth, attributes, budget, visible_only)]
+    roots = [
+        element.__class__.from_pid(app.processIdentifier())
+        for app in backend.running_applications()
+    ]
+    # concurrent.futures takes longer to import than the rest of atomacos
+    import concurrent.futures
+
+    with concurrent.futures.ThreadPoolExecutor(max(workers, 1)) as executor:
+        futures = [
+            executor.submit(
+                _dump_app, writer, root, depth, attributes, budget, visible_only
+            )
+            for root in roots
+        ]
+        return [future.result() for future in futures]
+
+
+def _dump_app(writer, root, depth, attributes, budget, visible_only=False):
+    start = time.perf_counter()
+    deadline = start + budget
+    pid = root.pid
+    status = COMPLETE
+    nodes = 0
+    extra, clip = [], None
+    if visible_only:
+        extra, clip = _visible.VISIBILITY_ATTRIBUTES, _visible.screen_clip()
+    # Depth first, so that every node comes after its parent
+    stack = [(root.ref, None, 0, clip)]
+    try:
+        while stack:
+            if time.perf_counter() > deadline:
+                status = BUDGET_EXCEEDED
+                break
+            ref, parent, level, clip = stack.pop()
+            try:
+                values, children, extras = _read_with(ref, attributes, extra)
+            except AXErrorInvalidUIElement:
+                # The element went away since its parent was read
+                continue
+            if visible_only:
+                role, frame, children = _visible.parse(extras, children)
+                if parent is not None and not _visible.shown(frame, clip):
+                    continue
+                clip = _visible.clip_below(role, frame, clip)
+            node_id = next(writer.ids)
+            writer.write(
+                {
+                    "id": node_id,
+                    "parent": parent,
+                    "pid": pid,
+                    "depth": level,
+                    "attributes": values,
+                }
+            )
+            nodes += 1
+            if depth is None or level < depth:
+                for child in reversed(children):
+                    stack.append((child, node_id, level + 1, clip))
+    except AXErrorCannotComplete:
+        status = NOT_RESPONDING
+    except AXError as error:
+        # e.g. helper processes which do not implement accessibility
+        status = "failed: %s" % error
+    record = {
+        "app": pid,
+        "status": status,
+        "nodes": nodes,
+        "seconds": time.perf_counter() - start,
+    }
+    writer.write(record)
+    return record
+
+
+def _read(ref, attributes):
+    """Return the JSON attribute values and the children of an element"""
+    values, children, _ = _read_with(ref, attributes, [])
+    return values, children
+
+
+def _read_with(ref, attributes, extra):
+    """Like _read, also returning the raw values of the extra attributes,
+    read in the same call"""
+    names = attributes
+    if names is None:
+        try:
+            names = PAXUIElementCopyAttributeNames(ref)
+        except (AXErrorCannotComplete, AXErrorInvalidUIElement):
+            raise
+        except AXError:
+            names = []
+    names = [name for name in names if name != "AXChildren"]
+    raw = PAXUIElementCopyMultipleAttributeValues(
+        ref, names + list(extra) + ["AXChildren"]
+    )
+    backend = backends.get_backend()
+    values = {}
+    for name, value in zip(names, raw):
+        value = _json_value(backend, value)
+        if value is not _SKIP:
+            values[name] = value
+    return values, list(raw[-1] or []), raw[len(names) : -1]
+
+
+def _json_value(backend, value):
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    kind = backend.value_kind(value)
+    if kind == backends.STRING:
+        return str(value)
+    if kind in (backends.SIZE, backends.POINT, backends.RANGE):
+        return list(backend.struct_value(value))
+    if kind == backends.ARRAY:
+        items = [_json_value(backend, item) for item in value]
+        return _SKIP if _SKIP in items else items
+    if kind == backends.ELEMENT:
+        return _SKIP
+    return str(value)
+
+
+class DumpedElement(SearchMethodsMixin):
+    """An element read back from a dump.
+
+    Attributes are read like those of a live element, and the search
+    methods work the same way, without any accessibility call.
+    """
+
+    def __init__(self, id, pid, depth, attributes, parent=None):
+        self.id = id
+        self.pid = pid
+        self.depth = depth
+        self.attributes = attributes
+        self.parent = parent
+        self.children = []
+
+    def __repr__(self):
+        for describer in ("AXTitle", "AXValue", "AXRoleDescription"):
+            title = str(self.attributes.get(describer) or "")
+            if title:
+                break
+        role = self.attributes.get("AXRole", "<No role!>")
+        return "<%s %s %s>" % (self.__class__.__name__, role, title)
+
+    def __getattr__(self, item):
+        if item.startswith("AX"):
+            try:
+                return self.__dict__["attributes"][item]
+            except KeyError:
+                pass
+        raise AttributeError("'%s' object has no attribute '%s'" % (type(self), item))
+
+    @property
+    def ax_attributes(self):
+        return list(self.attributes) + ["AXChildren"]
+
+    @property
+    def AXChildren(self):
+        return self.children
+
+    @property
+    def AXParent(self):
+        return self.parent
+
+
+class Dump(SearchMethodsMixin):
+    """The trees of a dump, searchable like an element.
+
+    Attributes:
+        roots: the top elements, usually one per application
+        apps: the status records of the applications
+    """
+
+    def __init__(self):
+        self.roots = []
+        self.apps = []
+        self.nodes = {}
+
+    def __len__(self):
+        return len(self.nodes)
+
+    @property
+    def ax_attributes(self):
+        return ["AXChildren"]
+
+    @property
+    def AXChildren(self):
+        return self.roots
+
+    def add(self, record):
+        if "app" in record:
+            self.apps.append(record)
+            return
+        parent = self.nodes.get(record["parent"])
+        element = DumpedElement(
+            record["id"], record["pid"], record["depth"], record["attributes"], parent
+        )
+        self.nodes[element.id] = element
+        if parent is None:
+            self.roots.append(element)
+        else:
+            parent.children.append(element)
+
+
+def load_dump(path_or_stream):
+    """Read a dump written by NativeUIElement.dump.
+
+    Returns: a Dump, with the findFirst*/findAll* search methods
+    """
+    if not hasattr(path_or_stream, "read"):
+        with open(path_or_stream) as f:
+            return load_dump(f)
+    result = Dump()
+    for line in path_or_stream:
+        if line.strip():
+            result.add(json.loads(line))
+    return result
@@ -0,0 +1,279 @@
+"""Run the accessibility calls of every application on a worker of its own"""
+import collections
+import concurrent.futures
+import threading
+import time
+
+from atomacos import _breaker, backends, metrics
+from atomacos.errors import AXErrorTimeout
+
+_local = threading.local()
+
+
+class deadline(object):
+    """Give the calls made inside a with block, in this thread, at most
+    seconds to complete, counting from the start of the block.
+
+    Deadlines only apply while app workers are active, and nest: an inner
+    block never extends the deadline of an outer one.
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def __enter__(self):
+        self.previous = getattr(_local, "deadline", None)
+        limit = time.monotonic() + self.seconds
+        if self.previous is not None:
+            limit = min(limit, self.previous)
+        _local.deadline = limit
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _local.deadline = self.previous
+        return False
+
+
+class _Call(object):
+    __slots__ = ("future", "function", "args", "kwargs", "deadline")
+
+    def __init__(self, function, args, kwargs, deadline):
+        self.future = concurrent.futures.Future()
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.deadline = deadline
+
+    def run(self):
+        if not self.future.set_running_or_notify_cancel():
+            return
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            self.future.set_exception(
+                AXErrorTimeout("The call expired before the application was free")
+            )
+            return
+        try:
+            result = self.function(*self.args, **self.kwargs)
+        except Exception as e:
+            self.future.set_exception(e)
+        else:
+            self.future.set_result(result)
+
+
+class _Worker(object):
+    """A thread running the calls of one application, in order"""
+
+    def __init__(self, pid, idle):
+        self.pid = pid
+        self.idle = idle
+        self.queue = collections.deque()
+        self.running = None
+        self.retired = False
+        self._condition = threading.Condition()
+        self.thread = threading.Thread(
+            target=self._run, name="atomacos-app-%s" % pid, daemon=True
+        )
+        self.thread.start()
+
+    def put(self, call):
+        """Queue a call, returning False if the worker is retired"""
+        with self._condition:
+            if self.retired:
+                return False
+            self.queue.append(call)
+            self._condition.notify()
+            return True
+
+    def overrunning(self, now):
+        call = self.running
+        return call is not None and call.deadline is not None and now > call.deadline
+
+    def retire(self):
+        """Stop taking calls, returning the calls still queued"""
+        with self._condition:
+            self.retired = True
+            pending = list(self.queue)
+            self.queue.clear()
+            self._condition.notify()
+        return pending
+
+    def _run(self):
+        _local.pid = self.pid
+        while True:
+            with self._condition:
+                if not self.queue and not self.retired:
+                    self._condition.wait(self.idle)
+                if self.retired:
+                    return
+                if not self.queue:
+                    # Idle for too long, the application may be gone
+                    self.retired = True
+                    return
+                call = self.running = self.queue.popleft()
+            call.run()
+            self.running = None
+
+
+class AppWorkers(object):
+    """The workers of the applications, created on first use.
+
+    A call which overruns its deadline raises AXErrorTimeout, and the worker
+    stuck in it is retired, so that the next calls to the application start
+    on a fresh worker instead of queueing behind it.
+
+    Args:
+        timeout: seconds a call may take when no deadline is set, or None
+            to wait as long as the call takes
+        idle: seconds after which an unused worker stops
+    """
+
+    def __init__(self, timeout=5.0, idle=60.0):
+        self.timeout = timeout
+        self.idle = idle
+        self.abandoned = 0
+        self._workers = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self._previous = backends.set_backend(
+            WorkerBackend(backends.get_backend(), self)
+        )
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        backends.set_backend(self._previous)
+        self.close()
+        return False
+
+    def close(self):
+        """Stop every worker; calls still queued are cancelled"""
+        with self._lock:
+            workers = list(self._workers.values())
+            self._workers.clear()
+        for worker in workers:
+            for call in worker.retire():
+                call.future.cancel()
+
+    def _deadline(self):
+        limit = getattr(_local, "deadline", None)
+        if limit is None and self.timeout is not None:
+            limit = time.monotonic() + self.timeout
+        return limit
+
+    def submit(self, pid, function, *args, **kwargs):
+        """Run function(*args, **kwargs) on the worker of pid.
+
+        The call gets the deadline of the enclosing deadline block, or the
+        default timeout; it fails with AXErrorTimeout if it cannot start
+        before the deadline.
+
+        Returns: a concurrent.futures.Future of the result
+        """
+        call = _Call(function, args, kwargs, self._deadline())
+        while not self._worker(pid).put(call):
+            pass
+        return call.future
+
+    def call(self, pid, function, *args):
+        """Run function(*args) on the worker of pid and wait for the result.
+
+        Raises AXErrorTimeout when the call overruns its deadline, leaving
+        the call behind.
+        """
+        call = _Call(function, args, {}, self._deadline())
+        worker = self._worker(pid)
+        while not worker.put(call):
+            worker = self._worker(pid)
+        timeout = None
+        if call.deadline is not None:
+            timeout = max(call.deadline - time.monotonic(), 0)
+        try:
+            return call.future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            if not call.future.cancel():
+                self._abandon(worker)
+            metrics.count_error(AXErrorTimeout)
+            if _breaker.breaker is not None:
+                _breaker.breaker.record(pid, False)
+            raise AXErrorTimeout(
+                "The application %s did not answer within the deadline" % pid
+            )
+
+    def _worker(self, pid):
+        with self._lock:
+            worker = self._workers.get(pid)
+            if worker is not None and worker.overrunning(time.monotonic()):
+                self._replace(worker)
+                worker = self._workers[pid]
+            elif worker is None or worker.retired:
+                worker = self._workers[pid] = _Worker(pid, self.idle)
+            return worker
+
+    def _abandon(self, worker):
+        with self._lock:
+            if self._workers.get(worker.pid) is worker:
+                self._replace(worker)
+
+    def _replace(self, worker):
+        """Leave an overrunning worker to its call, moving its queue to a
+        fresh worker"""
+        self.abandoned += 1
+        replacement = self._workers[worker.pid] = _Worker(worker.pid, self.idle)
+        for call in worker.retire():
+            replacement.put(call)
+
+
+class WorkerBackend(backends.BackendProxy):
+    """Sends the element calls of another backend to the application
+    workers. Calls on elements without a pid, like the system-wide
+    element, and calls made from a worker run in the calling thread."""
+
+    def __init__(self, backend, workers):
+        super(WorkerBackend, self).__init__(backend)
+        self.workers = workers
+
+    def _call(self, method, element, *args):
+        if getattr(_local, "pid", None) is None:
+            error, pid = self.backend.get_pid(element)
+            if error == 0 and pid:
+                return self.workers.call(pid, method, element, *args)
+        return method(element, *args)
+
+    def copy_attribute_value(self, element, attribute):
+        return self._call(self.backend.copy_attribute_value, element, attribute)
+
+    def copy_multiple_attribute_values(self, element, attributes):
+        return self._call(
+            self.backend.copy_multiple_attribute_values, element, attributes
+        )
+
+    def copy_attribute_names(self, element):
+        return self._call(self.backend.copy_attribute_names, element)
+
+    def copy_action_names(self, element):
+        return self._call(self.backend.copy_action_names, element)
+
+    def is_attribute_settable(self, element, attribute):
+        return self._call(self.backend.is_attribute_settable, element, attribute)
+
+    def set_attribute_value(self, element, attribute, value):
+        return self._call(self.backend.set_attribute_value, element, attribute, value)
+
+    def perform_action(self, element, action):
+        return self._call(self.backend.perform_action, element, action)
+
+    def copy_element_at_position(self, application, x, y):
+        return self._call(self.backend.copy_element_at_position, application, x, y)
+
+
+def app_workers(timeout=5.0, idle=60.0):
+    """Send the accessibility calls made inside a with block to a worker
+    thread per application.
+
+    Args:
+        timeout: seconds a call may take when no deadline is set
+        idle: seconds after which an unused worker stops
+
+    Returns: an AppWorkers, to be used as a context manager
+    """
+    return AppWorkers(timeout=timeout, idle=idle)
@@ -0,0 +1,99 @@
+"""Search the trees of many applications at the same time"""
+import concurrent.futures
+import queue
+import threading
+
+from atomacos import AXCallbacks
+from atomacos.AXClasses import NativeUIElement
+from atomacos.backends import get_backend
+from atomacos.errors import AXError, AXErrorCannotComplete
+
+# Put on the queue by a search once it is over
+_DONE = object()
+
+
+def _children(element):
+    """Return the children of element, or [] if they cannot be read"""
+    try:
+        if "AXChildren" not in element.ax_attributes:
+            return []
+        return element.AXChildren or []
+    except AXErrorCannotComplete:
+        raise
+    except AXError:
+        # e.g. the element went away since its parent was read
+        return []
+
+
+def _search(app, match, first, results, stop):
+    # Depth first, in the order of findAllR. An element which fails is
+    # skipped with its subtree, but an app which does not answer is given up
+    stack = []
+    try:
+        stack.extend(reversed(_children(app)))
+        while stack:
+            if stop.is_set():
+                return
+            element = stack.pop()
+            try:
+                matched = match(element)
+            except AXErrorCannotComplete:
+                raise
+            except AXError:
+                matched = False
+            if matched:
+                results.put((app, element))
+                if first:
+                    return
+            stack.extend(reversed(_children(element)))
+    except AXErrorCannotComplete:
+        pass
+    finally:
+        results.put(_DONE)
+
+
+def find_in_apps(criteria, bundle_ids=None, workers=4, first=False):
+    """Search the running applications for elements matching criteria.
+
+    Args:
+        criteria: the criteria of findAllR, as a dict
+        bundle_ids: the bundle ids of the applications to search, or None
+            for all running applications
+        workers: the number of applications searched at the same time
+        first: stop every search once a match is found
+
+    Yields: (application, element) pairs, in the order they are found;
+        applications which fail to answer are skipped
+    """
+    backend = get_backend()
+    if bundle_ids is None:
+        running = backend.running_applications()
+    else:
+        running = [
+            app
+            for bundle_id in bundle_ids
+            for app in backend.running_applications_with_bundle_id(bundle_id)
+        ]
+    apps = [NativeUIElement.from_pid(app.processIdentifier()) for app in running]
+    if not apps:
+        return
+    match = AXCallbacks.match_filter(**criteria)
+    results = queue.Queue()
+    stop = threading.Event()
+    executor = concurrent.futures.ThreadPoolExecutor(max(workers, 1))
+    try:
+        for app in apps:
+            executor.submit(_search, app, match, first, results, stop)
+        pending = len(apps)
+        while pending:
+            item = results.get()
+            if item is _DONE:
+                pending -= 1
+                continue
+            yield item
+            if first:
+                return
+    finally:
+        # Searches still queued return at their first element
+        stop.set()
+        executor.shutdown(wait=False)
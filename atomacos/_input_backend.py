@@ -0,0 +1,486 @@
+"""Keyboard and mouse backends used by the KeyboardMouseMixin"""
+import contextlib
+import time
+from collections import namedtuple
+
+from atomacos import keyboard, mouse
+
+KeyEvent = namedtuple("KeyEvent", ["keycode", "down", "flags", "text"])
+MouseEvent = namedtuple("MouseEvent", ["type", "x", "y", "button", "clicks", "flags"])
+Pause = namedtuple("Pause", ["seconds"])
+
+# CGEventType values
+kCGEventLeftMouseDown = 1
+kCGEventLeftMouseUp = 2
+kCGEventRightMouseDown = 3
+kCGEventRightMouseUp = 4
+kCGEventMouseMoved = 5
+kCGEventLeftMouseDragged = 6
+kCGEventRightMouseDragged = 7
+kCGEventOtherMouseDown = 25
+kCGEventOtherMouseUp = 26
+kCGEventOtherMouseDragged = 27
+
+# button name: (CGMouseButton, down type, up type, dragged type)
+MOUSE_BUTTONS = {
+    "left": (0, kCGEventLeftMouseDown, kCGEventLeftMouseUp, kCGEventLeftMouseDragged),
+    "right": (
+        1,
+        kCGEventRightMouseDown,
+        kCGEventRightMouseUp,
+        kCGEventRightMouseDragged,
+    ),
+    "middle": (
+        2,
+        kCGEventOtherMouseDown,
+        kCGEventOtherMouseUp,
+        kCGEventOtherMouseDragged,
+    ),
+}
+
+# CGEventFlags for the modifier keys, keyed by the pyautogui key names
+MODIFIER_FLAGS = {
+    "capslock": 0x10000,
+    "shift": 0x20000,
+    "shiftleft": 0x20000,
+    "shiftright": 0x20000,
+    "ctrl": 0x40000,
+    "control": 0x40000,
+    "ctrlleft": 0x40000,
+    "ctrlright": 0x40000,
+    "alt": 0x80000,
+    "altleft": 0x80000,
+    "altright": 0x80000,
+    "option": 0x80000,
+    "optionleft": 0x80000,
+    "optionright": 0x80000,
+    "command": 0x100000,
+    "cmd": 0x100000,
+    "win": 0x100000,
+    "winleft": 0x100000,
+    "winright": 0x100000,
+    "fn": 0x800000,
+}
+
+# Virtual keycodes of the ANSI layout, keyed by the pyautogui key names.
+# Characters missing here are typed as unicode strings instead.
+KEYCODES = {
+    "a": 0x00,
+    "s": 0x01,
+    "d": 0x02,
+    "f": 0x03,
+    "h": 0x04,
+    "g": 0x05,
+    "z": 0x06,
+    "x": 0x07,
+    "c": 0x08,
+    "v": 0x09,
+    "b": 0x0B,
+    "q": 0x0C,
+    "w": 0x0D,
+    "e": 0x0E,
+    "r": 0x0F,
+    "y": 0x10,
+    "t": 0x11,
+    "1": 0x12,
+    "2": 0x13,
+    "3": 0x14,
+    "4": 0x15,
+    "6": 0x16,
+    "5": 0x17,
+    "=": 0x18,
+    "9": 0x19,
+    "7": 0x1A,
+    "-": 0x1B,
+    "8": 0x1C,
+    "0": 0x1D,
+    "]": 0x1E,
+    "o": 0x1F,
+    "u": 0x20,
+    "[": 0x21,
+    "i": 0x22,
+    "p": 0x23,
+    "l": 0x25,
+    "j": 0x26,
+    "'": 0x27,
+    "k": 0x28,
+    ";": 0x29,
+    "\\": 0x2A,
+    ",": 0x2B,
+    "/": 0x2C,
+    "n": 0x2D,
+    "m": 0x2E,
+    ".": 0x2F,
+    "`": 0x32,
+    "\n": 0x24,
+    "\r": 0x24,
+    "enter": 0x24,
+    "return": 0x24,
+    "\t": 0x30,
+    "tab": 0x30,
+    " ": 0x31,
+    "space": 0x31,
+    "backspace": 0x33,
+    "delete": 0x33,
+    "\b": 0x33,
+    "esc": 0x35,
+    "escape": 0x35,
+    "command": 0x37,
+    "cmd": 0x37,
+    "win": 0x37,
+    "winleft": 0x37,
+    "winright": 0x36,
+    "shift": 0x38,
+    "shiftleft": 0x38,
+    "capslock": 0x39,
+    "alt": 0x3A,
+    "altleft": 0x3A,
+    "option": 0x3A,
+    "optionleft": 0x3A,
+    "ctrl": 0x3B,
+    "control": 0x3B,
+    "ctrlleft": 0x3B,
+    "shiftright": 0x3C,
+    "altright": 0x3D,
+    "optionright": 0x3D,
+    "ctrlright": 0x3E,
+    "fn": 0x3F,
+    "volumeup": 0x48,
+    "volumedown": 0x49,
+    "volumemute": 0x4A,
+    "help": 0x72,
+    "home": 0x73,
+    "pageup": 0x74,
+    "pgup": 0x74,
+    "del": 0x75,
+    "end": 0x77,
+    "pagedown": 0x79,
+    "pgdn": 0x79,
+    "left": 0x7B,
+    "right": 0x7C,
+    "down": 0x7D,
+    "up": 0x7E,
+    "f1": 0x7A,
+    "f2": 0x78,
+    "f3": 0x63,
+    "f4": 0x76,
+    "f5": 0x60,
+    "f6": 0x61,
+    "f7": 0x62,
+    "f8": 0x64,
+    "f9": 0x65,
+    "f10": 0x6D,
+    "f11": 0x67,
+    "f12": 0x6F,
+    "f13": 0x69,
+    "f14": 0x6B,
+    "f15": 0x71,
+    "f16": 0x6A,
+    "f17": 0x40,
+    "f18": 0x4F,
+    "f19": 0x50,
+    "f20": 0x5A,
+}
+
+
+def post_events(events):
+    """Post a batch of event descriptors to the HID event tap"""
+    # Quartz is only needed once events are really posted, so a stub poster
+    # can be used to inspect the events on any platform
+    import Quartz
+
+    for event in events:
+        if isinstance(event, KeyEvent):
+            cg_event = Quartz.CGEventCreateKeyboardEvent(
+                None, event.keycode, event.down
+            )
+            if event.text:
+                Quartz.CGEventKeyboardSetUnicodeString(
+                    cg_event, utf16_length(event.text), event.text
+                )
+        else:
+            cg_event = Quartz.CGEventCreateMouseEvent(
+                None, event.type, (event.x, event.y), event.button
+            )
+            Quartz.CGEventSetIntegerValueField(
+                cg_event, Quartz.kCGMouseEventClickState, event.clicks
+            )
+        Quartz.CGEventSetFlags(cg_event, event.flags)
+        Quartz.CGEventPost(Quartz.kCGHIDEventTap, cg_event)
+
+
+def utf16_length(text):
+    """Return the length of text in UTF-16 code units"""
+    return len(text.encode("utf-16-le")) // 2
+
+
+def utf16_chunks(text, size):
+    """Split text in chunks of at most size UTF-16 units.
+
+    Surrogate pairs are never split across two chunks.
+    """
+    chunk, units = [], 0
+    for char in text:
+        width = 2 if ord(char) > 0xFFFF else 1
+        if units + width > size:
+            yield "".join(chunk)
+            chunk, units = [], 0
+        chunk.append(char)
+        units += width
+    if chunk:
+        yield "".join(chunk)
+
+
+class PyAutoGUIBackend(object):
+    """Input through pyautogui, with its pauses and tweening"""
+
+    @contextlib.contextmanager
+    def batch(self):
+        yield
+
+    def press(self, key):
+        keyboard.press(key)
+
+    def key_down(self, key):
+        keyboard.keyDown(key)
+
+    def key_up(self, key):
+        keyboard.keyUp(key)
+
+    def typewrite(self, text):
+        keyboard.typewrite(text)
+
+    def click(self, coord, button="left", clicks=1, interval=0.0):
+        mouse.click(*coord, interval=interval, button=button, clicks=clicks)
+
+    def double_click(self, coord, button="left"):
+        mouse.doubleClick(*coord, button=button)
+
+    def triple_click(self, coord, button="left"):
+        mouse.tripleClick(*coord, button=button)
+
+    def drag(self, coord, dest_coord, button="left", duration=0.0, clicks=1):
+        # pyautogui cannot set the click state of the drag itself
+        if clicks > 1:
+            mouse.click(*coord, button=button, clicks=clicks - 1)
+        mouse.moveTo(*coord)
+        mouse.dragTo(*dest_coord, duration=duration, button=button)
+
+    def position(self):
+        return mouse.position()
+
+
+class QuartzBackend(object):
+    """Input through CGEvents posted without any implicit pause.
+
+    Args:
+        poster: callable receiving each batch of KeyEvent/MouseEvent
+            descriptors, defaults to posting them to the HID event tap
+        delay: seconds to wait between two events, 0 by default
+        drag_steps: number of intermediate dragged events of a drag
+    """
+
+    def __init__(self, poster=None, delay=0.0, drag_steps=10):
+        self.poster = poster or post_events
+        self.delay = delay
+        self.drag_steps = drag_steps
+        self._flags = 0
+        self._position = None
+        self._pending = None
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Queue all events sent inside the block and post them together.
+
+        Nothing is posted if the block raises, so modifiers pressed inside
+        it cannot get stuck.
+        """
+        if self._pending is not None:
+            yield
+            return
+
+        self._pending = []
+        flags = self._flags
+        try:
+            yield
+        except BaseException:
+            self._flags = flags
+            raise
+        finally:
+            events, self._pending = self._pending, None
+        self._post(events)
+
+    def press(self, key):
+        self._emit([self._key_event(key, True), self._key_event(key, False)])
+
+    def key_down(self, key):
+        self._flags |= MODIFIER_FLAGS.get(_key_name(key), 0)
+        self._emit([self._key_event(key, True)])
+
+    def key_up(self, key):
+        self._flags &= ~MODIFIER_FLAGS.get(_key_name(key), 0)
+        self._emit([self._key_event(key, False)])
+
+    def typewrite(self, text):
+        events = []
+        for char in text:
+            events.append(self._key_event(char, True))
+            events.append(self._key_event(char, False))
+        self._emit(events)
+
+    def type_unicode(self, text, chunk_size=20):
+        """Type text with keyboard events carrying several characters each.
+
+        Args:
+            text: the text to type
+            chunk_size: UTF-16 units per event, the event tap ignores
+                anything beyond 20
+        """
+        events = []
+        for chunk in utf16_chunks(text, chunk_size):
+            events.append(KeyEvent(0, True, self._flags, chunk))
+            events.append(KeyEvent(0, False, self._flags, chunk))
+        self._emit(events)
+
+    def click(self, coord, button="left", clicks=1, interval=0.0):
+        number, down, up, _ = MOUSE_BUTTONS[button]
+        x, y = coord
+        events = [self._move_event(coord)]
+        for click in range(1, clicks + 1):
+            if click > 1 and interval:
+                events.append(Pause(interval))
+            events.append(MouseEvent(down, x, y, number, click, self._flags))
+            events.append(MouseEvent(up, x, y, number, click, self._flags))
+        self._emit(events)
+
+    def double_click(self, coord, button="left"):
+        self.click(coord, button=button, clicks=2)
+
+    def triple_click(self, coord, button="left"):
+        self.click(coord, button=button, clicks=3)
+
+    def drag(self, coord, dest_coord, button="left", duration=0.0, clicks=1):
+        """Drag from coord to dest_coord, the button going down for the
+        last of clicks clicks, e.g. 2 for a double-click drag"""
+        number, down, up, dragged = MOUSE_BUTTONS[button]
+        (x, y), (dest_x, dest_y) = coord, dest_coord
+        steps = max(1, self.drag_steps)
+        events = [self._move_event(coord)]
+        for click in range(1, clicks):
+            events.append(MouseEvent(down, x, y, number, click, self._flags))
+            events.append(MouseEvent(up, x, y, number, click, self._flags))
+        events.append(MouseEvent(down, x, y, number, clicks, self._flags))
+        for step in range(1, steps + 1):
+            if duration:
+                events.append(Pause(float(duration) / steps))
+            events.append(
+                MouseEvent(
+                    dragged,
+                    x + (dest_x - x) * step / float(steps),
+                    y + (dest_y - y) * step / float(steps),
+                    number,
+                    clicks,
+                    self._flags,
+                )
+            )
+        events.append(MouseEvent(up, dest_x, dest_y, number, clicks, self._flags))
+        self._position = dest_coord
+        self._emit(events)
+
+    def position(self):
+        if self._position is not None:
+            return self._position
+
+        import Quartz
+
+        location = Quartz.CGEventGetLocation(Quartz.CGEventCreate(None))
+        return location.x, location.y
+
+    def _key_event(self, key, down):
+        name = _key_name(key)
+        if name in KEYCODES:
+            return KeyEvent(KEYCODES[name], down, self._flags, None)
+        if len(key) == 1:
+            return KeyEvent(0, down, self._flags, key)
+        raise ValueError("Unknown key: %r" % key)
+
+    def _move_event(self, coord):
+        self._position = coord
+        return MouseEvent(kCGEventMouseMoved, coord[0], coord[1], 0, 0, self._flags)
+
+    def _emit(self, events):
+        if self._pending is not None:
+            self._pending.extend(events)
+        else:
+            self._post(events)
+
+    def _post(self, events):
+        chunk = []
+        for event in events:
+            if isinstance(event, Pause):
+                self._flush(chunk)
+                chunk = []
+                time.sleep(event.seconds)
+            elif self.delay:
+                if chunk:
+                    self._flush(chunk)
+                    time.sleep(self.delay)
+                chunk = [event]
+            else:
+                chunk.append(event)
+        self._flush(chunk)
+
+    def _flush(self, chunk):
+        if chunk:
+            self.poster(chunk)
+
+
+def _key_name(key):
+    # pyautogui names are case insensitive, single characters are not
+    return key.lower() if len(key) > 1 else key
+
+
+_backends = {"pyautogui": PyAutoGUIBackend, "quartz": QuartzBackend}
+_current = None
+_quartz = None
+
+
+def get_input_backend():
+    """Return the input backend of the session, pyautogui by default"""
+    global _current
+    if _current is None:
+        _current = PyAutoGUIBackend()
+    return _current
+
+
+def set_input_backend(backend):
+    """Select the input backend used by every element of the session.
+
+    Args:
+        backend: "pyautogui", "quartz" or a backend instance
+
+    Returns: the previously selected backend
+    """
+    global _current
+    previous = get_input_backend()
+    if isinstance(backend, str):
+        if backend not in _backends:
+            raise ValueError("Unknown input backend: %s" % backend)
+        backend = _backends[backend]()
+    _current = backend
+    return previous
+
+
+def get_event_backend():
+    """Return a backend able to post raw CGEvents.
+
+    This is the session backend when it is a QuartzBackend, and a shared
+    QuartzBackend otherwise.
+    """
+    global _quartz
+    backend = get_input_backend()
+    if isinstance(backend, QuartzBackend):
+        return backend
+    if _quartz is None:
+        _quartz = QuartzBackend()
+    return _quartz
@@ -0,0 +1,162 @@
+"""Locators, which find an element again after the application rebuilt it"""
+from atomacos import AXCallbacks
+from atomacos._macos import (
+    PAXUIElementCopyAttributeValue,
+    PAXUIElementCopyMultipleAttributeValues,
+)
+from atomacos.errors import AXError, AXErrorInvalidUIElement
+
+FINGERPRINT_ATTRIBUTES = ["AXRole", "AXIdentifier", "AXTitle"]
+
+# How the element of a locator was last resolved
+CACHED = "cached"
+PATH = "path"
+SEARCH = "search"
+
+
+def _read(ref):
+    """Return the fingerprint and the children of an element"""
+    role, identifier, title, children = PAXUIElementCopyMultipleAttributeValues(
+        ref, FINGERPRINT_ATTRIBUTES + ["AXChildren"]
+    )
+    return (role, identifier or title), list(children or [])
+
+
+def _children(ref):
+    try:
+        return list(PAXUIElementCopyAttributeValue(ref, "AXChildren") or [])
+    except AXErrorInvalidUIElement:
+        raise
+    except AXError:
+        return []
+
+
+class Locator(object):
+    """Finds the first element below root matching criteria, like
+    findFirstR, and finds it again quickly once it went stale.
+
+    The locator keeps the path of child indices to the element, and the
+    role and identifier (or title) of every element on the path. A stale
+    element is found again by following the path, with one batched read per
+    level. Only when the path no longer leads to it does the locator search
+    again, from the deepest element of the path which did not change.
+
+    Attributes:
+        path: the child indices from the root to the element, or None
+        resolved_by: how the element was last resolved, CACHED, PATH or
+            SEARCH, or None if it was not found
+    """
+
+    def __init__(self, root, **criteria):
+        self.root = root
+        self.criteria = criteria
+        self.path = None
+        self.fingerprints = None
+        self.element = None
+        self.resolved_by = None
+        self._match = AXCallbacks.match_filter(**criteria)
+
+    def __repr__(self):
+        return "<%s %r path=%s>" % (self.__class__.__name__, self.criteria, self.path)
+
+    def get(self):
+        """Return the element, resolving it again if it went stale.
+
+        Returns: the element, or None if no element matches
+        """
+        if self.element is not None:
+            try:
+                PAXUIElementCopyAttributeValue(self.element.ref, "AXRole")
+                self.resolved_by = CACHED
+                return self.element
+            except AXErrorInvalidUIElement:
+                pass
+        return self.resolve()
+
+    def resolve(self):
+        """Find the element again, by its path first, then by searching.
+
+        Returns: the element, or None if no element matches
+        """
+        start, start_path = self.root.ref, []
+        if self.path is not None:
+            element, start, start_path = self._follow()
+            if element is not None:
+                self.element = element
+                self.resolved_by = PATH
+                return element
+        element, path = self._search(start, start_path)
+        if element is None and start_path:
+            element, path = self._search(self.root.ref, [])
+        self.element = element
+        if element is None:
+            self.path = self.fingerprints = self.resolved_by = None
+            return None
+        self.resolved_by = SEARCH
+        self._record(path)
+        return element
+
+    def _follow(self):
+        """Follow the recorded path, returning the element if it still
+        matches, along with the deepest element of the path with the right
+        fingerprint and its path"""
+        ref, path = self.root.ref, []
+        try:
+            children = _children(ref)
+            for index, fingerprint in zip(self.path, self.fingerprints):
+                if index >= len(children):
+                    break
+                child = children[index]
+                child_fingerprint, child_children = _read(child)
+                if child_fingerprint != fingerprint:
+                    break
+                if len(path) + 1 == len(self.path):
+                    element = self.root.__class__(child)
+                    if self._match(element):
+                        return element, ref, path
+                    break
+                ref, children = child, child_children
+                path.append(index)
+        except AXErrorInvalidUIElement:
+            pass
+        return None, ref, path
+
+    def _search(self, start, start_path):
+        """Search below start in the order of findFirstR, returning the
+        first matching element and its path"""
+        try:
+            children = _children(start)
+        except AXErrorInvalidUIElement:
+            return None, None
+        stack = [
+            (child, start_path + [index])
+            for index, child in reversed(list(enumerate(children)))
+        ]
+        while stack:
+            ref, path = stack.pop()
+            element = self.root.__class__(ref)
+            try:
+                if self._match(element):
+                    return element, path
+                children = _children(ref)
+            except AXErrorInvalidUIElement:
+                continue
+            for index in range(len(children) - 1, -1, -1):
+                stack.append((children[index], path + [index]))
+        return None, None
+
+    def _record(self, path):
+        """Keep path and the fingerprints of the elements along it"""
+        fingerprints = []
+        ref = self.root.ref
+        try:
+            children = _children(ref)
+            for index in path:
+                fingerprint, children = _read(children[index])
+                fingerprints.append(fingerprint)
+        except (AXErrorInvalidUIElement, IndexError):
+            # The tree changed since the search; search again next time
+            self.path = self.fingerprints = None
+            return
+        self.path = path
+        self.fingerprints = fingerprints
@@ -1,27 +1,25 @@
 """
-Wrap objc calls to raise python exception
+Wrap backend calls to raise python exception
 """
 # flake8: noqa: B950
-from ApplicationServices import (
-    AXObserverAddNotification,
-    AXObserverCreate,
-    AXObserverRemoveNotification,
-    AXUIElementCopyActionNames,
-    AXUIElementCopyAttributeNames,
-    AXUIElementCopyAttributeValue,
-    AXUIElementCopyElementAtPosition,
-    AXUIElementGetPid,
-    AXUIElementIsAttributeSettable,
-    AXUIElementPerformAction,
-    AXUIElementSetAttributeValue,
-    AXUIElementSetMessagingTimeout,
-)
-from atomacos import errors
-from objc import callbackFor
-
-PAXObserverCallback = callbackFor(AXObserverCreate)
+from atomacos import _retry, errors, metrics
+from atomacos.backends import get_backend
 
 
+def PAXObserverCallback(function):
+    """
+    Turns a function into a callback that can be passed to PAXObserverCreate
+
+    Args:
+        function: function(observer, element, notification, refcon)
+
+    Returns: the callback
+
+    """
+    return get_backend().observer_callback(function)
+
+
+@metrics.timed("AXObserverCreate")
 def PAXObserverCreate(application, callback):
     """
     Creates a new observer that can receive notifications
@@ -34,7 +32,7 @@ def PAXObserverCreate(application, callback):
     Returns: an AXObserverRef representing the observer object
 
     """
-    error_code, observer = AXObserverCreate(application, callback, None)
+    error_code, observer = get_backend().observer_create(application, callback)
     error_messages = {
         errors.kAXErrorIllegalArgument: "One or more of the arguments is an illegal value",
         errors.kAXErrorFailure: "There is some sort of system memory failure",
@@ -43,6 +41,7 @@ def PAXObserverCreate(application, callback):
     return observer
 
 
+@metrics.timed("AXObserverAddNotification")
 def PAXObserverAddNotification(observer, element, notification, refcon):
     """
     Registers the specified observer to receive notifications from
@@ -55,7 +54,9 @@ def PAXObserverAddNotification(observer, element, notification, refcon):
         refcon: Application-defined data passed to the callback when it is called
 
     """
-    error_code = AXObserverAddNotification(observer, element, notification, refcon)
+    error_code = get_backend().observer_add_notification(
+        observer, element, notification, refcon
+    )
     error_messages = {
         errors.kAXErrorInvalidUIElementObserver: "The observer is not a valid AXObserverRef type.",
         errors.kAXErrorIllegalArgument: "One or more of the arguments is an illegal value or the length of the notification name is greater than 1024.",
@@ -67,6 +68,7 @@ def PAXObserverAddNotification(observer, element, notification, refcon):
     errors.check_ax_error(error_code, error_messages)
 
 
+@metrics.timed("AXObserverRemoveNotification")
 def PAXObserverRemoveNotification(observer, element, notification):
     """
     Removes the specified notification from the list of notifications the
@@ -79,7 +81,9 @@ def PAXObserverRemoveNotification(observer, element, notification):
             the list of observed notifications
 
     """
-    error_code = AXObserverRemoveNotification(observer, element, notification)
+    error_code = get_backend().observer_remove_notification(
+        observer, element, notification
+    )
     error_messages = {
         errors.kAXErrorInvalidUIElementObserver: "The observer is not a valid AXObserverRef type.",
         errors.kAXErrorIllegalArgument: "One or more of the arguments is an illegal value or the length of the notification name is greater than 1024.",
@@ -91,6 +95,8 @@ def PAXObserverRemoveNotification(observer, element, notification):
     errors.check_ax_error(error_code, error_messages)
 
 
+@metrics.timed("AXUIElementCopyAttributeValue")
+@_retry.idempotent
 def PAXUIElementCopyAttributeValue(element, attribute):
     """
     Returns the value of an accessibility object's attribute
@@ -102,7 +108,8 @@ def PAXUIElementCopyAttributeValue(element, attribute):
     Returns: the value associated with the specified attribute
 
     """
-    error_code, attrValue = AXUIElementCopyAttributeValue(element, attribute, None)
+    errors.check_circuit(element)
+    error_code, attrValue = get_backend().copy_attribute_value(element, attribute)
     error_messages = {
         errors.kAXErrorAttributeUnsupported: "The specified AXUIElementRef does not support the specified attribute.",
         errors.kAXErrorNoValue: "The specified attribute does not have a value.",
@@ -111,10 +118,42 @@ def PAXUIElementCopyAttributeValue(element, attribute):
         errors.kAXErrorCannotComplete: "The function cannot complete because messaging has failed in some way.",
         errors.kAXErrorNotImplemented: "The process does not fully support the accessibility API.",
     }
-    errors.check_ax_error(error_code, error_messages)
+    errors.check_ax_error(error_code, error_messages, element)
     return attrValue
 
 
+@metrics.timed("AXUIElementCopyMultipleAttributeValues")
+@_retry.idempotent
+def PAXUIElementCopyMultipleAttributeValues(element, attributes):
+    """
+    Returns the values of several attributes of an accessibility object
+    in a single call
+
+    Args:
+        element: The AXUIElementRef representing the accessibility object
+        attributes: The attribute names
+
+    Returns: the values of the attributes, in order, with None for the
+        attributes which have no value or are not supported
+
+    """
+    errors.check_circuit(element)
+    error_code, values = get_backend().copy_multiple_attribute_values(
+        element, attributes
+    )
+    error_messages = {
+        errors.kAXErrorIllegalArgument: "One or more of the arguments is an illegal value.",
+        errors.kAXErrorInvalidUIElement: "The AXUIElementRef is invalid.",
+        errors.kAXErrorFailure: "There was a system memory failure.",
+        errors.kAXErrorCannotComplete: "The function cannot complete because messaging has failed in some way.",
+        errors.kAXErrorNotImplemented: "The process does not fully support the accessibility API.",
+    }
+    errors.check_ax_error(error_code, error_messages, element)
+    return values
+
+
+@metrics.timed("AXUIElementIsAttributeSettable")
+@_retry.idempotent
 def PAXUIElementIsAttributeSettable(element, attribute):
     """
     Returns whether the specified accessibility object's attribute can be modified
@@ -126,7 +165,8 @@ def PAXUIElementIsAttributeSettable(element, attribute):
     Returns: a Boolean value indicating whether the attribute is settable
 
     """
-    error_code, settable = AXUIElementIsAttributeSettable(element, attribute, None)
+    errors.check_circuit(element)
+    error_code, settable = get_backend().is_attribute_settable(element, attribute)
     error_messages = {
         errors.kAXErrorCannotComplete: "The function cannot complete because messaging has failed in some way (often due to a timeout).",
         errors.kAXErrorIllegalArgument: "One or more of the arguments is an illegal value.",
@@ -135,10 +175,11 @@ def PAXUIElementIsAttributeSettable(element, attribute):
         errors.kAXErrorInvalidUIElement: "The AXUIElementRef is invalid.",
         errors.kAXErrorNotImplemented: "The process does not fully support the accessibility API.",
     }
-    errors.check_ax_error(error_code, error_messages)
+    errors.check_ax_error(error_code, error_messages, element)
     return settable
 
 
+@metrics.timed("AXUIElementSetAttributeValue")
 def PAXUIElementSetAttributeValue(element, attribute, value):
     """
     Sets the accessibility object's attribute to the specified value
@@ -149,7 +190,8 @@ def PAXUIElementSetAttributeValue(element, attribute, value):
         value: The new value for the attribute
 
     """
-    error_code = AXUIElementSetAttributeValue(element, attribute, value)
+    errors.check_circuit(element)
+    error_code = get_backend().set_attribute_value(element, attribute, value)
     error_messages = {
         errors.kAXErrorIllegalArgument: "The value is not recognized by the accessible application or one of the other arguments is an illegal value.",
         errors.kAXErrorAttributeUnsupported: "The specified AXUIElementRef does not support the specified attribute.",
@@ -157,9 +199,11 @@ def PAXUIElementSetAttributeValue(element, attribute, value):
         errors.kAXErrorCannotComplete: "The function cannot complete because messaging has failed in some way.",
         errors.kAXErrorNotImplemented: "The process does not fully support the accessibility API.",
     }
-    errors.check_ax_error(error_code, error_messages)
+    errors.check_ax_error(error_code, error_messages, element)
 
 
+@metrics.timed("AXUIElementCopyAttributeNames")
+@_retry.idempotent
 def PAXUIElementCopyAttributeNames(element):
     """
     Returns a list of all the attributes supported by the specified accessibility object
@@ -170,7 +214,8 @@ def PAXUIElementCopyAttributeNames(element):
     Returns: an array containing the accessibility object's attribute names
 
     """
-    error_code, names = AXUIElementCopyAttributeNames(element, None)
+    errors.check_circuit(element)
+    error_code, names = get_backend().copy_attribute_names(element)
     error_messages = {
         errors.kAXErrorAttributeUnsupported: "The specified AXUIElementRef does not support the specified attribute.",
         errors.kAXErrorIllegalArgument: "One or both of the arguments is an illegal value.",
@@ -179,10 +224,12 @@ def PAXUIElementCopyAttributeNames(element):
         errors.kAXErrorCannotComplete: "The function cannot complete because messaging has failed in some way.",
         errors.kAXErrorNotImplemented: "The process does not fully support the accessibility API.",
     }
-    errors.check_ax_error(error_code, error_messages)
+    errors.check_ax_error(error_code, error_messages, element)
     return names
 
 
+@metrics.timed("AXUIElementCopyActionNames")
+@_retry.idempotent
 def PAXUIElementCopyActionNames(element):
     """
     Returns a list of all the actions the specified accessibility object can perform
@@ -194,7 +241,8 @@ def PAXUIElementCopyActionNames(element):
         (empty if the accessibility object supports no actions)
 
     """
-    error_code, names = AXUIElementCopyActionNames(element, None)
+    errors.check_circuit(element)
+    error_code, names = get_backend().copy_action_names(element)
     error_messages = {
         errors.kAXErrorIllegalArgument: "One or both of the arguments is an illegal value.",
         errors.kAXErrorInvalidUIElement: "The AXUIElementRef is invalid.",
@@ -202,10 +250,11 @@ def PAXUIElementCopyActionNames(element):
         errors.kAXErrorCannotComplete: "The function cannot complete because messaging has failed in some way.",
         errors.kAXErrorNotImplemented: "The process does not fully support the accessibility API.",
     }
-    errors.check_ax_error(error_code, error_messages)
+    errors.check_ax_error(error_code, error_messages, element)
     return names
 
 
+@metrics.timed("AXUIElementPerformAction")
 def PAXUIElementPerformAction(element, action):
     """
     Requests that the specified accessibility object perform the specified action
@@ -215,7 +264,8 @@ def PAXUIElementPerformAction(element, action):
         action: The action to be performed
 
     """
-    error_code = AXUIElementPerformAction(element, action)
+    errors.check_circuit(element)
+    error_code = get_backend().perform_action(element, action)
     error_messages = {
         errors.kAXErrorActionUnsupported: "The specified AXUIElementRef does not support the specified action (you will also receive this error if you pass in the system-wide accessibility object).",
         errors.kAXErrorIllegalArgument: "One or more of the arguments is an illegal value.",
@@ -223,9 +273,10 @@ def PAXUIElementPerformAction(element, action):
         errors.kAXErrorCannotComplete: "The function cannot complete because messaging has failed in some way or the application has not yet responded.",
         errors.kAXErrorNotImplemented: "The process does not fully support the accessibility API.",
     }
-    errors.check_ax_error(error_code, error_messages)
+    errors.check_ax_error(error_code, error_messages, element)
 
 
+@metrics.timed("AXUIElementGetPid")
 def PAXUIElementGetPid(element):
     """
     Returns the process ID associated with the specified accessibility object
@@ -236,7 +287,7 @@ def PAXUIElementGetPid(element):
     Returns: the process ID associated with the specified accessibility object
 
     """
-    error_code, pid = AXUIElementGetPid(element, None)
+    error_code, pid = get_backend().get_pid(element)
     error_messages = {
         errors.kAXErrorIllegalArgument: "One or more of the arguments is an illegal value.",
         errors.kAXErrorInvalidUIElement: "The AXUIElementRef is invalid.",
@@ -245,6 +296,8 @@ def PAXUIElementGetPid(element):
     return pid
 
 
+@metrics.timed("AXUIElementCopyElementAtPosition")
+@_retry.idempotent
 def PAXUIElementCopyElementAtPosition(application, x, y):
     """
     Returns the accessibility object at the specified position in
@@ -259,7 +312,8 @@ def PAXUIElementCopyElementAtPosition(application, x, y):
     Returns: the accessibility object at the position specified by x and y
 
     """
-    error_code, element = AXUIElementCopyElementAtPosition(application, x, y, None)
+    errors.check_circuit(application)
+    error_code, element = get_backend().copy_element_at_position(application, x, y)
     error_messages = {
         errors.kAXErrorNoValue: "There is no accessibility object at the specified position.",
         errors.kAXErrorIllegalArgument: "One or more of the arguments is an illegal value.",
@@ -267,10 +321,11 @@ def PAXUIElementCopyElementAtPosition(application, x, y):
         errors.kAXErrorCannotComplete: "The function cannot complete because messaging has failed in some way.",
         errors.kAXErrorNotImplemented: "The process does not fully support the accessibility API.",
     }
-    errors.check_ax_error(error_code, error_messages)
+    errors.check_ax_error(error_code, error_messages, application)
     return element
 
 
+@metrics.timed("AXUIElementSetMessagingTimeout")
 def PAXUIElementSetMessagingTimeout(element, timeoutInSeconds):
     """
     Sets the timeout value used in the accessibility API
@@ -280,7 +335,7 @@ def PAXUIElementSetMessagingTimeout(element, timeoutInSeconds):
         timeoutInSeconds: The number of seconds for the new timeout value
 
     """
-    error_code = AXUIElementSetMessagingTimeout(element, timeoutInSeconds)
+    error_code = get_backend().set_messaging_timeout(element, timeoutInSeconds)
     error_messages = {
         errors.kAXErrorIllegalArgument: "One or more of the arguments is an illegal value (timeout values must be positive).",
         errors.kAXErrorInvalidUIElement: "The AXUIElementRef is invalid.",
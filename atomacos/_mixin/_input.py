@@ -1,4 +1,11 @@
-from atomacos import keyboard, mouse
+import time
+
+from atomacos import _a11y
+from atomacos._input_backend import get_event_backend, get_input_backend
+from atomacos._trace import api_call
+from atomacos.errors import AXError, AXErrorUnsupported
+
+TEXT_STRATEGIES = ("ax_value", "unicode", "paste")
 
 
 class Mouse(object):
@@ -10,8 +17,7 @@ class Mouse(object):
                     interval to send event of btn down, drag and up
         Returns: None
         """
-        mouse.moveTo(*coord)
-        mouse.dragTo(*dest_coord, duration=interval, button="left")
+        get_input_backend().drag(coord, dest_coord, button="left", duration=interval)
 
     def doubleClickDragMouseButtonLeft(self, coord, dest_coord, interval=0.5):
         """Double-click and drag the left mouse button without modifiers
@@ -22,8 +28,9 @@ class Mouse(object):
                     interval to send event of btn down, drag and up
         Returns: None
         """
-        mouse.click(*coord)
-        mouse.dragTo(*dest_coord, duration=interval, button="left")
+        get_input_backend().drag(
+            coord, dest_coord, button="left", duration=interval, clicks=2
+        )
 
     def clickMouseButtonLeft(self, coord, interval=0.0, clicks=1):
         """Click the left mouse button without modifiers pressed.
@@ -31,7 +38,9 @@ class Mouse(object):
         Parameters: coordinates to click on screen (tuple (x, y))
         Returns: None
         """
-        mouse.click(*coord, interval=interval, button="left", clicks=clicks)
+        get_input_backend().click(
+            coord, button="left", clicks=clicks, interval=interval
+        )
 
     def clickMouseButtonRight(self, coord, interval=0.0):
         """Click the right mouse button without modifiers pressed.
@@ -39,7 +48,7 @@ class Mouse(object):
         Parameters: coordinates to click on scren (tuple (x, y))
         Returns: None
         """
-        mouse.click(*coord, interval=interval, button="right")
+        get_input_backend().click(coord, button="right", interval=interval)
 
     def clickMouseButtonLeftWithMods(self, coord, modifiers, interval=None, clicks=1):
         """Click the left mouse button with modifiers pressed.
@@ -49,9 +58,10 @@ class Mouse(object):
         Returns: None
         """
         kb = Keyboard()
-        kb.pressModifiers(modifiers)
-        self.clickMouseButtonLeft(coord, interval=interval, clicks=clicks)
-        kb.releaseModifiers(modifiers)
+        with get_input_backend().batch():
+            kb.pressModifiers(modifiers)
+            self.clickMouseButtonLeft(coord, interval=interval, clicks=clicks)
+            kb.releaseModifiers(modifiers)
 
     def clickMouseButtonRightWithMods(self, coord, modifiers, interval=None):
         """Click the right mouse button with modifiers pressed.
@@ -60,9 +70,10 @@ class Mouse(object):
         Returns: None
         """
         kb = Keyboard()
-        kb.pressModifiers(modifiers)
-        self.clickMouseButtonRight(coord, interval=interval)
-        kb.releaseModifiers(modifiers)
+        with get_input_backend().batch():
+            kb.pressModifiers(modifiers)
+            self.clickMouseButtonRight(coord, interval=interval)
+            kb.releaseModifiers(modifiers)
 
     def leftMouseDragged(self, stopCoord, strCoord=(0, 0), speed=1):
         """Click the left mouse button and drag object.
@@ -74,7 +85,7 @@ class Mouse(object):
         Returns: None
         """
         if strCoord == (0, 0):
-            strCoord = mouse.position()
+            strCoord = get_input_backend().position()
         self.dragMouseButtonLeft(coord=strCoord, dest_coord=stopCoord, interval=speed)
 
     def doubleClickMouse(self, coord):
@@ -83,7 +94,7 @@ class Mouse(object):
         Parameters: coordinates to click (assume primary is left button)
         Returns: None
         """
-        mouse.doubleClick(*coord, button="left")
+        get_input_backend().double_click(coord, button="left")
 
     def doubleMouseButtonLeftWithMods(self, coord, modifiers):
         """Click the left mouse button with modifiers pressed.
@@ -92,9 +103,11 @@ class Mouse(object):
         Returns: None
         """
         kb = Keyboard()
-        kb.pressModifiers(modifiers)
-        mouse.doubleClick(*coord, button="left")
-        kb.releaseModifiers(modifiers)
+        backend = get_input_backend()
+        with backend.batch():
+            kb.pressModifiers(modifiers)
+            backend.double_click(coord, button="left")
+            kb.releaseModifiers(modifiers)
 
     def tripleClickMouse(self, coord):
         """Triple-click primary mouse button.
@@ -102,13 +115,13 @@ class Mouse(object):
         Parameters: coordinates to click (assume primary is left button)
         Returns: None
         """
-        mouse.tripleClick(*coord, button="left")
+        get_input_backend().triple_click(coord, button="left")
 
 
 class Keyboard(object):
     def sendKey(self, keychr):
         """Send one character with no modifiers."""
-        keyboard.press(keychr)
+        get_input_backend().press(keychr)
 
     def sendKeyWithModifiers(self, keychr, modifiers):
         """Send one character with modifiers pressed
@@ -116,9 +129,10 @@ class Keyboard(object):
         Parameters: key character, modifiers (list) (e.g. ["shift"] or
                     ["command", "shift"]
         """
-        self.pressModifiers(modifiers)
-        self.sendKey(keychr)
-        self.releaseModifiers(modifiers)
+        with get_input_backend().batch():
+            self.pressModifiers(modifiers)
+            self.sendKey(keychr)
+            self.releaseModifiers(modifiers)
 
     def sendGlobalKey(self, keychr):
         """Send one character without modifiers to the system.
@@ -139,17 +153,94 @@ class Keyboard(object):
 
     def sendKeys(self, keystr):
         """Send a series of characters with no modifiers."""
-        keyboard.typewrite(keystr)
+        get_input_backend().typewrite(keystr)
+
+    @api_call
+    def enter_text(self, text, strategy="auto", verify_timeout=0.5):
+        """Replace the text of the element with the given text.
+
+        Strategies, tried in this order with "auto":
+            ax_value: set AXValue directly, if the attribute is settable
+            unicode: select all and type with keyboard events carrying up
+                to 20 UTF-16 units each
+            paste: select all and paste from the general pasteboard,
+                which loses its previous contents
+
+        With "auto", a strategy whose result does not show up in AXValue
+        within verify_timeout seconds makes way for the next one.
+
+        Returns: the name of the strategy that entered the text
+        """
+        if strategy == "auto":
+            strategies = TEXT_STRATEGIES
+        elif strategy in TEXT_STRATEGIES:
+            strategies = (strategy,)
+        else:
+            raise ValueError("Unknown text entry strategy: %s" % strategy)
+
+        for name in strategies:
+            entered = getattr(self, "_enter_text_%s" % name)(text)
+            if entered and (
+                strategy != "auto" or self._text_entered(text, verify_timeout)
+            ):
+                return name
+        raise AXErrorUnsupported("Could not enter text with strategy %s" % strategy)
+
+    def _enter_text_ax_value(self, text):
+        if not self._is_ax_attribute_settable("AXValue"):
+            return False
+        self._set_ax_attribute("AXValue", text)
+        return True
+
+    def _enter_text_unicode(self, text):
+        self._focus_for_typing()
+        backend = get_event_backend()
+        with backend.batch():
+            backend.key_down("command")
+            backend.press("a")
+            backend.key_up("command")
+            backend.type_unicode(text)
+        return True
+
+    def _enter_text_paste(self, text):
+        self._focus_for_typing()
+        _a11y.set_pasteboard_text(text)
+        with get_input_backend().batch():
+            self.sendKeyWithModifiers("a", ["command"])
+            self.sendKeyWithModifiers("v", ["command"])
+        return True
+
+    def _focus_for_typing(self):
+        self._ensure_active()
+        if self._is_ax_attribute_settable("AXFocused"):
+            self._set_ax_attribute("AXFocused", True)
+
+    def _text_entered(self, text, timeout):
+        """Wait until AXValue shows text, if the element has an AXValue"""
+        if "AXValue" not in self.ax_attributes:
+            return True
+        end_time = time.time() + timeout
+        while True:
+            try:
+                if self._get_ax_attribute("AXValue") == text:
+                    return True
+            except AXError:
+                return True
+            if time.time() >= end_time:
+                return False
+            time.sleep(0.01)
 
     def pressModifiers(self, modifiers):
         """Hold modifier keys (e.g. [Option])."""
+        backend = get_input_backend()
         for modifier in modifiers:
-            keyboard.keyDown(modifier)
+            backend.key_down(modifier)
 
     def releaseModifiers(self, modifiers):
         """Release modifier keys (e.g. [Option])."""
+        backend = get_input_backend()
         for modifier in modifiers:
-            keyboard.keyUp(modifier)
+            backend.key_up(modifier)
 
 
 class KeyboardMouseMixin(Mouse, Keyboard):
@@ -1,8 +1,16 @@
-from atomacos import AXCallbacks
+from atomacos import AXCallbacks, _slowlog
+from atomacos._trace import api_call
+
+# Attributes listing the elements of a role in a single call, used by the
+# convenience methods of the elements supporting them. Only AXWindows lists
+# exactly the children of its role: windows are children of the application
+# and of nothing else. AXRows and AXTabs hold elements which are not
+# children, and AXTabs leaves out radio buttons which are not tabs.
+RELATIONSHIPS = {"AXWindow": "AXWindows"}
 
 
 class SearchMethodsMixin(object):
-    def _generateChildren(self, target=None, recursive=False):
+    def _generateChildren(self, target=None, recursive=False, depth=1):
         """Generator which yields all AXChildren of the object."""
         if target is None:
             target = self
@@ -11,43 +19,70 @@ class SearchMethodsMixin(object):
             return
 
         for child in target.AXChildren:
+            if _slowlog.active:
+                _slowlog.visit(depth)
             yield child
             if recursive:
-                for c in self._generateChildren(child, recursive):
+                for c in self._generateChildren(child, recursive, depth + 1):
                     yield c
 
-    def _findAll(self, recursive=False, **kwargs):
+    def _generateVisibleChildren(self, recursive=False):
+        """Generator which yields the AXChildren of the object which were on
+        screen, from their stored AXPosition and AXSize."""
+        from atomacos import _visible
+
+        return _visible.stored_visible_children(self, recursive)
+
+    def _findAll(self, recursive=False, visible_only=False, **kwargs):
         """Return a list of all children that match the specified criteria."""
-        return filter(
-            AXCallbacks.match_filter(**kwargs),
-            self._generateChildren(recursive=recursive),
-        )
+        if visible_only:
+            children = self._generateVisibleChildren(recursive=recursive)
+        else:
+            children = self._generateChildren(recursive=recursive)
+        return filter(AXCallbacks.match_filter(**kwargs), children)
 
     def _findFirst(self, recursive=False, **kwargs):
         """Return the first object that matches the criteria."""
         for item in self._findAll(recursive=recursive, **kwargs):
             return item
 
+    @api_call
     def findFirst(self, **kwargs):
         """Return the first object that matches the criteria."""
         return self._findFirst(**kwargs)
 
+    @api_call
     def findFirstR(self, **kwargs):
         """Search recursively for the first object that matches the
-        criteria.
+        criteria. Pass visible_only=True to skip the elements which are not
+        on screen.
         """
         return self._findFirst(recursive=True, **kwargs)
 
+    @api_call
     def findAll(self, **kwargs):
         """Return a list of all children that match the specified criteria."""
         return list(self._findAll(**kwargs))
 
+    @api_call
     def findAllR(self, **kwargs):
         """Return a list of all children (recursively) that match
-        the specified criteria.
+        the specified criteria. Pass visible_only=True to skip the elements
+        which are not on screen.
         """
         return list(self._findAll(recursive=True, **kwargs))
 
+    def _related(self, role, kwargs):
+        """Return the elements of the relationship attribute of role
+        matching kwargs, or None if the element does not support it"""
+        name = RELATIONSHIPS.get(role)
+        if name is None or name not in self.ax_attributes:
+            return None
+        related = getattr(self, name, None)
+        if related is None:
+            return None
+        return list(filter(AXCallbacks.match_filter(AXRole=role, **kwargs), related))
+
     def _convenienceMatch(self, role, attr, match):
         """Method used by role based convenience functions to find a match"""
         kwargs = {}
@@ -55,6 +90,9 @@ class SearchMethodsMixin(object):
         # supply that in the kwargs
         if match:
             kwargs[attr] = match
+        related = self._related(role, kwargs)
+        if related is not None:
+            return related
         return self.findAll(AXRole=role, **kwargs)
 
     def _convenienceMatchR(self, role, attr, match):
@@ -64,6 +102,9 @@ class SearchMethodsMixin(object):
         # supply that in the kwargs
         if match:
             kwargs[attr] = match
+        related = self._related(role, kwargs)
+        if related is not None:
+            return related
         return self.findAllR(AXRole=role, **kwargs)
 
     def textAreas(self, match=None):
@@ -162,6 +203,7 @@ class SearchMethodsMixin(object):
         """Return a list of sliders with an optional match parameter."""
         return self._convenienceMatchR("AXSlider", "AXValue", match)
 
+    @api_call
     def _menuItem(self, menuitem, *args):
         """Return the specified menu item.
 
@@ -178,7 +220,7 @@ class SearchMethodsMixin(object):
 
         app._menuitem(app.AXMenuBar, 1, 'About TextEdit').Press()
         """
-        self._activate()
+        self._ensure_active()
         for item in args:
             # If the item has an AXMenu as a child, navigate into it.
             # This seems like a silly abstraction added by apple's a11y api.
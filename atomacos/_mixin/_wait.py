@@ -1,8 +1,10 @@
 from atomacos import AXCallbacks
 from atomacos._notification import Observer
+from atomacos._trace import api_call
 
 
 class WaitForMixin(object):
+    @api_call
     def waitFor(self, timeout, notification, **kwargs):
         """Generic wait for a UI event that matches the specified
         criteria to occur.
@@ -0,0 +1,124 @@
+"""Retry reads which fail with a transient error"""
+import functools
+import logging
+import random
+import time
+
+from atomacos import metrics
+from atomacos.errors import (
+    AXErrorAppNotResponding,
+    AXErrorCannotComplete,
+    AXErrorTimeout,
+)
+
+logger = logging.getLogger("atomacos.retry")
+
+policy = None
+
+
+class RetryPolicy(object):
+    """How often and how long to retry a read.
+
+    Args:
+        attempts: the number of attempts, the first one included
+        backoff: seconds to wait before the first retry
+        max_backoff: the longest wait between two attempts
+        multiplier: the factor applied to the wait after every retry
+        jitter: the share of every wait drawn at random, from 0 to 1
+        deadline: seconds after which no retry starts, from the first attempt
+    """
+
+    def __init__(
+        self,
+        attempts=3,
+        backoff=0.01,
+        max_backoff=0.05,
+        multiplier=2.0,
+        jitter=0.5,
+        deadline=1.0,
+    ):
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.deadline = deadline
+
+    def delay(self, retry):
+        """Return the seconds to wait before retry number retry, from 1"""
+        delay = min(self.backoff * self.multiplier ** (retry - 1), self.max_backoff)
+        return delay - delay * self.jitter * random.random()
+
+    def call(self, name, function, args):
+        start = time.perf_counter()
+        attempt = 1
+        while True:
+            attempt_start = time.perf_counter()
+            try:
+                return function(*args)
+            except (AXErrorAppNotResponding, AXErrorTimeout):
+                # Already given up on by the breaker or the app workers
+                raise
+            except AXErrorCannotComplete as e:
+                now = time.perf_counter()
+                delay = self.delay(attempt)
+                if attempt >= self.attempts or now + delay - start > self.deadline:
+                    raise
+                logger.info(
+                    "Retrying %s after %s (attempt %d of %d): the attempt took "
+                    "%.1f ms, waiting %.1f ms",
+                    name,
+                    e.__class__.__name__,
+                    attempt + 1,
+                    self.attempts,
+                    (now - attempt_start) * 1000,
+                    delay * 1000,
+                    extra={
+                        "retry": {
+                            "call": name,
+                            "attempt": attempt + 1,
+                            "cost": now - attempt_start,
+                            "delay": delay,
+                        }
+                    },
+                )
+                metrics.count_retry(name)
+                time.sleep(delay)
+                attempt += 1
+
+
+def idempotent(function):
+    """Retry the decorated read according to the retry policy, if any"""
+    name = function.__name__.lstrip("P")
+
+    @functools.wraps(function)
+    def wrapper(*args):
+        current = policy
+        if current is None:
+            return function(*args)
+        return current.call(name, function, args)
+
+    return wrapper
+
+
+def set_retry_policy(attempts=3, backoff=0.01, max_backoff=0.05, deadline=1.0):
+    """Retry the reads which fail with AXErrorCannotComplete, or stop
+    retrying them with attempts=None. Actions and attribute changes are
+    never retried, and every retry is logged on the atomacos.retry logger.
+
+    Args:
+        attempts: the number of attempts, the first one included
+        backoff: seconds to wait before the first retry, doubled after
+            every retry up to max_backoff, less up to half of it at random
+        deadline: seconds after which no retry starts
+
+    Returns: the RetryPolicy, or None
+    """
+    global policy
+    if attempts is None:
+        policy = None
+    else:
+        policy = RetryPolicy(
+            attempts, backoff=backoff, max_backoff=max_backoff, deadline=deadline
+        )
+    return policy
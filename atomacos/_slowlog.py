@@ -0,0 +1,146 @@
+"""Log searches and waits which take longer than a threshold"""
+import logging
+import threading
+import time
+
+from atomacos.errors import AXError
+
+logger = logging.getLogger("atomacos.slow_search")
+
+# Calls watched when a threshold is set
+WATCHED = ("findFirst", "findFirstR", "findAll", "findAllR", "menuItem", "waitFor")
+
+threshold = None
+# Number of watches running in any thread, checked before counting so that
+# nothing but a global lookup is done when nothing is watched
+active = 0
+
+_local = threading.local()
+_lock = threading.Lock()
+
+
+class SearchStats(object):
+    __slots__ = ("nodes", "attributes", "max_depth")
+
+    def __init__(self):
+        self.nodes = 0
+        self.attributes = 0
+        self.max_depth = 0
+
+    def visit(self, depth):
+        self.nodes += 1
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+
+def current():
+    """Return the stats of the search running in this thread, if any"""
+    if not active:
+        return None
+    return getattr(_local, "stats", None)
+
+
+def visit(depth):
+    """Count a node visited by the search running in this thread"""
+    stats = getattr(_local, "stats", None)
+    if stats is not None:
+        stats.visit(depth)
+
+
+def count_attribute():
+    """Count an attribute fetched by the search running in this thread"""
+    stats = getattr(_local, "stats", None)
+    if stats is not None:
+        stats.attributes += 1
+
+
+class watch(object):
+    """Measure a call, logging it if it takes longer than the threshold.
+
+    Calls made inside a watched call count towards the outermost one.
+    """
+
+    def __init__(self, name, args, kwargs):
+        self.name = name
+        self.args = args
+        self.kwargs = kwargs
+
+    def __enter__(self):
+        global active
+        self.outermost = getattr(_local, "stats", None) is None
+        if self.outermost:
+            _local.stats = SearchStats()
+            with _lock:
+                active += 1
+            self.start = time.perf_counter()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        global active
+        if not self.outermost:
+            return False
+        elapsed = time.perf_counter() - self.start
+        stats = _local.stats
+        _local.stats = None
+        with _lock:
+            active -= 1
+        limit = threshold
+        if limit is not None and elapsed >= limit:
+            self._log(stats, elapsed)
+        return False
+
+    def _log(self, stats, elapsed):
+        criteria = dict(self.kwargs)
+        if len(self.args) > 1:
+            criteria["args"] = self.args[1:]
+        root = self.args[0] if self.args else None
+        pid, role = _describe(root)
+        search = {
+            "call": self.name,
+            "criteria": criteria,
+            "root": root,
+            "pid": pid,
+            "role": role,
+            "nodes_visited": stats.nodes,
+            "attributes_fetched": stats.attributes,
+            "max_depth": stats.max_depth,
+            "wall_time": elapsed,
+        }
+        logger.warning(
+            "Slow %s took %.3f s: criteria=%r pid=%s role=%s nodes=%d "
+            "attributes=%d depth=%d",
+            self.name,
+            elapsed,
+            criteria,
+            pid,
+            role,
+            stats.nodes,
+            stats.attributes,
+            stats.max_depth,
+            extra={"search": search},
+        )
+
+
+def _describe(root):
+    """Return the pid of root and its role if it is known without asking
+    the application, which was too slow already"""
+    try:
+        # The pid is kept in the reference, reading it sends no message
+        pid = getattr(root, "pid", None)
+    except AXError:
+        pid = None
+    attributes = getattr(root, "__dict__", {}).get("attributes")
+    role = attributes.get("AXRole") if isinstance(attributes, dict) else None
+    return pid, role
+
+
+def set_slow_search_threshold(seconds):
+    """Log searches and waits taking longer than seconds, or stop logging
+    them with None. The warnings of the atomacos.slow_search logger carry
+    the criteria and the counts of the search in their search attribute.
+
+    Returns: the previous threshold
+    """
+    global threshold
+    previous = threshold
+    threshold = seconds
+    return previous
@@ -0,0 +1,298 @@
+"""Local models of element trees, kept up to date from notifications"""
+import collections
+import itertools
+
+from atomacos import _dump
+from atomacos._macos import (
+    PAXObserverAddNotification,
+    PAXObserverCallback,
+    PAXObserverCreate,
+    PAXObserverRemoveNotification,
+    PAXUIElementCopyAttributeValue,
+    PAXUIElementCopyMultipleAttributeValues,
+)
+from atomacos.backends import get_backend
+from atomacos.errors import AXError, AXErrorInvalidUIElement
+
+NOTIFICATIONS = (
+    "AXCreated",
+    "AXUIElementDestroyed",
+    "AXValueChanged",
+    "AXTitleChanged",
+    "AXMoved",
+    "AXResized",
+)
+
+# Notifications after which the frames of the descendants change too
+FRAME_NOTIFICATIONS = ("AXMoved", "AXResized")
+FRAME_ATTRIBUTES = ["AXPosition", "AXSize"]
+
+
+class SnapshotNode(_dump.DumpedElement):
+    """An element of a snapshot, along with its reference"""
+
+    def __init__(self, id, ref, pid, depth, attributes, parent=None):
+        super(SnapshotNode, self).__init__(id, pid, depth, attributes, parent)
+        self.ref = ref
+
+
+class Snapshot(_dump.Dump):
+    """The tree below an element, with the search methods of a dump.
+
+    Args:
+        element: the element at the root of the snapshot
+        attributes: the attributes to keep, or None for all of them
+    """
+
+    def __init__(self, element, attributes=None):
+        super(Snapshot, self).__init__()
+        self.attribute_names = attributes
+        self.pid = element.pid
+        self.pending = collections.deque()
+        self._ids = itertools.count(1)
+        self._refs = {}
+        self._observer = None
+        self._registered = []
+        root = self._crawl(element.ref, None)
+        if root is not None:
+            self.roots.append(root)
+        self._subscribe()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def node(self, ref):
+        """Return the node of an element reference, or None"""
+        try:
+            return self._refs.get(ref)
+        except TypeError:
+            pass
+        # Unhashable reference, compare with every known element
+        backend = get_backend()
+        for node in self.nodes.values():
+            if backend.refs_equal(node.ref, ref):
+                return node
+        return None
+
+    def _crawl(self, ref, parent):
+        """Read the subtree of ref below parent, returning its node"""
+        depth = parent.depth + 1 if parent is not None else 0
+        stack = [(ref, parent, depth)]
+        top = None
+        while stack:
+            ref, parent, depth = stack.pop()
+            try:
+                values, children = _dump._read(ref, self.attribute_names)
+            except AXErrorInvalidUIElement:
+                continue
+            node = SnapshotNode(next(self._ids), ref, self.pid, depth, values, parent)
+            self._add(node)
+            if parent is not None:
+                parent.children.append(node)
+            if top is None:
+                top = node
+            for child in reversed(children):
+                stack.append((child, node, depth + 1))
+        return top
+
+    def _add(self, node):
+        self.nodes[node.id] = node
+        try:
+            self._refs[node.ref] = node
+        except TypeError:
+            pass
+
+    def _remove(self, node):
+        """Drop node and its subtree, returning the number of nodes dropped"""
+        if node.parent is not None and node in node.parent.children:
+            node.parent.children.remove(node)
+        elif node in self.roots:
+            self.roots.remove(node)
+        removed = 0
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            del self.nodes[node.id]
+            try:
+                if self._refs.get(node.ref) is node:
+                    del self._refs[node.ref]
+            except TypeError:
+                pass
+            stack.extend(node.children)
+            removed += 1
+        return removed
+
+    def _subscribe(self):
+        @PAXObserverCallback
+        def _callback(observer, element, notification, refcon):
+            self.pending.append((notification, element))
+
+        self._observer = PAXObserverCreate(self.pid, _callback)
+        self._application = get_backend().create_application(self.pid)
+        for notification in NOTIFICATIONS:
+            try:
+                PAXObserverAddNotification(
+                    self._observer, self._application, notification, id(self)
+                )
+            except AXError:
+                # Not every application sends every notification
+                continue
+            self._registered.append(notification)
+
+    def close(self):
+        """Stop receiving notifications"""
+        for notification in self._registered:
+            try:
+                PAXObserverRemoveNotification(
+                    self._observer, self._application, notification
+                )
+            except AXError:
+                pass
+        self._registered = []
+
+    def refresh(self):
+        """Apply the notifications received since the last refresh.
+
+        Destroyed elements are dropped without any call, the children of
+        the nearest known ancestor of a created element are read again, and
+        changed elements are read again once, however many notifications
+        they sent.
+
+        Returns: a Counter of the nodes "added", "removed" and "updated"
+        """
+        get_backend().run_observer(self._observer, 0, lambda: False)
+        created = []
+        destroyed = []
+        changed = []
+        moved = []
+        while self.pending:
+            notification, ref = self.pending.popleft()
+            if notification == "AXCreated":
+                created.append(ref)
+            elif notification == "AXUIElementDestroyed":
+                destroyed.append(ref)
+            else:
+                changed.append(ref)
+                if notification in FRAME_NOTIFICATIONS:
+                    moved.append(ref)
+        counts = collections.Counter()
+        for ref in destroyed:
+            node = self.node(ref)
+            if node is not None:
+                counts["removed"] += self._remove(node)
+        refreshed = set()
+        for ref in created:
+            if self.node(ref) is not None:
+                continue
+            ancestor = self._known_ancestor(ref)
+            if ancestor is not None and ancestor.id not in refreshed:
+                refreshed.add(ancestor.id)
+                self._update_children(ancestor, counts)
+        for ref in changed:
+            node = self.node(ref)
+            if node is None or node.id in refreshed:
+                continue
+            refreshed.add(node.id)
+            try:
+                node.attributes = _dump._read(ref, self.attribute_names)[0]
+            except AXErrorInvalidUIElement:
+                counts["removed"] += self._remove(node)
+                continue
+            counts["updated"] += 1
+        framed = set()
+        for ref in moved:
+            node = self.node(ref)
+            if node is not None:
+                self._update_frames(node, refreshed, framed, counts)
+        return counts
+
+    def _update_frames(self, node, refreshed, framed, counts):
+        """Read the frames of the descendants of node again: they move with
+        it, without notifications of their own"""
+        names = [
+            name
+            for name in FRAME_ATTRIBUTES
+            if self.attribute_names is None or name in self.attribute_names
+        ]
+        if not names:
+            return
+        backend = get_backend()
+        stack = list(node.children)
+        while stack:
+            node = stack.pop()
+            if node.id in framed:
+                continue
+            framed.add(node.id)
+            if node.id not in refreshed:
+                try:
+                    values = PAXUIElementCopyMultipleAttributeValues(node.ref, names)
+                except AXErrorInvalidUIElement:
+                    counts["removed"] += self._remove(node)
+                    continue
+                frame = {
+                    name: _dump._json_value(backend, value)
+                    for name, value in zip(names, values)
+                    if value is not None
+                }
+                if any(node.attributes.get(k) != v for k, v in frame.items()):
+                    node.attributes.update(frame)
+                    counts["updated"] += 1
+            stack.extend(node.children)
+
+    def _known_ancestor(self, ref):
+        """Return the node of the nearest ancestor of ref in the snapshot"""
+        while True:
+            try:
+                ref = PAXUIElementCopyAttributeValue(ref, "AXParent")
+            except AXError:
+                return None
+            if ref is None:
+                return None
+            node = self.node(ref)
+            if node is not None:
+                return node
+
+    def _update_children(self, node, counts):
+        """Read the attributes and children of node again, reading the
+        subtrees of new children and dropping those of missing ones"""
+        try:
+            node.attributes, children = _dump._read(node.ref, self.attribute_names)
+        except AXErrorInvalidUIElement:
+            counts["removed"] += self._remove(node)
+            return
+        counts["updated"] += 1
+        previous = node.children
+        node.children = []
+        kept = set()
+        for ref in children:
+            child = self.node(ref)
+            if child is None:
+                before = len(self.nodes)
+                self._crawl(ref, node)
+                counts["added"] += len(self.nodes) - before
+                continue
+            if child.parent is not node:
+                self._move(child, node)
+            node.children.append(child)
+            kept.add(child.id)
+        for child in previous:
+            if child.id not in kept:
+                child.parent = None
+                counts["removed"] += self._remove(child)
+
+    def _move(self, node, parent):
+        """Move node and its subtree from its parent to parent"""
+        if node.parent is not None and node in node.parent.children:
+            node.parent.children.remove(node)
+        elif node in self.roots:
+            self.roots.remove(node)
+        node.parent = parent
+        stack = [(node, parent.depth + 1)]
+        while stack:
+            node, depth = stack.pop()
+            node.depth = depth
+            stack.extend((child, depth + 1) for child in node.children)
@@ -0,0 +1,410 @@
+"""Compact binary snapshots of element trees, read through a memory map"""
+import fnmatch
+import functools
+import json
+import math
+import mmap
+import struct
+
+from atomacos import AXCallbacks, _dump, _visible
+from atomacos._mixin._search import SearchMethodsMixin
+
+# After the header: the node records, in the order the elements were
+# dumped, the attribute records, the string ids of the roles, and the
+# string table of (offset, length) pairs followed by the UTF-8 data
+MAGIC = b"AXSNAP\x00\x01"
+VERSION = 1
+
+# magic, version, nodes, attributes, strings, roles, first root
+HEADER = struct.Struct("<8sIIIIIi")
+# parent, first child, next sibling, role, pid, x, y, width, height,
+# first attribute, attribute count
+NODE = struct.Struct("<iiiIiddddII")
+# name, type, value
+ATTRIBUTE = struct.Struct("<IId")
+STRING = struct.Struct("<II")
+
+# Types of attribute values
+NONE, BOOL, INT, FLOAT, STRING_ID, JSON_ID = range(6)
+
+# Attributes kept in the node records rather than as attributes
+_NODE_ATTRIBUTES = ("AXRole", "AXPosition", "AXSize")
+
+_NAN = float("nan")
+
+
+class SnapshotError(Exception):
+    pass
+
+
+class SnapshotWriter(object):
+    """Builds a snapshot from dump records, see _dump.dump_records"""
+
+    def __init__(self):
+        self.nodes = []
+        self.attributes = bytearray()
+        self.attribute_count = 0
+        self.strings = []
+        self.string_ids = {}
+        self.roles = set()
+        self.first_root = -1
+        self._indices = {}
+        self._last_child = {}
+
+    def intern(self, string):
+        try:
+            return self.string_ids[string]
+        except KeyError:
+            self.string_ids[string] = len(self.strings)
+            self.strings.append(string)
+            return len(self.strings) - 1
+
+    def add(self, record):
+        """Add a node record; parents must come before their children"""
+        if "id" not in record:
+            return
+        index = len(self.nodes)
+        self._indices[record["id"]] = index
+        parent = self._indices.get(record["parent"], -1)
+        attributes = record["attributes"]
+        role = self.intern(attributes.get("AXRole") or "")
+        self.roles.add(role)
+        frame = _frame(attributes.get("AXPosition"), attributes.get("AXSize"))
+        first_attribute = self.attribute_count
+        for name, value in attributes.items():
+            if name in _NODE_ATTRIBUTES:
+                continue
+            self.attributes += ATTRIBUTE.pack(self.intern(name), *self._value(value))
+            self.attribute_count += 1
+        self.nodes.append(
+            [
+                parent,
+                -1,
+                -1,
+                role,
+                record["pid"],
+                frame[0],
+                frame[1],
+                frame[2],
+                frame[3],
+                first_attribute,
+                self.attribute_count - first_attribute,
+            ]
+        )
+        # Link the node after the last child of its parent, or root
+        previous = self._last_child.get(parent)
+        if previous is not None:
+            self.nodes[previous][2] = index
+        elif parent >= 0:
+            self.nodes[parent][1] = index
+        else:
+            self.first_root = index
+        self._last_child[parent] = index
+
+    def _value(self, value):
+        if value is None:
+            return NONE, 0.0
+        if isinstance(value, bool):
+            return BOOL, float(value)
+        if isinstance(value, int) and abs(value) < 2**53:
+            return INT, float(value)
+        if isinstance(value, float):
+            return FLOAT, value
+        if isinstance(value, str):
+            return STRING_ID, float(self.intern(value))
+        return JSON_ID, float(self.intern(json.dumps(value)))
+
+    def write(self, stream):
+        roles = sorted(self.roles)
+        stream.write(
+            HEADER.pack(
+                MAGIC,
+                VERSION,
+                len(self.nodes),
+                self.attribute_count,
+                len(self.strings),
+                len(roles),
+                self.first_root,
+            )
+        )
+        for node in self.nodes:
+            stream.write(NODE.pack(*node))
+        stream.write(bytes(self.attributes))
+        stream.write(struct.pack("<%dI" % len(roles), *roles))
+        data = [string.encode("utf-8") for string in self.strings]
+        offset = 0
+        for encoded in data:
+            stream.write(STRING.pack(offset, len(encoded)))
+            offset += len(encoded)
+        for encoded in data:
+            stream.write(encoded)
+
+
+def _frame(position, size):
+    if position is None or size is None:
+        return _NAN, _NAN, _NAN, _NAN
+    return position[0], position[1], size[0], size[1]
+
+
+def save_snapshot(source, path, **kwargs):
+    """Write a snapshot file.
+
+    Args:
+        source: a live element, dumped with dump_records and the keyword
+            arguments given, or the path or stream of a JSON lines dump
+
+    Returns: the number of elements written
+    """
+    writer = SnapshotWriter()
+    if hasattr(source, "ref"):
+        _dump.dump_records(source, writer.add, **kwargs)
+    elif hasattr(source, "read"):
+        for line in source:
+            if line.strip():
+                writer.add(json.loads(line))
+    else:
+        with open(source) as f:
+            return save_snapshot(f, path)
+    with open(path, "wb") as f:
+        writer.write(f)
+    return len(writer.nodes)
+
+
+class SnapshotFile(SearchMethodsMixin):
+    """A snapshot file opened through a memory map, searchable like an
+    element whose children are the roots of the snapshot. Searches read the
+    records in place and only decode the strings they compare."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (
+            magic,
+            version,
+            self.node_count,
+            self.attribute_count,
+            self.string_count,
+            role_count,
+            self.first_root,
+        ) = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise SnapshotError("%s is not a version %s snapshot" % (path, VERSION))
+        self._nodes = HEADER.size
+        self._attributes = self._nodes + self.node_count * NODE.size
+        roles = self._attributes + self.attribute_count * ATTRIBUTE.size
+        self._string_index = roles + role_count * 4
+        self._string_data = self._string_index + self.string_count * STRING.size
+        self.role_ids = struct.unpack_from("<%dI" % role_count, self._map, roles)
+        self.string = functools.lru_cache(maxsize=65536)(self._string)
+        self._roles = {}
+
+    def __len__(self):
+        return self.node_count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def close(self):
+        self._map.close()
+
+    def _string(self, string_id):
+        offset, length = STRING.unpack_from(
+            self._map, self._string_index + string_id * STRING.size
+        )
+        start = self._string_data + offset
+        return self._map[start : start + length].decode("utf-8")
+
+    def node(self, index):
+        """Return the fields of a node record, see NODE"""
+        return NODE.unpack_from(self._map, self._nodes + index * NODE.size)
+
+    def element(self, index):
+        return SnapshotElement(self, index)
+
+    def attribute(self, index, name):
+        """Return the value of an attribute of a node, or raise KeyError"""
+        node = self.node(index)
+        if name == "AXRole":
+            return self.string(node[3])
+        if name in ("AXPosition", "AXSize"):
+            if math.isnan(node[5]):
+                raise KeyError(name)
+            return list(node[5:7] if name == "AXPosition" else node[7:9])
+        for name_id, kind, value in self._attribute_records(node):
+            if self.string(name_id) == name:
+                return self._value(kind, value)
+        raise KeyError(name)
+
+    def attributes(self, index):
+        """Return all the attributes of a node, by name"""
+        node = self.node(index)
+        result = {"AXRole": self.string(node[3])}
+        if not math.isnan(node[5]):
+            result["AXPosition"] = list(node[5:7])
+            result["AXSize"] = list(node[7:9])
+        for name_id, kind, value in self._attribute_records(node):
+            result[self.string(name_id)] = self._value(kind, value)
+        return result
+
+    def _attribute_records(self, node):
+        start = self._attributes + node[9] * ATTRIBUTE.size
+        for offset in range(start, start + node[10] * ATTRIBUTE.size, ATTRIBUTE.size):
+            yield ATTRIBUTE.unpack_from(self._map, offset)
+
+    def _value(self, kind, value):
+        if kind == NONE:
+            return None
+        if kind == BOOL:
+            return bool(value)
+        if kind == INT:
+            return int(value)
+        if kind == FLOAT:
+            return value
+        if kind == STRING_ID:
+            return self.string(int(value))
+        return json.loads(self.string(int(value)))
+
+    def _role_filter(self, pattern):
+        """Return the string ids of the roles matching an AXRole criterion"""
+        try:
+            return self._roles[pattern]
+        except KeyError:
+            pass
+        matches = set()
+        for role_id in self.role_ids:
+            role = self.string(role_id)
+            if isinstance(pattern, str):
+                if fnmatch.fnmatch(role, pattern):
+                    matches.add(role_id)
+            elif role == pattern:
+                matches.add(role_id)
+        self._roles[pattern] = matches
+        return matches
+
+    def frame(self, node):
+        """Return the frame of a node record, or None"""
+        if math.isnan(node[5]):
+            return None
+        return _visible.stored_frame(node[5:7], node[7:9])
+
+    def search(self, first, recursive, criteria, visible=False, clip=None):
+        """Yield the elements matching criteria among the siblings starting
+        at node first, and their descendants if recursive. With visible,
+        only those whose frame shows through clip and the frames of the
+        windows and scroll areas above them."""
+        criteria = dict(criteria)
+        roles = None
+        if "AXRole" in criteria:
+            roles = self._role_filter(criteria.pop("AXRole"))
+        match = AXCallbacks.match_filter(**criteria) if criteria else None
+        stack = [(first, clip)] if first >= 0 else []
+        while stack:
+            index, clip = stack.pop()
+            node = self.node(index)
+            if node[2] >= 0:
+                stack.append((node[2], clip))
+            if visible:
+                frame = self.frame(node)
+                if not _visible.shown(frame, clip):
+                    continue
+                clip = _visible.clip_below(self.string(node[3]), frame, clip)
+            if recursive and node[1] >= 0:
+                stack.append((node[1], clip))
+            if roles is not None and node[3] not in roles:
+                continue
+            element = SnapshotElement(self, index)
+            if match is None or match(element):
+                yield element
+
+    @property
+    def ax_attributes(self):
+        return ["AXChildren"]
+
+    @property
+    def AXChildren(self):
+        return list(self.search(self.first_root, False, {}))
+
+    def _findAll(self, recursive=False, visible_only=False, **kwargs):
+        return self.search(self.first_root, recursive, kwargs, visible_only)
+
+
+class SnapshotElement(SearchMethodsMixin):
+    """A node of a snapshot file, reading its attributes on demand"""
+
+    __slots__ = ("snapshot", "index")
+
+    def __init__(self, snapshot, index):
+        self.snapshot = snapshot
+        self.index = index
+
+    def __repr__(self):
+        attributes = self.snapshot.attributes(self.index)
+        for describer in ("AXTitle", "AXValue", "AXRoleDescription"):
+            title = str(attributes.get(describer) or "")
+            if title:
+                break
+        return "<%s %s %s>" % (self.__class__.__name__, attributes["AXRole"], title)
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, SnapshotElement)
+            and other.snapshot is self.snapshot
+            and other.index == self.index
+        )
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash(self.index)
+
+    def __getattr__(self, item):
+        if item.startswith("AX"):
+            try:
+                return self.snapshot.attribute(self.index, item)
+            except KeyError:
+                pass
+        raise AttributeError("'%s' object has no attribute '%s'" % (type(self), item))
+
+    @property
+    def pid(self):
+        return self.snapshot.node(self.index)[4]
+
+    @property
+    def attributes(self):
+        return self.snapshot.attributes(self.index)
+
+    @property
+    def ax_attributes(self):
+        return list(self.snapshot.attributes(self.index)) + ["AXChildren"]
+
+    @property
+    def AXChildren(self):
+        first_child = self.snapshot.node(self.index)[1]
+        return list(self.snapshot.search(first_child, False, {}))
+
+    @property
+    def AXParent(self):
+        parent = self.snapshot.node(self.index)[0]
+        return SnapshotElement(self.snapshot, parent) if parent >= 0 else None
+
+    def _findAll(self, recursive=False, visible_only=False, **kwargs):
+        node = self.snapshot.node(self.index)
+        clip = None
+        if visible_only:
+            role = self.snapshot.string(node[3])
+            clip = _visible.clip_below(role, self.snapshot.frame(node), None)
+        return self.snapshot.search(node[1], recursive, kwargs, visible_only, clip)
+
+
+def open_snapshot(path):
+    """Open a snapshot file written by save_snapshot.
+
+    Returns: a SnapshotFile, with the findFirst*/findAll* search methods
+    """
+    return SnapshotFile(path)
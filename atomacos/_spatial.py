@@ -0,0 +1,205 @@
+"""Answer hit tests and region queries from the frames of a tree"""
+import math
+
+from atomacos import AXCallbacks
+
+
+def _frame(element):
+    try:
+        position = element.AXPosition
+        size = element.AXSize
+    except AttributeError:
+        return None
+    if position is None or size is None:
+        return None
+    x, y = position
+    width, height = size
+    return (float(x), float(y), float(width), float(height))
+
+
+def _contains(frame, x, y):
+    return frame[0] <= x < frame[0] + frame[2] and frame[1] <= y < frame[1] + frame[3]
+
+
+def _distance(frame, x, y):
+    """Return the distance from a point to the closest point of a frame"""
+    dx = max(frame[0] - x, 0.0, x - (frame[0] + frame[2]))
+    dy = max(frame[1] - y, 0.0, y - (frame[1] + frame[3]))
+    return math.hypot(dx, dy)
+
+
+class SpatialIndex(object):
+    """The frames of elements, filed in a grid of square cells. The index
+    does not follow changes to the tree: build it again after a change.
+
+    Args:
+        elements: the elements to index; those without a frame are left out
+        cell: the side of the cells, in points
+
+    Attributes:
+        elements: the indexed elements, in the order they were given
+        frames: the (x, y, width, height) of the elements, in the same order
+    """
+
+    def __init__(self, elements, cell=128.0):
+        self.cell = float(cell)
+        self.elements = []
+        self.frames = []
+        self._cells = {}
+        # The first and last column and row of the cells in use
+        self._bounds = None
+        for element in elements:
+            frame = _frame(element)
+            if frame is not None:
+                self._add(element, frame)
+
+    def __len__(self):
+        return len(self.elements)
+
+    def _add(self, element, frame):
+        number = len(self.elements)
+        self.elements.append(element)
+        self.frames.append(frame)
+        columns, rows = self._span(frame)
+        for column in columns:
+            for row in rows:
+                self._cells.setdefault((column, row), []).append(number)
+        bounds = (columns[0], rows[0], columns[-1], rows[-1])
+        if self._bounds is not None:
+            bounds = (
+                min(bounds[0], self._bounds[0]),
+                min(bounds[1], self._bounds[1]),
+                max(bounds[2], self._bounds[2]),
+                max(bounds[3], self._bounds[3]),
+            )
+        self._bounds = bounds
+
+    def _span(self, frame):
+        """Return the ranges of the columns and rows of the cells a frame
+        covers"""
+        x, y, width, height = frame
+        first_column = int(math.floor(x / self.cell))
+        first_row = int(math.floor(y / self.cell))
+        last_column = int(math.floor((x + max(width, 0.0)) / self.cell))
+        last_row = int(math.floor((y + max(height, 0.0)) / self.cell))
+        return range(first_column, last_column + 1), range(first_row, last_row + 1)
+
+    def _results(self, numbers, criteria):
+        elements = [self.elements[number] for number in numbers]
+        if criteria:
+            elements = list(filter(AXCallbacks.match_filter(**criteria), elements))
+        return elements
+
+    def elements_at(self, point, **criteria):
+        """Return the elements whose frame contains point and which match
+        the criteria of findAll, the deepest first, like the element a hit
+        test returns"""
+        x, y = point
+        key = (int(math.floor(x / self.cell)), int(math.floor(y / self.cell)))
+        numbers = [
+            number
+            for number in self._cells.get(key, ())
+            if _contains(self.frames[number], x, y)
+        ]
+        # Elements are indexed parents first, so the last ones are deepest
+        return self._results(sorted(numbers, reverse=True), criteria)
+
+    def elements_in_rect(self, rect, partial=False, **criteria):
+        """Return the elements lying inside rect and matching the criteria
+        of findAll, in the order they were indexed.
+
+        Args:
+            rect: (x, y, width, height)
+            partial: also return the elements which only overlap rect
+        """
+        left, top, width, height = rect
+        right, bottom = left + width, top + height
+        columns, rows = self._span(rect)
+        numbers = set()
+        for column in columns:
+            for row in rows:
+                numbers.update(self._cells.get((column, row), ()))
+        found = []
+        for number in numbers:
+            x, y, w, h = self.frames[number]
+            if partial:
+                inside = x < right and left < x + w and y < bottom and top < y + h
+            else:
+                inside = left <= x and x + w <= right and top <= y and y + h <= bottom
+            if inside:
+                found.append(number)
+        return self._results(sorted(found), criteria)
+
+    def nearest(self, point, role=None, **criteria):
+        """Return the element closest to point matching role and the
+        criteria of findAll, or None; an element containing point is at
+        distance 0, and the deepest one wins ties"""
+        if role is not None:
+            criteria["AXRole"] = role
+        match = AXCallbacks.match_filter(**criteria) if criteria else None
+        if self._bounds is None:
+            return None
+        x, y = point
+        column = int(math.floor(x / self.cell))
+        row = int(math.floor(y / self.cell))
+        first_column, first_row, last_column, last_row = self._bounds
+        # Beyond this ring, there are no more cells
+        last_ring = max(
+            column - first_column,
+            last_column - column,
+            row - first_row,
+            last_row - row,
+        )
+        best, best_distance = None, None
+        seen = set()
+        for ring in range(last_ring + 1):
+            # Elements outside the rings seen so far are at least this far
+            if best is not None and best_distance <= (ring - 1) * self.cell:
+                break
+            for key in _ring(column, row, ring, self._bounds):
+                for number in self._cells.get(key, ()):
+                    if number in seen:
+                        continue
+                    seen.add(number)
+                    distance = _distance(self.frames[number], x, y)
+                    if best is not None and (
+                        distance > best_distance
+                        or (distance == best_distance and number < best)
+                    ):
+                        continue
+                    if match is not None and not match(self.elements[number]):
+                        continue
+                    best, best_distance = number, distance
+        return self.elements[best] if best is not None else None
+
+
+def _ring(column, row, ring, bounds):
+    """Yield the keys of the cells within bounds at a Chebyshev distance
+    ring from a cell"""
+    first_column, first_row, last_column, last_row = bounds
+    columns = range(
+        max(column - ring, first_column), min(column + ring, last_column) + 1
+    )
+    for r in (row - ring, row + ring) if ring else (row,):
+        if first_row <= r <= last_row:
+            for c in columns:
+                yield c, r
+    rows = range(max(row - ring + 1, first_row), min(row + ring - 1, last_row) + 1)
+    for c in (column - ring, column + ring) if ring else ():
+        if first_column <= c <= last_column:
+            for r in rows:
+                yield c, r
+
+
+def spatial_index(tree, cell=128.0):
+    """Index the frames of the elements below tree.
+
+    Args:
+        tree: a dump read with load_dump, a snapshot, or an element; the
+            attributes of a live element are read one call at a time, so
+            prefer a dump or a snapshot of large trees
+        cell: the side of the cells of the grid, in points
+
+    Returns: a SpatialIndex
+    """
+    return SpatialIndex(tree.findAllR(), cell)
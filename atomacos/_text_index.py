@@ -0,0 +1,144 @@
+"""Look up the texts of a tree by substring, ignoring case or with typos"""
+import collections
+
+TEXT_ATTRIBUTES = ("AXTitle", "AXValue", "AXDescription", "AXHelp")
+
+TextMatch = collections.namedtuple(
+    "TextMatch", ["element", "attribute", "text", "distance", "score"]
+)
+
+
+def _trigrams(text):
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def _substring_distance(pattern, text, limit):
+    """Return the fewest edits turning pattern into a substring of text, or
+    limit + 1 if it takes more than limit edits"""
+    over = limit + 1
+    # The edits between the start of pattern and a substring of text ending
+    # at the current letter; only the rows up to last can be within limit
+    column = [min(row, over) for row in range(len(pattern) + 1)]
+    last = min(limit, len(pattern))
+    best = column[-1]
+    for char in text:
+        diagonal = 0
+        for row in range(1, min(last + 1, len(pattern)) + 1):
+            above = column[row]
+            column[row] = min(
+                diagonal + (pattern[row - 1] != char),
+                above + 1,
+                column[row - 1] + 1,
+                over,
+            )
+            diagonal = above
+        if last < len(pattern) and column[last + 1] <= limit:
+            last += 1
+        while column[last] > limit:
+            last -= 1
+        if last == len(pattern):
+            best = min(best, column[last])
+    return best
+
+
+class TextIndex(object):
+    """The texts of elements, indexed by their trigrams. A query only
+    checks the texts sharing enough trigrams with it.
+
+    Args:
+        elements: the elements to index
+        attributes: the attributes holding the texts to index
+
+    Attributes:
+        texts: the (element, attribute, text) of every indexed text
+    """
+
+    def __init__(self, elements, attributes=TEXT_ATTRIBUTES):
+        self.texts = []
+        self._folded = []
+        self._trigrams = collections.defaultdict(list)
+        for element in elements:
+            for attribute in attributes:
+                text = getattr(element, attribute, None)
+                if isinstance(text, str) and text:
+                    self._add(element, attribute, text)
+
+    def __len__(self):
+        return len(self.texts)
+
+    def _add(self, element, attribute, text):
+        number = len(self.texts)
+        self.texts.append((element, attribute, text))
+        folded = text.casefold()
+        self._folded.append(folded)
+        for trigram in _trigrams(folded):
+            self._trigrams[trigram].append(number)
+
+    def _candidates(self, query, distance):
+        """Return the numbers of the texts which may hold query within
+        distance edits, in order"""
+        trigrams = _trigrams(query)
+        # Every edit breaks at most three trigrams of the query
+        needed = len(trigrams) - 3 * distance
+        if needed <= 0:
+            return range(len(self.texts))
+        counts = collections.Counter()
+        for trigram in trigrams:
+            counts.update(self._trigrams.get(trigram, ()))
+        return sorted(number for number, count in counts.items() if count >= needed)
+
+    def search(self, query, distance=0, case_sensitive=False, limit=None):
+        """Return the texts holding query, best first.
+
+        Args:
+            query: the text to look for, anywhere in the indexed texts
+            distance: the most edits (insertions, deletions or
+                substitutions) allowed between query and the text found
+            case_sensitive: whether case matters
+            limit: the most matches to return, or None for all of them
+
+        Returns: TextMatch tuples of the element, the attribute, the text,
+            the edits and the score, the best match of every element only
+        """
+        if not query:
+            return []
+        folded = query.casefold()
+        best = {}
+        for number in self._candidates(folded, distance):
+            element, attribute, text = self.texts[number]
+            if case_sensitive:
+                pattern, haystack = query, text
+            else:
+                pattern, haystack = folded, self._folded[number]
+            if pattern in haystack:
+                edits = 0
+            elif distance:
+                edits = _substring_distance(pattern, haystack, distance)
+                if edits > distance:
+                    continue
+            else:
+                continue
+            score = (len(pattern) - edits) / float(max(len(haystack), len(pattern)))
+            key = id(element)
+            if key not in best or score > best[key][1].score:
+                best[key] = (
+                    number,
+                    TextMatch(element, attribute, text, edits, score),
+                )
+        # Texts of the same score stay in the order they were indexed
+        ranked = sorted(best.values(), key=lambda item: (-item[1].score, item[0]))
+        return [match for _, match in ranked[:limit]]
+
+
+def text_index(tree, attributes=TEXT_ATTRIBUTES):
+    """Index the texts of the elements below tree.
+
+    Args:
+        tree: a dump read with load_dump, a snapshot, or an element; the
+            attributes of a live element are read one call at a time, so
+            prefer a dump or a snapshot of large trees
+        attributes: the attributes holding the texts to index
+
+    Returns: a TextIndex
+    """
+    return TextIndex(tree.findAllR(), attributes)
@@ -0,0 +1,414 @@
+"""Trace the accessibility calls made by a block of code"""
+from __future__ import print_function
+
+import collections
+import functools
+import os
+import sys
+import threading
+import time
+
+from atomacos import _slowlog, backends
+
+TraceEvent = collections.namedtuple(
+    "TraceEvent",
+    [
+        "name",
+        "category",
+        "detail",
+        "role",
+        "thread",
+        "start",
+        "duration",
+        "error",
+        "api",
+    ],
+)
+
+# The most element roles a trace remembers
+ROLE_CACHE_SIZE = 4096
+
+_tracer = None
+_MISSING = object()
+
+
+def api_call(function):
+    """Record calls of function as the cause of the calls made inside it,
+    and watch the slow ones if function is a search or a wait"""
+    name = function.__name__.lstrip("_")
+    watched = name in _slowlog.WATCHED
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if watched and _slowlog.threshold is not None:
+            with _slowlog.watch(name, args, kwargs):
+                return _traced(name, function, args, kwargs)
+        return _traced(name, function, args, kwargs)
+
+    return wrapper
+
+
+def _traced(name, function, args, kwargs):
+    tracer = _tracer
+    if tracer is None:
+        return function(*args, **kwargs)
+    with tracer.span(name):
+        return function(*args, **kwargs)
+
+
+class Tracer(object):
+    """Events recorded by trace().
+
+    Args:
+        roles: record the role of every element in the trace; the roles
+            the traced calls did not read are read when the block ends
+    """
+
+    def __init__(self, roles=True):
+        self.roles = roles
+        self.events = []
+        self.origin = time.perf_counter()
+        self._roles = collections.OrderedDict()
+        # The numbers of the events waiting for the role of their element
+        self._pending = collections.OrderedDict()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        global _tracer
+        if _tracer is not None:
+            raise RuntimeError("A trace is already active")
+        self._backend = TracingBackend(backends.get_backend(), self)
+        self._previous = backends.set_backend(self._backend)
+        _tracer = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        global _tracer
+        _tracer = None
+        if backends.get_backend() is self._backend:
+            backends.set_backend(self._previous)
+        else:
+            # A backend set inside the block is still active, and puts the
+            # tracing backend back when it ends: leave it there, untraced
+            self._backend.active = False
+        self._read_pending_roles(self._backend.backend)
+        return False
+
+    @property
+    def calls(self):
+        """Return the events of the accessibility calls"""
+        return [event for event in self.events if event.category == "ipc"]
+
+    def span(self, name):
+        return _Span(self, name)
+
+    def current_api(self):
+        stack = getattr(self._local, "stack", None)
+        return stack[-1] if stack else None
+
+    def record(self, event):
+        with self._lock:
+            self.events.append(event)
+
+    def record_call(self, event, element, role=_MISSING):
+        """Record the event of a call on element, with the role of element
+        if the call read it"""
+        with self._lock:
+            if self.roles:
+                try:
+                    if role is _MISSING:
+                        role = self._roles.get(element, _MISSING)
+                    if role is not _MISSING:
+                        self._remember(element, role)
+                        event = event._replace(role=role)
+                    elif (
+                        element in self._pending or len(self._pending) < ROLE_CACHE_SIZE
+                    ):
+                        self._pending.setdefault(element, []).append(len(self.events))
+                except TypeError:
+                    # Elements which cannot be hashed have no role
+                    pass
+            self.events.append(event)
+
+    def _remember(self, element, role):
+        # The most recently seen last, so the oldest are dropped first
+        self._roles.pop(element, None)
+        self._roles[element] = role
+        if len(self._roles) > ROLE_CACHE_SIZE:
+            self._roles.popitem(last=False)
+        for number in self._pending.pop(element, ()):
+            self.events[number] = self.events[number]._replace(role=role)
+
+    def _read_pending_roles(self, backend):
+        """Read the roles which no traced call read, after the block"""
+        with self._lock:
+            pending, self._pending = self._pending, collections.OrderedDict()
+            for element, numbers in pending.items():
+                error, role = backend.copy_attribute_value(element, "AXRole")
+                if error != 0:
+                    continue
+                for number in numbers:
+                    self.events[number] = self.events[number]._replace(role=role)
+
+    def summary(self, top=10):
+        """Return the top calls by total duration, as text"""
+        groups = collections.OrderedDict()
+        for event in self.calls:
+            key = (event.name, event.detail)
+            groups.setdefault(key, []).append(event)
+        rows = sorted(
+            groups.items(),
+            key=lambda item: sum(e.duration for e in item[1]),
+            reverse=True,
+        )
+        total = sum(event.duration for event in self.calls)
+        lines = [
+            "%d calls in %.3f s" % (len(self.calls), total),
+            "%-40s %8s %10s %10s %7s"
+            % ("call", "count", "total ms", "max ms", "errors"),
+        ]
+        for (name, detail), events in rows[:top]:
+            label = "%s %s" % (name, detail) if detail else name
+            lines.append(
+                "%-40s %8d %10.3f %10.3f %7d"
+                % (
+                    label[:40],
+                    len(events),
+                    sum(e.duration for e in events) * 1e3,
+                    max(e.duration for e in events) * 1e3,
+                    sum(1 for e in events if e.error),
+                )
+            )
+        return "\n".join(lines)
+
+    def print_summary(self, top=10, stream=None):
+        print(self.summary(top), file=stream or sys.stdout)
+
+    def to_chrome(self, path_or_stream):
+        """Write the events as Chrome trace-event JSON, for chrome://tracing
+        or Perfetto"""
+        pid = os.getpid()
+        trace_events = []
+        for event in self.events:
+            args = {"api": event.api}
+            if event.category == "ipc":
+                args.update(detail=event.detail, role=event.role, error=event.error)
+            trace_events.append(
+                {
+                    "name": event.name,
+                    "cat": event.category,
+                    "ph": "X",
+                    "ts": (event.start - self.origin) * 1e6,
+                    "dur": event.duration * 1e6,
+                    "pid": pid,
+                    "tid": event.thread,
+                    "args": args,
+                }
+            )
+        import json
+
+        data = {"traceEvents": trace_events, "displayTimeUnit": "ms"}
+        if hasattr(path_or_stream, "write"):
+            json.dump(data, path_or_stream)
+        else:
+            with open(path_or_stream, "w") as f:
+                json.dump(data, f)
+
+
+class _Span(object):
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self):
+        local = self.tracer._local
+        if not hasattr(local, "stack"):
+            local.stack = []
+        self.api = local.stack[-1] if local.stack else None
+        local.stack.append(self.name)
+        self.start = time.perf_counter()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        duration = time.perf_counter() - self.start
+        self.tracer._local.stack.pop()
+        self.tracer.record(
+            TraceEvent(
+                self.name,
+                "api",
+                None,
+                None,
+                threading.get_ident(),
+                self.start,
+                duration,
+                None,
+                self.api,
+            )
+        )
+        return False
+
+
+class TracingBackend(backends.BackendProxy):
+    """Records the element calls made through another backend"""
+
+    def __init__(self, backend, tracer):
+        super(TracingBackend, self).__init__(backend)
+        self.tracer = tracer
+        self.active = True
+
+    def _call(self, name, element, detail, method, *args):
+        if not self.active:
+            return method(*args)
+        start = time.perf_counter()
+        result = method(*args)
+        duration = time.perf_counter() - start
+        error = result[0] if isinstance(result, tuple) else result
+        self.tracer.record_call(
+            TraceEvent(
+                name,
+                "ipc",
+                detail,
+                None,
+                threading.get_ident(),
+                start,
+                duration,
+                error,
+                self.tracer.current_api(),
+            ),
+            element,
+            _role_read(name, args, result),
+        )
+        return result
+
+    def copy_attribute_value(self, element, attribute):
+        return self._call(
+            "AXUIElementCopyAttributeValue",
+            element,
+            attribute,
+            self.backend.copy_attribute_value,
+            element,
+            attribute,
+        )
+
+    def copy_multiple_attribute_values(self, element, attributes):
+        return self._call(
+            "AXUIElementCopyMultipleAttributeValues",
+            element,
+            ",".join(attributes),
+            self.backend.copy_multiple_attribute_values,
+            element,
+            attributes,
+        )
+
+    def copy_attribute_names(self, element):
+        return self._call(
+            "AXUIElementCopyAttributeNames",
+            element,
+            None,
+            self.backend.copy_attribute_names,
+            element,
+        )
+
+    def copy_action_names(self, element):
+        return self._call(
+            "AXUIElementCopyActionNames",
+            element,
+            None,
+            self.backend.copy_action_names,
+            element,
+        )
+
+    def is_attribute_settable(self, element, attribute):
+        return self._call(
+            "AXUIElementIsAttributeSettable",
+            element,
+            attribute,
+            self.backend.is_attribute_settable,
+            element,
+            attribute,
+        )
+
+    def set_attribute_value(self, element, attribute, value):
+        return self._call(
+            "AXUIElementSetAttributeValue",
+            element,
+            attribute,
+            self.backend.set_attribute_value,
+            element,
+            attribute,
+            value,
+        )
+
+    def perform_action(self, element, action):
+        return self._call(
+            "AXUIElementPerformAction",
+            element,
+            action,
+            self.backend.perform_action,
+            element,
+            action,
+        )
+
+    def get_pid(self, element):
+        return self._call(
+            "AXUIElementGetPid", element, None, self.backend.get_pid, element
+        )
+
+    def copy_element_at_position(self, application, x, y):
+        return self._call(
+            "AXUIElementCopyElementAtPosition",
+            application,
+            "(%s, %s)" % (x, y),
+            self.backend.copy_element_at_position,
+            application,
+            x,
+            y,
+        )
+
+    def observer_add_notification(self, observer, element, notification, refcon):
+        return self._call(
+            "AXObserverAddNotification",
+            element,
+            notification,
+            self.backend.observer_add_notification,
+            observer,
+            element,
+            notification,
+            refcon,
+        )
+
+    def observer_remove_notification(self, observer, element, notification):
+        return self._call(
+            "AXObserverRemoveNotification",
+            element,
+            notification,
+            self.backend.observer_remove_notification,
+            observer,
+            element,
+            notification,
+        )
+
+
+def _role_read(name, args, result):
+    """Return the role of the element read by a call, or _MISSING if the
+    call did not read it"""
+    if name == "AXUIElementCopyAttributeValue" and args[1] == "AXRole":
+        error, value = result
+    elif name == "AXUIElementCopyMultipleAttributeValues" and "AXRole" in args[1]:
+        error, values = result
+        value = values[list(args[1]).index("AXRole")] if values else None
+    else:
+        return _MISSING
+    return value if error == 0 else None
+
+
+def trace(roles=True):
+    """Record the accessibility calls made inside a with block.
+
+    Args:
+        roles: record the role of the elements; the roles the traced
+            calls did not read cost one call per element after the block
+
+    Returns: a Tracer, to be used as a context manager
+    """
+    return Tracer(roles=roles)
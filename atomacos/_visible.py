@@ -0,0 +1,171 @@
+"""Walk only the part of a tree which is on screen"""
+from atomacos import _slowlog, backends
+from atomacos._macos import PAXUIElementCopyMultipleAttributeValues
+from atomacos.errors import AXErrorInvalidUIElement
+
+VISIBILITY_ATTRIBUTES = [
+    "AXRole",
+    "AXPosition",
+    "AXSize",
+    "AXVisibleChildren",
+    "AXVisibleRows",
+    "AXRows",
+]
+
+# The roles which clip the elements below them to their frame
+CLIPPING_ROLES = ("AXScrollArea", "AXWindow")
+
+
+def _intersection(a, b):
+    """Return the intersection of two (x, y, width, height) rects, or None"""
+    left = max(a[0], b[0])
+    top = max(a[1], b[1])
+    right = min(a[0] + a[2], b[0] + b[2])
+    bottom = min(a[1] + a[3], b[1] + b[3])
+    if right <= left or bottom <= top:
+        return None
+    return (left, top, right - left, bottom - top)
+
+
+def _frame(backend, position, size):
+    if position is None or size is None:
+        return None
+    return stored_frame(backend.struct_value(position), backend.struct_value(size))
+
+
+def stored_frame(position, size):
+    """Return the frame of (x, y) and (width, height) values, or None if
+    either is missing or the frame is empty"""
+    if position is None or size is None:
+        return None
+    x, y = position
+    width, height = size
+    if width <= 0 or height <= 0:
+        return None
+    return (x, y, width, height)
+
+
+def screen_clip():
+    """Return the clip of the top of a tree: the frames of the screens"""
+    return tuple(tuple(frame) for frame in backends.get_backend().screen_frames())
+
+
+def parse(values, children):
+    """Return the role, the frame and the children to visit of an element.
+
+    Args:
+        values: the values of VISIBILITY_ATTRIBUTES, in order
+        children: the value of AXChildren
+    """
+    role, position, size, visible_children, visible_rows, rows = values
+    frame = _frame(backends.get_backend(), position, size)
+    if visible_children is not None:
+        return role, frame, list(visible_children)
+    children = list(children or [])
+    if visible_rows is not None and rows:
+        try:
+            hidden = set(rows) - set(visible_rows)
+        except TypeError:
+            hidden = ()
+        if hidden:
+            children = [child for child in children if child not in hidden]
+    return role, frame, children
+
+
+def shown(frame, clip):
+    """Return whether an element with frame shows through clip, None
+    letting everything through"""
+    if frame is None or clip is None:
+        return True
+    return any(_intersection(frame, rect) is not None for rect in clip)
+
+
+def clip_below(role, frame, clip):
+    """Return the clip of the children of an element"""
+    if frame is None or role not in CLIPPING_ROLES:
+        return clip
+    if clip is None:
+        return (frame,)
+    return tuple(
+        rect
+        for rect in (_intersection(frame, other) for other in clip)
+        if rect is not None
+    )
+
+
+def _stored(element):
+    """Return the stored role and frame of an element of a dump or a
+    snapshot"""
+    return (
+        getattr(element, "AXRole", None),
+        stored_frame(
+            getattr(element, "AXPosition", None), getattr(element, "AXSize", None)
+        ),
+    )
+
+
+def stored_visible_children(element, recursive=False):
+    """Yield the children of an element of a dump or a snapshot which were
+    on screen, and their own children with recursive=True, depth first.
+
+    The stored frames are clipped to the windows and scroll areas above
+    them, but not to the screens, which are not stored.
+    """
+    role, frame = _stored(element)
+    clip = clip_below(role, frame, None)
+    stack = [(child, clip, 1) for child in reversed(element.AXChildren)]
+    while stack:
+        element, clip, depth = stack.pop()
+        role, frame = _stored(element)
+        if not shown(frame, clip):
+            continue
+        if _slowlog.active:
+            _slowlog.visit(depth)
+        yield element
+        if not recursive:
+            continue
+        clip = clip_below(role, frame, clip)
+        for child in reversed(element.AXChildren):
+            stack.append((child, clip, depth + 1))
+
+
+def _read(ref):
+    values = PAXUIElementCopyMultipleAttributeValues(
+        ref, VISIBILITY_ATTRIBUTES + ["AXChildren"]
+    )
+    return parse(values[:-1], values[-1])
+
+
+def visible_children(element, recursive=False):
+    """Yield the children of element which are on screen, and their own
+    children with recursive=True, depth first.
+
+    The children are taken from AXVisibleChildren when there is one, less
+    the rows missing from AXVisibleRows. Other elements are kept if their
+    frame meets the screens and the windows and scroll areas above them,
+    or if they have no frame; the subtree of an element left out is never
+    read.
+    """
+    try:
+        role, frame, children = _read(element.ref)
+    except AXErrorInvalidUIElement:
+        return
+    clip = clip_below(role, frame, screen_clip())
+    stack = [(child, clip, 1) for child in reversed(children)]
+    while stack:
+        ref, clip, depth = stack.pop()
+        try:
+            role, frame, children = _read(ref)
+        except AXErrorInvalidUIElement:
+            # The element went away since its parent was read
+            continue
+        if not shown(frame, clip):
+            continue
+        if _slowlog.active:
+            _slowlog.visit(depth)
+        yield element.__class__(ref)
+        if not recursive:
+            continue
+        clip = clip_below(role, frame, clip)
+        for child in reversed(children):
+            stack.append((child, clip, depth + 1))
@@ -0,0 +1,204 @@
+"""Accessibility backends"""
+
+# Kinds of values returned by Backend.value_kind
+STRING = "string"
+ELEMENT = "element"
+ARRAY = "array"
+SIZE = "size"
+POINT = "point"
+RANGE = "range"
+
+# Errors of single attributes, which copy_multiple_attribute_values turns
+# into None values
+_ERROR_ATTRIBUTE_UNSUPPORTED = -25205
+_ERROR_NO_VALUE = -25212
+
+_backend = None
+
+
+class Backend(object):
+    """Interface implemented by the accessibility backends.
+
+    Element methods mirror the AXUIElement C API: they return an AXError
+    code, followed by the result when there is one.
+    """
+
+    # Elements
+
+    def create_application(self, pid):
+        """Return the element of the application with the given pid"""
+        raise NotImplementedError
+
+    def create_systemwide(self):
+        """Return the system-wide element"""
+        raise NotImplementedError
+
+    def copy_attribute_value(self, element, attribute):
+        """Return (error, value) of an attribute"""
+        raise NotImplementedError
+
+    def copy_multiple_attribute_values(self, element, attributes):
+        """Return (error, values) of several attributes read at once, with
+        None for the attributes which have no value or are unsupported"""
+        values = []
+        for attribute in attributes:
+            error, value = self.copy_attribute_value(element, attribute)
+            if error not in (0, _ERROR_NO_VALUE, _ERROR_ATTRIBUTE_UNSUPPORTED):
+                return error, None
+            values.append(value if error == 0 else None)
+        return 0, values
+
+    def copy_attribute_names(self, element):
+        """Return (error, names) of the attributes of an element"""
+        raise NotImplementedError
+
+    def copy_action_names(self, element):
+        """Return (error, names) of the actions of an element"""
+        raise NotImplementedError
+
+    def is_attribute_settable(self, element, attribute):
+        """Return (error, settable) for an attribute"""
+        raise NotImplementedError
+
+    def set_attribute_value(self, element, attribute, value):
+        """Set an attribute and return the error code"""
+        raise NotImplementedError
+
+    def perform_action(self, element, action):
+        """Perform an action and return the error code"""
+        raise NotImplementedError
+
+    def get_pid(self, element):
+        """Return (error, pid) of the process owning an element"""
+        raise NotImplementedError
+
+    def copy_element_at_position(self, application, x, y):
+        """Return (error, element) at the given screen position"""
+        raise NotImplementedError
+
+    def set_messaging_timeout(self, element, timeout):
+        """Set the messaging timeout and return the error code"""
+        raise NotImplementedError
+
+    def refs_equal(self, ref, other):
+        """Return whether two element references point to the same element"""
+        raise NotImplementedError
+
+    def is_process_trusted(self):
+        """Return whether this process may use the accessibility API"""
+        raise NotImplementedError
+
+    # Observers
+
+    def observer_callback(self, function):
+        """Wrap function(observer, element, notification, refcon) so that
+        it can be passed to observer_create"""
+        raise NotImplementedError
+
+    def observer_create(self, pid, callback):
+        """Return (error, observer) for the application with the given pid"""
+        raise NotImplementedError
+
+    def observer_add_notification(self, observer, element, notification, refcon):
+        """Register a notification and return the error code"""
+        raise NotImplementedError
+
+    def observer_remove_notification(self, observer, element, notification):
+        """Unregister a notification and return the error code"""
+        raise NotImplementedError
+
+    def run_observer(self, observer, timeout, done):
+        """Deliver the notifications of observer until done() returns True
+        or timeout seconds have passed"""
+        raise NotImplementedError
+
+    # Values
+
+    def value_kind(self, value):
+        """Return STRING, ELEMENT, ARRAY, SIZE, POINT, RANGE or None"""
+        raise NotImplementedError
+
+    def struct_value(self, value):
+        """Return the fields of a SIZE, POINT or RANGE value as a tuple"""
+        raise NotImplementedError
+
+    # Workspace
+
+    def running_applications(self):
+        """Return the running applications, as NSRunningApplication-like
+        objects"""
+        raise NotImplementedError
+
+    def running_applications_with_bundle_id(self, bundle_id):
+        raise NotImplementedError
+
+    def running_application_with_pid(self, pid):
+        raise NotImplementedError
+
+    def frontmost_application(self):
+        raise NotImplementedError
+
+    def launch_app_by_bundle_id(self, bundle_id):
+        raise NotImplementedError
+
+    def launch_app_by_bundle_path(self, bundle_path, arguments):
+        raise NotImplementedError
+
+    def observe_activations(self, callback):
+        """Call callback(pid) whenever an application gets activated.
+
+        Returns: an observer, to pass to remove_activation_observer
+        """
+        raise NotImplementedError
+
+    def remove_activation_observer(self, observer):
+        """Stop calling the callback of an observer of activations"""
+        raise NotImplementedError
+
+    def pump_run_loop(self):
+        """Deliver pending run loop events without blocking"""
+        raise NotImplementedError
+
+    def screen_frames(self):
+        """Return the (x, y, width, height) of every display, in top-left
+        relative screen coordinates"""
+        raise NotImplementedError
+
+    def set_pasteboard_text(self, text):
+        raise NotImplementedError
+
+
+class BackendProxy(object):
+    """Forwards every call to another backend.
+
+    Subclasses override the calls they intercept, e.g. to trace them.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+
+def get_backend():
+    """Return the active backend, loading the macOS one by default"""
+    if _backend is None:
+        from atomacos.backends.macos import MacOSBackend
+
+        set_backend(MacOSBackend())
+    return _backend
+
+
+def set_backend(backend):
+    """Make backend the active backend.
+
+    Args:
+        backend: a Backend instance, or None to go back to the default
+
+    Returns: the previously active backend, or None
+    """
+    global _backend
+    previous = _backend
+    _backend = backend
+    return previous
@@ -0,0 +1,488 @@
+"""Record the calls made to a backend into a cassette, and replay them later"""
+import collections
+import contextlib
+import json
+import threading
+import time
+
+try:
+    import builtins
+except ImportError:
+    import __builtin__ as builtins
+
+from atomacos import backends, errors
+from atomacos.backends.simulator import Point, Range, Size
+
+VERSION = 1
+
+# Backend calls stored in cassettes
+RECORDED = (
+    "create_application",
+    "create_systemwide",
+    "copy_attribute_value",
+    "copy_multiple_attribute_values",
+    "copy_attribute_names",
+    "copy_action_names",
+    "is_attribute_settable",
+    "set_attribute_value",
+    "perform_action",
+    "get_pid",
+    "copy_element_at_position",
+    "set_messaging_timeout",
+    "is_process_trusted",
+    "observer_create",
+    "observer_add_notification",
+    "observer_remove_notification",
+    "running_applications",
+    "running_applications_with_bundle_id",
+    "running_application_with_pid",
+    "frontmost_application",
+    "launch_app_by_bundle_id",
+    "launch_app_by_bundle_path",
+    "set_pasteboard_text",
+    "screen_frames",
+)
+
+_STRUCTS = {backends.SIZE: Size, backends.POINT: Point, backends.RANGE: Range}
+
+
+class CassetteError(Exception):
+    pass
+
+
+# The modules whose exceptions replaying a cassette raises again, by the
+# module name of their classes
+_EXCEPTION_MODULES = {errors.__name__: errors, Exception.__module__: builtins}
+
+
+def _exception(error):
+    """Return the exception a recorded call raised, or a RuntimeError if its
+    class cannot be built again from the message.
+
+    Raises: CassetteError if the class is not one of atomacos.errors or the
+        builtins, which keeps a cassette from importing other modules
+    """
+    if "module" not in error:
+        # Recorded before cassettes stored the module of errors
+        return RuntimeError(error["message"])
+    module = _EXCEPTION_MODULES.get(error["module"])
+    cls = getattr(module, error["raise"], None) if module is not None else None
+    if not (isinstance(cls, type) and issubclass(cls, Exception)):
+        raise CassetteError(
+            "Cannot replay the error %s.%s" % (error["module"], error["raise"])
+        )
+    try:
+        return cls(error["message"])
+    except TypeError:
+        return RuntimeError(error["message"])
+
+
+def _signature_args(name, args):
+    """Return the arguments a call is matched on"""
+    if name == "observer_add_notification":
+        # The refcon is an opaque pointer, different in every run
+        return list(args[:3])
+    return list(args)
+
+
+class _Codec(object):
+    """Turns backend values into JSON values and back.
+
+    Subclasses provide _reference(value), returning the JSON value of
+    elements and observers they know, _element_id(element), _element(number),
+    value_kind(value) and struct_value(value).
+    """
+
+    def _dump(self, value):
+        if value is None or isinstance(value, (bool, int, float)):
+            return value
+        if isinstance(value, str):
+            return str(value)
+        if callable(value):
+            return None
+        reference = self._reference(value)
+        if reference is not None:
+            return reference
+        if hasattr(value, "processIdentifier"):
+            return {
+                "app": {
+                    "pid": value.processIdentifier(),
+                    "bundle_id": value.bundleIdentifier(),
+                    "name": value.localizedName(),
+                }
+            }
+        try:
+            kind = self.value_kind(value)
+        except Exception:
+            kind = None
+        if kind == backends.ELEMENT:
+            return {"element": self._element_id(value)}
+        if kind in _STRUCTS:
+            return {kind: list(self.struct_value(value))}
+        if kind == backends.STRING:
+            return str(value)
+        if kind == backends.ARRAY or isinstance(value, list):
+            return [self._dump(item) for item in value]
+        if isinstance(value, tuple):
+            return {"tuple": [self._dump(item) for item in value]}
+        return {"repr": str(value)}
+
+    def _load(self, value):
+        if isinstance(value, list):
+            return [self._load(item) for item in value]
+        if not isinstance(value, dict):
+            return value
+        ((key, data),) = value.items()
+        if key == "element":
+            return self._element(data)
+        if key == "observer":
+            return self._observers[data]
+        if key == "app":
+            return ReplayApp(**data)
+        if key == "tuple":
+            return tuple(self._load(item) for item in data)
+        if key in _STRUCTS:
+            return _STRUCTS[key](*data)
+        return data
+
+
+class RecordingBackend(backends.BackendProxy, _Codec):
+    """Records the calls made through another backend.
+
+    Attributes:
+        interactions: the recorded calls, as JSON-compatible dicts
+    """
+
+    def __init__(self, backend):
+        super(RecordingBackend, self).__init__(backend)
+        self.interactions = []
+        self._elements = []
+        self._element_ids = {}
+        self._observers = []
+        self._notifications = []
+        self._lock = threading.Lock()
+
+    def _reference(self, value):
+        for index, observer in enumerate(self._observers):
+            if observer is value:
+                return {"observer": index}
+        return None
+
+    def _element_id(self, element):
+        try:
+            return self._element_ids[element]
+        except KeyError:
+            pass
+        except TypeError:
+            # Unhashable reference, compare with every known element
+            for index, known in enumerate(self._elements):
+                if self.backend.refs_equal(known, element):
+                    return index
+        self._elements.append(element)
+        index = len(self._elements) - 1
+        try:
+            self._element_ids[element] = index
+        except TypeError:
+            pass
+        return index
+
+    def _call(self, name, *args):
+        start = time.perf_counter()
+        try:
+            result = getattr(self.backend, name)(*args)
+        except Exception as e:
+            error = {
+                "raise": type(e).__name__,
+                "module": type(e).__module__,
+                "message": str(e),
+            }
+            self._record(name, args, start, error=error)
+            raise
+        if name == "observer_create" and result[1] is not None:
+            self._observers.append(result[1])
+        self._record(name, args, start, result=result)
+        return result
+
+    def _record(self, name, args, start, **fields):
+        duration = time.perf_counter() - start
+        with self._lock:
+            interaction = {
+                "call": name,
+                "args": self._dump(_signature_args(name, args)),
+                "duration": duration,
+            }
+            if "result" in fields:
+                interaction["result"] = self._dump(fields["result"])
+            else:
+                interaction["error"] = fields["error"]
+            if "notifications" in fields:
+                interaction["notifications"] = fields["notifications"]
+            self.interactions.append(interaction)
+
+    def observer_callback(self, function):
+        def record_notification(observer, element, notification, refcon):
+            with self._lock:
+                self._notifications.append(
+                    {"element": self._dump(element), "notification": notification}
+                )
+            return function(observer, element, notification, refcon)
+
+        return self.backend.observer_callback(record_notification)
+
+    def run_observer(self, observer, timeout, done):
+        with self._lock:
+            self._notifications = []
+        start = time.perf_counter()
+        self.backend.run_observer(observer, timeout, done)
+        self._record(
+            "run_observer",
+            (observer, timeout),
+            start,
+            result=None,
+            notifications=self._notifications,
+        )
+
+    def save(self, path):
+        """Write the recorded calls to a cassette file"""
+        with open(path, "w") as f:
+            json.dump({"version": VERSION, "interactions": self.interactions}, f)
+
+
+def _recorded(name):
+    def call(self, *args):
+        return self._call(name, *args)
+
+    call.__name__ = name
+    return call
+
+
+for _name in RECORDED:
+    setattr(RecordingBackend, _name, _recorded(_name))
+
+
+class ReplayElement(object):
+    """Stands in for a recorded element reference"""
+
+    def __init__(self, number):
+        self.number = number
+
+    def __repr__(self):
+        return "<ReplayElement %s>" % self.number
+
+
+class ReplayObserver(object):
+    __slots__ = ("callback",)
+
+    def __init__(self, callback):
+        self.callback = callback
+
+
+class ReplayApp(object):
+    """Stands in for a recorded NSRunningApplication"""
+
+    def __init__(self, pid, bundle_id, name):
+        self.pid = pid
+        self.bundle_id = bundle_id
+        self.name = name
+
+    def processIdentifier(self):
+        return self.pid
+
+    def bundleIdentifier(self):
+        return self.bundle_id
+
+    def localizedName(self):
+        return self.name
+
+    def activateWithOptions_(self, options):
+        return True
+
+    def terminate(self):
+        return True
+
+    def isTerminated(self):
+        return False
+
+
+class ReplayBackend(backends.Backend, _Codec):
+    """Answers calls from recorded interactions.
+
+    Calls are matched on their name, element and arguments. In lenient
+    mode, any unused recorded call with the same signature answers, and the
+    last answer is reused once they are all used.
+
+    Args:
+        interactions: the interactions of a cassette
+        strict: require the calls to be made in the recorded order
+        timing: sleep for the recorded duration of every call
+    """
+
+    def __init__(self, interactions, strict=True, timing=False):
+        self.interactions = interactions
+        self.strict = strict
+        self.timing = timing
+        self.position = 0
+        self._elements = {}
+        self._observers = []
+        self._unused = collections.defaultdict(collections.deque)
+        self._last = {}
+        for interaction in interactions:
+            key = self._key(interaction["call"], interaction["args"])
+            self._unused[key].append(interaction)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path, strict=True, timing=False):
+        with open(path) as f:
+            cassette = json.load(f)
+        if cassette.get("version") != VERSION:
+            raise CassetteError("Unsupported cassette version in %s" % path)
+        return cls(cassette["interactions"], strict=strict, timing=timing)
+
+    @property
+    def unused(self):
+        """Return the number of recorded calls that were not replayed"""
+        return sum(len(interactions) for interactions in self._unused.values())
+
+    def _reference(self, value):
+        if isinstance(value, ReplayElement):
+            return {"element": value.number}
+        for index, observer in enumerate(self._observers):
+            if observer is value:
+                return {"observer": index}
+        return None
+
+    def _element(self, number):
+        if number not in self._elements:
+            self._elements[number] = ReplayElement(number)
+        return self._elements[number]
+
+    @staticmethod
+    def _key(name, args):
+        return json.dumps([name, args], sort_keys=True)
+
+    def _next(self, name, args):
+        with self._lock:
+            if self.strict:
+                return self._next_strict(name, args)
+            key = self._key(name, args)
+            if self._unused[key]:
+                interaction = self._unused[key].popleft()
+                self._last[key] = interaction
+                return interaction
+            if key in self._last:
+                return self._last[key]
+        raise CassetteError("No recorded call matches %s%s" % (name, args))
+
+    def _next_strict(self, name, args):
+        if self.position >= len(self.interactions):
+            raise CassetteError("Unexpected call %s%s after the end" % (name, args))
+        interaction = self.interactions[self.position]
+        if interaction["call"] != name or interaction["args"] != args:
+            raise CassetteError(
+                "Call %s%s does not match recorded call %s%s at position %s"
+                % (
+                    name,
+                    args,
+                    interaction["call"],
+                    interaction["args"],
+                    self.position,
+                )
+            )
+        self.position += 1
+        key = self._key(name, args)
+        self._unused[key].remove(interaction)
+        return interaction
+
+    def _replay(self, name, *args):
+        interaction = self._next(name, self._dump(_signature_args(name, args)))
+        if self.timing:
+            time.sleep(interaction["duration"])
+        if "error" in interaction:
+            raise _exception(interaction["error"])
+        if name == "observer_create":
+            self._observers.append(ReplayObserver(args[1]))
+        return self._load(interaction["result"])
+
+    def refs_equal(self, ref, other):
+        return ref is other
+
+    def observer_callback(self, function):
+        return function
+
+    def run_observer(self, observer, timeout, done):
+        interaction = self._next("run_observer", self._dump([observer, timeout]))
+        for notification in interaction["notifications"]:
+            if done():
+                break
+            element = self._load(notification["element"])
+            observer.callback(observer, element, notification["notification"], None)
+
+    def value_kind(self, value):
+        if isinstance(value, str):
+            return backends.STRING
+        if isinstance(value, ReplayElement):
+            return backends.ELEMENT
+        if isinstance(value, list):
+            return backends.ARRAY
+        for kind, struct in _STRUCTS.items():
+            if isinstance(value, struct):
+                return kind
+        return None
+
+    def struct_value(self, value):
+        return tuple(value)
+
+    def observe_activations(self, callback):
+        return None
+
+    def remove_activation_observer(self, observer):
+        pass
+
+    def pump_run_loop(self):
+        pass
+
+
+def _replayed(name):
+    def call(self, *args):
+        return self._replay(name, *args)
+
+    call.__name__ = name
+    return call
+
+
+for _name in RECORDED:
+    setattr(ReplayBackend, _name, _replayed(_name))
+
+
+@contextlib.contextmanager
+def record_cassette(path):
+    """Record the calls made inside a with block into a cassette file.
+
+    Yields: the RecordingBackend
+    """
+    recorder = RecordingBackend(backends.get_backend())
+    previous = backends.set_backend(recorder)
+    try:
+        yield recorder
+    finally:
+        backends.set_backend(previous)
+        recorder.save(path)
+
+
+@contextlib.contextmanager
+def replay_cassette(path, strict=True, timing=False):
+    """Answer the calls made inside a with block from a cassette file.
+
+    Args:
+        strict: require the calls to be made in the recorded order
+        timing: take as long as the recorded calls did
+
+    Yields: the ReplayBackend
+    """
+    player = ReplayBackend.from_file(path, strict=strict, timing=timing)
+    previous = backends.set_backend(player)
+    try:
+        yield player
+    finally:
+        backends.set_backend(previous)
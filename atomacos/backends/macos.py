@@ -0,0 +1,282 @@
+"""
+Backend talking to ApplicationServices through pyobjc
+"""
+import re
+import signal
+import threading
+import time
+
+import AppKit
+from ApplicationServices import (
+    AXIsProcessTrusted,
+    AXObserverAddNotification,
+    AXObserverCreate,
+    AXObserverGetRunLoopSource,
+    AXObserverRemoveNotification,
+    AXUIElementCopyActionNames,
+    AXUIElementCopyAttributeNames,
+    AXUIElementCopyAttributeValue,
+    AXUIElementCopyElementAtPosition,
+    AXUIElementCopyMultipleAttributeValues,
+    AXUIElementCreateApplication,
+    AXUIElementCreateSystemWide,
+    AXUIElementGetPid,
+    AXUIElementGetTypeID,
+    AXUIElementIsAttributeSettable,
+    AXUIElementPerformAction,
+    AXUIElementSetAttributeValue,
+    AXUIElementSetMessagingTimeout,
+    AXValueGetType,
+    AXValueGetTypeID,
+    CFEqual,
+    NSDefaultRunLoopMode,
+    NSPointFromString,
+    NSRangeFromString,
+    NSSizeFromString,
+    kAXValueAXErrorType,
+    kAXValueCFRangeType,
+    kAXValueCGPointType,
+    kAXValueCGSizeType,
+)
+from CoreFoundation import (
+    CFArrayGetTypeID,
+    CFGetTypeID,
+    CFRunLoopAddSource,
+    CFRunLoopGetCurrent,
+    CFRunLoopRunInMode,
+    CFStringGetTypeID,
+    kCFRunLoopDefaultMode,
+)
+from objc import callbackFor
+from PyObjCTools import AppHelper
+
+from atomacos import backends
+
+try:
+    from PyObjCTools import MachSignals
+except ImportError:
+
+    class MachSignals:
+        signal = signal.signal
+
+
+_observer_callback = callbackFor(AXObserverCreate)
+
+
+def _is_ax_error(value):
+    return (
+        value is None
+        or CFGetTypeID(value) == AXValueGetTypeID()
+        and AXValueGetType(value) == kAXValueAXErrorType
+    )
+
+
+def _sigHandler(sig):
+    AppHelper.stopEventLoop()
+    raise KeyboardInterrupt("Keyboard interrupted Run Loop")
+
+
+class MacOSBackend(backends.Backend):
+    """Backend for the accessibility API of the running macOS session"""
+
+    def create_application(self, pid):
+        return AXUIElementCreateApplication(pid)
+
+    def create_systemwide(self):
+        return AXUIElementCreateSystemWide()
+
+    def copy_attribute_value(self, element, attribute):
+        return AXUIElementCopyAttributeValue(element, attribute, None)
+
+    def copy_multiple_attribute_values(self, element, attributes):
+        error, values = AXUIElementCopyMultipleAttributeValues(
+            element, attributes, 0, None
+        )
+        if error:
+            return error, None
+        # Attributes which failed are AXValues wrapping their error
+        return error, [None if _is_ax_error(value) else value for value in values]
+
+    def copy_attribute_names(self, element):
+        return AXUIElementCopyAttributeNames(element, None)
+
+    def copy_action_names(self, element):
+        return AXUIElementCopyActionNames(element, None)
+
+    def is_attribute_settable(self, element, attribute):
+        return AXUIElementIsAttributeSettable(element, attribute, None)
+
+    def set_attribute_value(self, element, attribute, value):
+        return AXUIElementSetAttributeValue(element, attribute, value)
+
+    def perform_action(self, element, action):
+        return AXUIElementPerformAction(element, action)
+
+    def get_pid(self, element):
+        return AXUIElementGetPid(element, None)
+
+    def copy_element_at_position(self, application, x, y):
+        return AXUIElementCopyElementAtPosition(application, x, y, None)
+
+    def set_messaging_timeout(self, element, timeout):
+        return AXUIElementSetMessagingTimeout(element, timeout)
+
+    def refs_equal(self, ref, other):
+        return CFEqual(ref, other)
+
+    def is_process_trusted(self):
+        return AXIsProcessTrusted()
+
+    def observer_callback(self, function):
+        return _observer_callback(function)
+
+    def observer_create(self, pid, callback):
+        return AXObserverCreate(pid, callback, None)
+
+    def observer_add_notification(self, observer, element, notification, refcon):
+        return AXObserverAddNotification(observer, element, notification, refcon)
+
+    def observer_remove_notification(self, observer, element, notification):
+        return AXObserverRemoveNotification(observer, element, notification)
+
+    def run_observer(self, observer, timeout, done):
+        # Add observer source to run loop
+        CFRunLoopAddSource(
+            CFRunLoopGetCurrent(),
+            AXObserverGetRunLoopSource(observer),
+            NSDefaultRunLoopMode,
+        )
+
+        def event_stopper():
+            end_time = time.time() + timeout
+            while time.time() < end_time:
+                if done():
+                    break
+            AppHelper.callAfter(AppHelper.stopEventLoop)
+
+        event_watcher = threading.Thread(target=event_stopper)
+        event_watcher.daemon = True
+        event_watcher.start()
+
+        # Set the signal handlers prior to running the run loop
+        oldSigIntHandler = MachSignals.signal(signal.SIGINT, _sigHandler)
+        AppHelper.runConsoleEventLoop()
+        MachSignals.signal(signal.SIGINT, oldSigIntHandler)
+
+    def value_kind(self, value):
+        if CFGetTypeID(value) == CFStringGetTypeID():
+            return backends.STRING
+        if CFGetTypeID(value) == AXUIElementGetTypeID():
+            return backends.ELEMENT
+        if CFGetTypeID(value) == CFArrayGetTypeID():
+            return backends.ARRAY
+        value_type = AXValueGetType(value)
+        if value_type == kAXValueCGSizeType:
+            return backends.SIZE
+        if value_type == kAXValueCGPointType:
+            return backends.POINT
+        if value_type == kAXValueCFRangeType:
+            return backends.RANGE
+        return None
+
+    def struct_value(self, value):
+        repr_searched = re.search("{.*}", str(value)).group()
+        value_type = AXValueGetType(value)
+        if value_type == kAXValueCGSizeType:
+            size = NSSizeFromString(repr_searched)
+            return size.width, size.height
+        if value_type == kAXValueCGPointType:
+            point = NSPointFromString(repr_searched)
+            return point.x, point.y
+        range = NSRangeFromString(repr_searched)
+        return range.location, range.length
+
+    def running_applications(self):
+        # Refresh the runningApplications list
+        AppHelper.callLater(1, AppHelper.stopEventLoop)
+        AppHelper.runConsoleEventLoop()
+        ws = AppKit.NSWorkspace.sharedWorkspace()
+        return ws.runningApplications()
+
+    def running_applications_with_bundle_id(self, bundle_id):
+        ra = AppKit.NSRunningApplication
+        return ra.runningApplicationsWithBundleIdentifier_(bundle_id)
+
+    def running_application_with_pid(self, pid):
+        ra = AppKit.NSRunningApplication
+        return ra.runningApplicationWithProcessIdentifier_(pid)
+
+    def frontmost_application(self):
+        return AppKit.NSWorkspace.sharedWorkspace().frontmostApplication()
+
+    def launch_app_by_bundle_id(self, bundle_id):
+        # NSWorkspaceLaunchAllowingClassicStartup does nothing on any
+        # modern system that doesn't have the classic environment installed.
+        # Encountered a bug when passing 0 for no options on 10.6 PyObjC.
+        ws = AppKit.NSWorkspace.sharedWorkspace()
+
+        r = ws.launchAppWithBundleIdentifier_options_additionalEventParamDescriptor_launchIdentifier_(  # noqa: B950
+            bundle_id,
+            AppKit.NSWorkspaceLaunchAllowingClassicStartup,
+            AppKit.NSAppleEventDescriptor.nullDescriptor(),
+            None,
+        )
+        # On 10.6, this returns a tuple - first element bool result, second is
+        # a number. Let's use the bool result.
+        if not r[0]:
+            raise RuntimeError("Error launching specified application. %s" % str(r))
+
+    def launch_app_by_bundle_path(self, bundle_path, arguments):
+        bundleUrl = AppKit.NSURL.fileURLWithPath_(bundle_path)
+        workspace = AppKit.NSWorkspace.sharedWorkspace()
+        configuration = {AppKit.NSWorkspaceLaunchConfigurationArguments: arguments}
+
+        return workspace.launchApplicationAtURL_options_configuration_error_(
+            bundleUrl,
+            AppKit.NSWorkspaceLaunchAllowingClassicStartup,
+            configuration,
+            None,
+        )
+
+    def observe_activations(self, callback):
+        def on_activation(notification):
+            app = notification.userInfo()[AppKit.NSWorkspaceApplicationKey]
+            callback(app.processIdentifier())
+
+        center = AppKit.NSWorkspace.sharedWorkspace().notificationCenter()
+        return center.addObserverForName_object_queue_usingBlock_(
+            AppKit.NSWorkspaceDidActivateApplicationNotification,
+            None,
+            None,
+            on_activation,
+        )
+
+    def remove_activation_observer(self, observer):
+        center = AppKit.NSWorkspace.sharedWorkspace().notificationCenter()
+        center.removeObserver_(observer)
+
+    def pump_run_loop(self):
+        CFRunLoopRunInMode(kCFRunLoopDefaultMode, 0, True)
+
+    def screen_frames(self):
+        # Quartz is only needed here, and takes a while to import
+        import Quartz
+
+        error, displays, count = Quartz.CGGetActiveDisplayList(32, None, None)
+        frames = []
+        for display in displays[:count]:
+            bounds = Quartz.CGDisplayBounds(display)
+            frames.append(
+                (
+                    bounds.origin.x,
+                    bounds.origin.y,
+                    bounds.size.width,
+                    bounds.size.height,
+                )
+            )
+        return frames
+
+    def set_pasteboard_text(self, text):
+        pasteboard = AppKit.NSPasteboard.generalPasteboard()
+        pasteboard.clearContents()
+        pasteboard.setString_forType_(text, AppKit.NSPasteboardTypeString)
@@ -0,0 +1,645 @@
+"""In-memory accessibility backend hosting synthetic application trees"""
+import collections
+import random
+import threading
+import time
+from collections import namedtuple
+
+from atomacos import backends
+from atomacos.errors import (
+    kAXErrorActionUnsupported,
+    kAXErrorAttributeUnsupported,
+    kAXErrorIllegalArgument,
+    kAXErrorInvalidUIElement,
+    kAXErrorNotificationAlreadyRegistered,
+    kAXErrorNotificationNotRegistered,
+    kAXErrorNotificationUnsupported,
+    kAXErrorNoValue,
+    kAXErrorSuccess,
+)
+
+Size = namedtuple("Size", ["width", "height"])
+Point = namedtuple("Point", ["x", "y"])
+Range = namedtuple("Range", ["location", "length"])
+
+# Notifications emitted when an attribute is set through the API
+ATTRIBUTE_NOTIFICATIONS = {
+    "AXValue": "AXValueChanged",
+    "AXTitle": "AXTitleChanged",
+    "AXPosition": "AXMoved",
+    "AXSize": "AXResized",
+    "AXFocused": "AXFocusedUIElementChanged",
+}
+
+_STRUCT_KINDS = {Size: backends.SIZE, Point: backends.POINT, Range: backends.RANGE}
+
+
+class SimulatedElement(object):
+    """An element of a simulated application.
+
+    Args:
+        role: the AXRole of the element
+        attributes: other attribute values, by name
+        children: child elements
+        actions: mapping of action names to callables receiving the element,
+            or None for actions that do nothing
+        settable: names of the attributes that can be set
+    """
+
+    def __init__(self, role, attributes=None, children=None, actions=None, settable=()):
+        self.attributes = dict(attributes or {})
+        self.attributes["AXRole"] = role
+        self.actions = dict(actions or {})
+        self.settable = set(settable)
+        self.parent = None
+        self.app = None
+        self.valid = True
+        self.children = []
+        for child in children or ():
+            self.add_child(child)
+
+    def __repr__(self):
+        return "<SimulatedElement %s %s>" % (
+            self.attributes["AXRole"],
+            self.attributes.get("AXTitle", ""),
+        )
+
+    @property
+    def role(self):
+        return self.attributes["AXRole"]
+
+    def add_child(self, child, index=None):
+        """Add a child element, emitting AXCreated if the element is live"""
+        child.parent = self
+        if index is None:
+            self.children.append(child)
+        else:
+            self.children.insert(index, child)
+        if self.app is not None:
+            self.app._adopt(child)
+            self.app.notify(child, "AXCreated")
+        return child
+
+    def remove(self):
+        """Remove the element from the tree, invalidating its subtree"""
+        # Notify first, observers of the ancestors must still be reachable
+        if self.app is not None:
+            self.app.notify(self, "AXUIElementDestroyed")
+        if self.parent is not None:
+            self.parent.children.remove(self)
+            self.parent = None
+        for element in self.walk():
+            element.valid = False
+
+    def walk(self):
+        """Yield the element and all of its descendants, depth first"""
+        stack = [self]
+        while stack:
+            element = stack.pop()
+            yield element
+            stack.extend(reversed(element.children))
+
+    def attribute_names(self):
+        names = list(self.attributes)
+        if self.children or self.role in ("AXApplication", "AXWindow", "AXGroup"):
+            names.append("AXChildren")
+        if self.parent is not None:
+            names.append("AXParent")
+        if self.role == "AXApplication":
+            names.extend(("AXWindows", "AXFrontmost"))
+        return names
+
+    def get(self, attribute):
+        """Return the value of an attribute, raising KeyError if unsupported"""
+        if attribute == "AXChildren":
+            return list(self.children)
+        if attribute == "AXParent" and self.parent is not None:
+            return self.parent
+        if attribute == "AXWindows" and self.role == "AXApplication":
+            return [child for child in self.children if child.role == "AXWindow"]
+        if attribute == "AXFrontmost" and self.role == "AXApplication":
+            return self.app is not None and self.app.is_frontmost()
+        return self.attributes[attribute]
+
+    def frame(self):
+        """Return (x, y, width, height), or None without position and size"""
+        position = self.attributes.get("AXPosition")
+        size = self.attributes.get("AXSize")
+        if position is None or size is None:
+            return None
+        return position.x, position.y, size.width, size.height
+
+
+class SimulatedApp(object):
+    """A simulated application, standing in for NSRunningApplication.
+
+    Args:
+        pid: the process ID of the application
+        bundle_id: its bundle identifier
+        name: its localized name
+        children: top level elements, e.g. windows and the menu bar
+        bundle_path: the path launchAppByBundlePath knows the app by
+    """
+
+    def __init__(self, pid, bundle_id, name, children=None, bundle_path=None):
+        self.pid = pid
+        self.bundle_id = bundle_id
+        self.name = name
+        self.bundle_path = bundle_path
+        self.backend = None
+        self.terminated = False
+        # Error code returned by every call on the application, if any
+        self.failure = None
+        # Extra seconds every call on the application takes
+        self.delay = 0.0
+        self.root = SimulatedElement("AXApplication", {"AXTitle": name})
+        for child in children or ():
+            self.root.add_child(child)
+        self._adopt(self.root)
+
+    def __repr__(self):
+        return "<SimulatedApp %s %s>" % (self.pid, self.bundle_id)
+
+    def processIdentifier(self):
+        return self.pid
+
+    def bundleIdentifier(self):
+        return self.bundle_id
+
+    def localizedName(self):
+        return self.name
+
+    def activateWithOptions_(self, options):
+        if self.backend is not None:
+            self.backend.activate(self.pid)
+        return True
+
+    def terminate(self):
+        if self.backend is not None and self.pid in self.backend.apps:
+            self.backend.remove_app(self.pid)
+        self.terminated = True
+        return True
+
+    def isTerminated(self):
+        return self.terminated
+
+    def is_frontmost(self):
+        return self.backend is not None and self.backend.frontmost_pid == self.pid
+
+    def notify(self, element, notification):
+        if self.backend is not None:
+            self.backend.emit(element, notification)
+
+    def _adopt(self, element):
+        for e in element.walk():
+            e.app = self
+
+
+class SimulatedObserver(object):
+    def __init__(self, pid, callback):
+        self.pid = pid
+        self.callback = callback
+        self.registrations = {}
+        self.queue = collections.deque()
+        self.condition = threading.Condition()
+
+    def post(self, element, notification, refcon):
+        with self.condition:
+            self.queue.append((element, notification, refcon))
+            self.condition.notify_all()
+
+
+class SimulatorBackend(backends.Backend):
+    """Backend serving simulated applications.
+
+    Args:
+        latency: seconds every element call takes, modelling IPC cost
+        notifications: whether changes made through the API emit
+            notifications
+        screens: the (x, y, width, height) of the simulated displays
+    """
+
+    def __init__(self, latency=0.0, notifications=True, screens=((0, 0, 1920, 1080),)):
+        self.latency = latency
+        self.notifications = notifications
+        self.screens = list(screens)
+        self.apps = collections.OrderedDict()
+        self.installed = {}
+        self.frontmost_pid = None
+        self.pasteboard = None
+        self.timeout = 0.0
+        self.calls = collections.Counter()
+        self._observers = []
+        self._activation_callbacks = []
+        self._lock = threading.RLock()
+        self.systemwide = SimulatedElement("AXSystemWide")
+
+    def add_app(self, app):
+        """Start serving a simulated application"""
+        app.backend = self
+        app.terminated = False
+        for element in app.root.walk():
+            element.valid = True
+        self.apps[app.pid] = app
+        self.installed[app.bundle_id] = app
+        if self.frontmost_pid is None:
+            self.frontmost_pid = app.pid
+        return app
+
+    def remove_app(self, pid):
+        app = self.apps.pop(pid)
+        for element in app.root.walk():
+            element.valid = False
+        if self.frontmost_pid == pid:
+            self.frontmost_pid = next(iter(self.apps), None)
+        return app
+
+    def activate(self, pid):
+        self.frontmost_pid = pid
+        for callback in list(self._activation_callbacks):
+            callback(pid)
+
+    def emit(self, element, notification, delay=0.0):
+        """Send notification about element to the interested observers.
+
+        Args:
+            delay: emit from a timer thread after delay seconds
+        """
+        if delay:
+            timer = threading.Timer(delay, self.emit, (element, notification))
+            timer.daemon = True
+            timer.start()
+            return
+        if not self.notifications or element.app is None:
+            return
+        ancestors = []
+        node = element
+        while node is not None:
+            ancestors.append(node)
+            node = node.parent
+        with self._lock:
+            observers = list(self._observers)
+        for observer in observers:
+            if observer.pid != element.app.pid:
+                continue
+            for node in ancestors:
+                key = (id(node), notification)
+                if key in observer.registrations:
+                    observer.post(element, notification, observer.registrations[key])
+                    break
+
+    # Elements
+
+    def _call(self, name, element):
+        """Account for one call, returning an error code or None"""
+        self.calls[name] += 1
+        app = element.app if isinstance(element, SimulatedElement) else None
+        if app is not None and app.delay:
+            time.sleep(app.delay)
+        if self.latency:
+            _wait(self.latency)
+        if not isinstance(element, SimulatedElement):
+            return kAXErrorIllegalArgument
+        if app is not None and app.failure is not None:
+            return app.failure
+        if not element.valid:
+            return kAXErrorInvalidUIElement
+        return None
+
+    def create_application(self, pid):
+        app = self.apps.get(pid)
+        if app is None:
+            element = SimulatedElement("AXApplication")
+            element.valid = False
+            return element
+        return app.root
+
+    def create_systemwide(self):
+        return self.systemwide
+
+    def copy_attribute_value(self, element, attribute):
+        error = self._call("copy_attribute_value", element)
+        if error is not None:
+            return error, None
+        try:
+            value = element.get(attribute)
+        except KeyError:
+            return kAXErrorAttributeUnsupported, None
+        if value is None:
+            return kAXErrorNoValue, None
+        return kAXErrorSuccess, value
+
+    def copy_multiple_attribute_values(self, element, attributes):
+        error = self._call("copy_multiple_attribute_values", element)
+        if error is not None:
+            return error, None
+        values = []
+        for attribute in attributes:
+            try:
+                values.append(element.get(attribute))
+            except KeyError:
+                values.append(None)
+        return kAXErrorSuccess, values
+
+    def copy_attribute_names(self, element):
+        error = self._call("copy_attribute_names", element)
+        if error is not None:
+            return error, None
+        return kAXErrorSuccess, element.attribute_names()
+
+    def copy_action_names(self, element):
+        error = self._call("copy_action_names", element)
+        if error is not None:
+            return error, None
+        return kAXErrorSuccess, list(element.actions)
+
+    def is_attribute_settable(self, element, attribute):
+        error = self._call("is_attribute_settable", element)
+        if error is not None:
+            return error, False
+        if attribute not in element.attribute_names():
+            return kAXErrorAttributeUnsupported, False
+        return kAXErrorSuccess, attribute in element.settable
+
+    def set_attribute_value(self, element, attribute, value):
+        error = self._call("set_attribute_value", element)
+        if error is not None:
+            return error
+        if attribute not in element.settable:
+            return kAXErrorAttributeUnsupported
+        element.attributes[attribute] = value
+        notification = ATTRIBUTE_NOTIFICATIONS.get(attribute)
+        if notification is not None and element.app is not None:
+            element.app.notify(element, notification)
+        return kAXErrorSuccess
+
+    def perform_action(self, element, action):
+        error = self._call("perform_action", element)
+        if error is not None:
+            return error
+        if action not in element.actions:
+            return kAXErrorActionUnsupported
+        handler = element.actions[action]
+        if handler is not None:
+            handler(element)
+        return kAXErrorSuccess
+
+    def get_pid(self, element):
+        self.calls["get_pid"] += 1
+        if not isinstance(element, SimulatedElement):
+            return kAXErrorIllegalArgument, 0
+        if element is self.systemwide:
+            return kAXErrorSuccess, 0
+        if element.app is None:
+            return kAXErrorInvalidUIElement, 0
+        return kAXErrorSuccess, element.app.pid
+
+    def copy_element_at_position(self, application, x, y):
+        error = self._call("copy_element_at_position", application)
+        if error is not None:
+            return error, None
+        if application is self.systemwide:
+            roots = [app.root for app in self.apps.values()]
+        else:
+            roots = [application]
+        for root in roots:
+            hit = _hit_test(root, x, y)
+            if hit is not None:
+                return kAXErrorSuccess, hit
+        return kAXErrorNoValue, None
+
+    def set_messaging_timeout(self, element, timeout):
+        self.calls["set_messaging_timeout"] += 1
+        if timeout < 0:
+            return kAXErrorIllegalArgument
+        self.timeout = timeout
+        return kAXErrorSuccess
+
+    def refs_equal(self, ref, other):
+        return ref is other
+
+    def is_process_trusted(self):
+        return True
+
+    # Observers
+
+    def observer_callback(self, function):
+        return function
+
+    def observer_create(self, pid, callback):
+        self.calls["observer_create"] += 1
+        observer = SimulatedObserver(pid, callback)
+        return kAXErrorSuccess, observer
+
+    def observer_add_notification(self, observer, element, notification, refcon):
+        error = self._call("observer_add_notification", element)
+        if error is not None:
+            return error
+        if element is self.systemwide:
+            return kAXErrorNotificationUnsupported
+        key = (id(element), notification)
+        if key in observer.registrations:
+            return kAXErrorNotificationAlreadyRegistered
+        observer.registrations[key] = refcon
+        with self._lock:
+            if observer not in self._observers:
+                self._observers.append(observer)
+        return kAXErrorSuccess
+
+    def observer_remove_notification(self, observer, element, notification):
+        self.calls["observer_remove_notification"] += 1
+        key = (id(element), notification)
+        if key not in observer.registrations:
+            return kAXErrorNotificationNotRegistered
+        del observer.registrations[key]
+        if not observer.registrations:
+            with self._lock:
+                self._observers.remove(observer)
+        return kAXErrorSuccess
+
+    def run_observer(self, observer, timeout, done):
+        end_time = time.time() + timeout
+        while not done():
+            with observer.condition:
+                while not observer.queue:
+                    remaining = end_time - time.time()
+                    if remaining <= 0:
+                        return
+                    observer.condition.wait(remaining)
+                element, notification, refcon = observer.queue.popleft()
+            observer.callback(observer, element, notification, refcon)
+
+    # Values
+
+    def value_kind(self, value):
+        if isinstance(value, str):
+            return backends.STRING
+        if isinstance(value, SimulatedElement):
+            return backends.ELEMENT
+        if isinstance(value, tuple):
+            return _STRUCT_KINDS.get(type(value))
+        if isinstance(value, list):
+            return backends.ARRAY
+        return None
+
+    def struct_value(self, value):
+        return tuple(value)
+
+    # Workspace
+
+    def running_applications(self):
+        return list(self.apps.values())
+
+    def running_applications_with_bundle_id(self, bundle_id):
+        return [app for app in self.apps.values() if app.bundle_id == bundle_id]
+
+    def running_application_with_pid(self, pid):
+        return self.apps.get(pid)
+
+    def frontmost_application(self):
+        return self.apps.get(self.frontmost_pid)
+
+    def launch_app_by_bundle_id(self, bundle_id):
+        app = self.installed.get(bundle_id)
+        if app is None:
+            raise RuntimeError("Error launching specified application. %s" % bundle_id)
+        if app.pid not in self.apps:
+            self.add_app(app)
+        self.activate(app.pid)
+
+    def launch_app_by_bundle_path(self, bundle_path, arguments):
+        for app in self.installed.values():
+            if app.bundle_path == bundle_path:
+                self.launch_app_by_bundle_id(app.bundle_id)
+                return app
+        return None
+
+    def observe_activations(self, callback):
+        self._activation_callbacks.append(callback)
+        return callback
+
+    def remove_activation_observer(self, observer):
+        if observer in self._activation_callbacks:
+            self._activation_callbacks.remove(observer)
+
+    def pump_run_loop(self):
+        pass
+
+    def screen_frames(self):
+        return list(self.screens)
+
+    def set_pasteboard_text(self, text):
+        self.pasteboard = text
+
+
+def _wait(seconds):
+    # sleep() is too coarse for the sub-millisecond latencies of most calls
+    if seconds >= 0.001:
+        time.sleep(seconds)
+        return
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def _hit_test(root, x, y):
+    """Return the deepest element under (x, y), children first"""
+    hit = None
+    stack = [root]
+    while stack:
+        element = stack.pop()
+        frame = element.frame()
+        if frame is not None:
+            ex, ey, width, height = frame
+            if not (ex <= x < ex + width and ey <= y < ey + height):
+                continue
+            hit = element
+        stack.extend(element.children)
+    return hit
+
+
+LEAF_ROLES = (
+    "AXButton",
+    "AXStaticText",
+    "AXTextField",
+    "AXCheckBox",
+    "AXRadioButton",
+    "AXPopUpButton",
+    "AXSlider",
+    "AXImage",
+)
+
+
+def generate_app(
+    pid=1000,
+    size=1000,
+    fanout=10,
+    windows=1,
+    seed=0,
+    bundle_id=None,
+    name=None,
+    settable=("AXValue", "AXFocused"),
+):
+    """Generate a deterministic application with about size elements.
+
+    Windows contain groups nested fanout wide, with leaves of the common
+    control roles. Every element gets a title, a position and a size, and
+    leaves get a value and an AXPress action.
+
+    Args:
+        pid: the process ID of the application
+        size: total number of elements below the application element
+        fanout: maximum number of children per group
+        windows: number of windows sharing the elements
+        seed: seed of the pseudo random generator picking roles and titles
+        settable: attributes of the leaves which can be set
+    """
+    rng = random.Random(seed)
+    name = name or "App%s" % pid
+    app = SimulatedApp(pid, bundle_id or "com.example.app%s" % pid, name)
+    counter = [0]
+
+    def make(role, x, y, width, height):
+        counter[0] += 1
+        number = counter[0]
+        attributes = {
+            "AXTitle": "%s %s" % (role[2:], number),
+            "AXIdentifier": "e%s" % number,
+            "AXPosition": Point(float(x), float(y)),
+            "AXSize": Size(float(width), float(height)),
+            "AXEnabled": True,
+        }
+        if role in LEAF_ROLES:
+            attributes["AXValue"] = "value %s" % number
+            attributes["AXFocused"] = False
+            return SimulatedElement(
+                role, attributes, actions={"AXPress": None}, settable=settable
+            )
+        return SimulatedElement(role, attributes, actions={"AXRaise": None})
+
+    def fill(parent, budget, x, y, width, height):
+        """Give parent children until budget elements were created"""
+        count = min(fanout, budget)
+        remaining = budget - count
+        slot = height / float(max(count, 1))
+        groups = []
+        for index in range(count):
+            top = y + index * slot
+            is_group = remaining > 0 and (index % 2 == 0 or rng.random() < 0.5)
+            role = "AXGroup" if is_group else rng.choice(LEAF_ROLES)
+            child = make(role, x + 4, top, width - 8, slot)
+            parent.add_child(child)
+            if is_group:
+                groups.append(child)
+        for index, group in enumerate(groups):
+            share = remaining // (len(groups) - index)
+            remaining -= share
+            gx, gy, gwidth, gheight = group.frame()
+            fill(group, share, gx, gy, gwidth, gheight)
+
+    per_window = max(size - windows, 0) // max(windows, 1)
+    for index in range(windows):
+        window = make("AXWindow", 40 * index, 40 * index, 1024, 768)
+        app.root.add_child(window)
+        fill(window, per_window, 40 * index, 40 * index, 1024, 768)
+    return app
@@ -1,19 +1,20 @@
-from ApplicationServices import (
-    kAXErrorActionUnsupported,
-    kAXErrorAPIDisabled,
-    kAXErrorAttributeUnsupported,
-    kAXErrorCannotComplete,
-    kAXErrorFailure,
-    kAXErrorIllegalArgument,
-    kAXErrorInvalidUIElement,
-    kAXErrorInvalidUIElementObserver,
-    kAXErrorNotificationAlreadyRegistered,
-    kAXErrorNotificationNotRegistered,
-    kAXErrorNotificationUnsupported,
-    kAXErrorNotImplemented,
-    kAXErrorNoValue,
-    kAXErrorSuccess,
-)
+from atomacos import _breaker, metrics
+
+# AXError codes, from HIServices/AXError.h
+kAXErrorSuccess = 0
+kAXErrorFailure = -25200
+kAXErrorIllegalArgument = -25201
+kAXErrorInvalidUIElement = -25202
+kAXErrorInvalidUIElementObserver = -25203
+kAXErrorCannotComplete = -25204
+kAXErrorAttributeUnsupported = -25205
+kAXErrorActionUnsupported = -25206
+kAXErrorNotificationUnsupported = -25207
+kAXErrorNotImplemented = -25208
+kAXErrorNotificationAlreadyRegistered = -25209
+kAXErrorNotificationNotRegistered = -25210
+kAXErrorAPIDisabled = -25211
+kAXErrorNoValue = -25212
 
 
 class AXError(Exception):
@@ -36,6 +37,14 @@ class AXErrorCannotComplete(AXError):
     pass
 
 
+class AXErrorTimeout(AXErrorCannotComplete):
+    """A call did not complete before its deadline, see app_workers"""
+
+
+class AXErrorAppNotResponding(AXErrorCannotComplete):
+    """The application failed too often lately, see set_circuit_breaker"""
+
+
 class AXErrorNotImplemented(AXError):
     pass
 
@@ -94,7 +103,22 @@ def AXErrorFactory(code):
     }.get(code, AXErrorUnsupported)
 
 
-def check_ax_error(error_code, error_messages):
+def check_circuit(element):
+    """
+    Raises AXErrorAppNotResponding if the circuit breaker holds back
+    the calls to the application of element.
+
+    Args:
+        element: the element about to be called
+    """
+    if _breaker.breaker is not None and not _breaker.allow(element):
+        metrics.count_error(AXErrorAppNotResponding)
+        raise AXErrorAppNotResponding(
+            "The application failed to respond to its last calls"
+        )
+
+
+def check_ax_error(error_code, error_messages, element=None):
     """
     Returns if code is kAXErrorSuccess.
     Raises an error with given message based on given error code.
@@ -103,7 +127,10 @@ def check_ax_error(error_code, error_messages):
     Args:
         error_code: the error code
         error_messages: mapping from error code to error message
+        element: the element called, counted by the circuit breaker
     """
+    if _breaker.breaker is not None and element is not None:
+        _breaker.record(element, error_code != kAXErrorCannotComplete)
     if error_code == kAXErrorSuccess:
         return
 
@@ -115,4 +142,6 @@ def check_ax_error(error_code, error_messages):
         else:
             error_message = "Unknown AX Error: %s" % error_code
 
-    raise AXErrorFactory(error_code)(error_message)
+    error_class = AXErrorFactory(error_code)
+    metrics.count_error(error_class)
+    raise error_class(error_message)
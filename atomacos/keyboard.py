@@ -1,3 +1,49 @@
 """keyboard api from pyautogui"""
-# flake8: noqa: F401
-from pyautogui import KEY_NAMES, hotkey, keyDown, keyUp, press, typewrite
+# pyautogui needs a display, so it is only imported on first use
+try:
+    from collections.abc import Sequence
+except ImportError:
+    from collections import Sequence
+
+
+def _deferred(name):
+    """Return a function calling name from pyautogui, imported on first use"""
+
+    def call(*args, **kwargs):
+        import pyautogui
+
+        return getattr(pyautogui, name)(*args, **kwargs)
+
+    call.__name__ = name
+    call.__doc__ = "See pyautogui.%s" % name
+    return call
+
+
+class _KeyNames(Sequence):
+    """pyautogui.KEY_NAMES, imported on first use"""
+
+    @staticmethod
+    def _names():
+        import pyautogui
+
+        return pyautogui.KEY_NAMES
+
+    def __getitem__(self, index):
+        return self._names()[index]
+
+    def __len__(self):
+        return len(self._names())
+
+    def __contains__(self, name):
+        return name in self._names()
+
+    def __iter__(self):
+        return iter(self._names())
+
+
+KEY_NAMES = _KeyNames()
+hotkey = _deferred("hotkey")
+keyDown = _deferred("keyDown")
+keyUp = _deferred("keyUp")
+press = _deferred("press")
+typewrite = _deferred("typewrite")
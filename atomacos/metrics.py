@@ -0,0 +1,330 @@
+"""Runtime metrics of the accessibility calls made by atomacos"""
+import bisect
+import functools
+import threading
+import weakref
+from time import perf_counter
+
+# Latency buckets in seconds, from a fast attribute read to a hung call
+DEFAULT_BUCKETS = (
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+class _ThreadToken(object):
+    """Lives as long as the thread-local values of one thread"""
+
+    __slots__ = ("__weakref__",)
+
+
+class Metric(object):
+    # Every thread updates a shard of its own without locking, and reading
+    # the metric adds up the shards. The shard of a thread which exited is
+    # added to _retired, so that short-lived pool threads do not pile up
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = {}
+        self._retired = {}
+        self._lock = threading.Lock()
+
+    def _shard(self):
+        """Return the values updated by the current thread"""
+        try:
+            return self._local.values
+        except AttributeError:
+            values = {}
+            token = self._local.token = _ThreadToken()
+            key = id(token)
+            # The thread-local token goes away when the thread exits
+            ref = weakref.ref(token, lambda _, key=key: self._retire(key))
+            with self._lock:
+                self._shards[key] = (values, ref)
+            self._local.values = values
+            return values
+
+    def _retire(self, key):
+        """Fold the values of a thread which exited into _retired"""
+        with self._lock:
+            values, _ = self._shards.pop(key)
+            for labels, value in values.items():
+                self._retired[labels] = self._merge(self._retired.get(labels), value)
+
+    def _merged(self):
+        """Return the values of all threads, by label values"""
+        with self._lock:
+            shards = [dict(values) for values, _ in self._shards.values()]
+            shards.append(dict(self._retired))
+        merged = {}
+        for shard in shards:
+            for key, value in shard.items():
+                merged[key] = self._merge(merged.get(key), value)
+        return merged
+
+    def reset(self):
+        with self._lock:
+            for values, _ in self._shards.values():
+                values.clear()
+            self._retired.clear()
+
+    def samples(self):
+        """Return (labels dict, value) pairs"""
+        return [
+            (dict(zip(self.labelnames, key)), self._value(value))
+            for key, value in self._merged().items()
+        ]
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, *labels):
+        """Add one to the counter with the given label values"""
+        try:
+            values = self._local.values
+        except AttributeError:
+            values = self._shard()
+        values[labels] = values.get(labels, 0) + 1
+
+    def value(self, *labels):
+        return self._merged().get(labels, 0)
+
+    def _merge(self, total, value):
+        return (total or 0) + value
+
+    def _value(self, value):
+        return value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super(Histogram, self).__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        self._bounds = [_format_value(bound) for bound in self.buckets] + ["+Inf"]
+
+    def observe(self, value, *labels):
+        """Record value in the histogram with the given label values"""
+        self._observe(labels, value)
+
+    def _observe(self, key, value):
+        try:
+            state = self._local.values[key]
+        except (AttributeError, KeyError):
+            state = self._shard()[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        state[bisect.bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def count(self, *labels):
+        """Return the number of values recorded with the given label values"""
+        state = self._merged().get(labels)
+        return sum(state[:-1]) if state is not None else 0
+
+    def _merge(self, total, value):
+        if total is None:
+            return list(value)
+        return [a + b for a, b in zip(total, value)]
+
+    def _value(self, state):
+        """Return {"buckets", "sum", "count"}, with cumulative bucket counts
+        by upper bound"""
+        cumulative = []
+        running = 0
+        for count in state[:-1]:
+            running += count
+            cumulative.append(running)
+        return {
+            "buckets": dict(zip(self._bounds, cumulative)),
+            "sum": state[-1],
+            "count": running,
+        }
+
+
+class Registry(object):
+    def __init__(self):
+        self.enabled = True
+        self.metrics = []
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._add(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, documentation, labelnames, buckets))
+
+    def _add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def reset(self):
+        for metric in self.metrics:
+            metric.reset()
+
+    def snapshot(self):
+        """Return the current values of all metrics.
+
+        Returns: a dict mapping metric names to lists of
+            {"labels": {...}, "value": ...} dicts
+        """
+        return {
+            metric.name: [
+                {"labels": labels, "value": value} for labels, value in metric.samples()
+            ]
+            for metric in self.metrics
+        }
+
+    def render_prometheus(self):
+        """Return all metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self.metrics:
+            lines.append("# HELP %s %s" % (metric.name, metric.documentation))
+            lines.append("# TYPE %s %s" % (metric.name, metric.type))
+            for labels, value in sorted(
+                metric.samples(), key=lambda sample: sorted(sample[0].items())
+            ):
+                if metric.type == "histogram":
+                    for bound, count in value["buckets"].items():
+                        bucket_labels = dict(labels, le=bound)
+                        lines.append(
+                            "%s_bucket%s %s"
+                            % (metric.name, _format_labels(bucket_labels), count)
+                        )
+                    lines.append(
+                        "%s_sum%s %s"
+                        % (metric.name, _format_labels(labels), repr(value["sum"]))
+                    )
+                    lines.append(
+                        "%s_count%s %s"
+                        % (metric.name, _format_labels(labels), value["count"])
+                    )
+                else:
+                    lines.append(
+                        "%s%s %s" % (metric.name, _format_labels(labels), value)
+                    )
+        return "\n".join(lines) + "\n"
+
+
+def _format_value(value):
+    return repr(float(value))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{%s}" % ",".join(
+        '%s="%s"' % (name, _escape(value)) for name, value in labels.items()
+    )
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+registry = Registry()
+
+# The _count of the histogram counts the calls of every function
+ax_call_duration = registry.histogram(
+    "atomacos_ax_call_duration_seconds",
+    "Duration of accessibility API calls",
+    ["function"],
+)
+ax_errors = registry.counter(
+    "atomacos_ax_errors_total", "AXErrors raised by check_ax_error", ["error"]
+)
+ax_retries = registry.counter(
+    "atomacos_ax_retries_total", "Reads retried by the retry policy", ["function"]
+)
+observer_callbacks = registry.counter(
+    "atomacos_observer_callbacks_total",
+    "Notifications received by observers",
+    ["notification"],
+)
+observer_callbacks_dropped = registry.counter(
+    "atomacos_observer_callbacks_dropped_total",
+    "Notifications received by observers which did not match",
+    ["notification"],
+)
+cache_lookups = registry.counter(
+    "atomacos_cache_lookups_total", "Cache lookups", ["cache", "result"]
+)
+
+
+def timed(function_name):
+    """Count the calls of the decorated wrapper and observe their latency"""
+
+    key = (function_name,)
+    observe = ax_call_duration._observe
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not registry.enabled:
+                return function(*args, **kwargs)
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                observe(key, perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+def count_error(error_class):
+    if registry.enabled:
+        ax_errors.inc(error_class.__name__)
+
+
+def count_retry(function_name):
+    if registry.enabled:
+        ax_retries.inc(function_name)
+
+
+def count_callback(notification, matched):
+    if registry.enabled:
+        observer_callbacks.inc(notification)
+        if not matched:
+            observer_callbacks_dropped.inc(notification)
+
+
+def count_cache(cache, hit):
+    if registry.enabled:
+        cache_lookups.inc(cache, "hit" if hit else "miss")
+
+
+def cache_hit_rate(cache):
+    """Return the share of lookups in cache which were hits, or None"""
+    hits = cache_lookups.value(cache, "hit")
+    total = hits + cache_lookups.value(cache, "miss")
+    return hits / float(total) if total else None
+
+
+def set_enabled(enabled):
+    """Enable or disable collecting metrics.
+
+    Returns: the previous setting
+    """
+    previous = registry.enabled
+    registry.enabled = bool(enabled)
+    return previous
@@ -1,18 +1,19 @@
 """mouse api from pyautogui"""
-# flake8: noqa: F401
-from pyautogui import (
-    click,
-    doubleClick,
-    dragRel,
-    dragTo,
-    hscroll,
-    middleClick,
-    mouseDown,
-    mouseUp,
-    moveRel,
-    moveTo,
-    position,
-    rightClick,
-    scroll,
-    tripleClick,
-)
+# pyautogui needs a display, so it is only imported on first use
+
+from atomacos.keyboard import _deferred
+
+click = _deferred("click")
+doubleClick = _deferred("doubleClick")
+dragRel = _deferred("dragRel")
+dragTo = _deferred("dragTo")
+hscroll = _deferred("hscroll")
+middleClick = _deferred("middleClick")
+mouseDown = _deferred("mouseDown")
+mouseUp = _deferred("mouseUp")
+moveRel = _deferred("moveRel")
+moveTo = _deferred("moveTo")
+position = _deferred("position")
+rightClick = _deferred("rightClick")
+scroll = _deferred("scroll")
+tripleClick = _deferred("tripleClick")
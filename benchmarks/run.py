@@ -0,0 +1,376 @@
+"""
+Benchmarks of element access, search, value conversion and waits.
+
+The benchmarks run against the simulator backend, so their results only
+depend on the library and on the latency every simulated call is given:
+
+    python benchmarks/run.py --save benchmarks/baselines/simulator.json
+    python benchmarks/run.py --compare benchmarks/baselines/simulator.json
+
+With --compare, the exit status is 1 when a benchmark got worse than the
+baseline by more than --threshold. It is also 1 when a benchmark with a
+budget, like the time `import atomacos` takes, goes over it.
+"""
+import argparse
+import collections
+import fnmatch
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import atomacos  # noqa: E402
+from atomacos import _converter, backends, metrics  # noqa: E402
+from atomacos.backends.simulator import (  # noqa: E402
+    Point,
+    Range,
+    SimulatedElement,
+    SimulatorBackend,
+    Size,
+    generate_app,
+)
+
+Result = collections.namedtuple("Result", ["value", "unit", "better"])
+
+BENCHMARKS = collections.OrderedDict()
+
+SEARCH_SIZES = (1000, 10000, 100000)
+
+
+def benchmark(name, unit, better="lower", floor=0.0, budget=None):
+    """Register function(options) returning a number as a benchmark.
+
+    Args:
+        better: "lower" or "higher"
+        floor: changes smaller than this are noise, never a regression
+        budget: the worst acceptable result, whatever the baseline
+    """
+
+    def register(function):
+        BENCHMARKS[name] = (function, unit, better, floor, budget)
+        return function
+
+    return register
+
+
+def measure(function, repeat):
+    """Return the durations of repeat calls of function"""
+    durations = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def simulated_app(options, pid=100, size=1000):
+    """Serve a generated application from a fresh simulator"""
+    simulator = SimulatorBackend(latency=options.latency)
+    simulator.add_app(generate_app(pid=pid, size=size))
+    backends.set_backend(simulator)
+    return simulator, atomacos.getAppRefByPid(pid)
+
+
+@benchmark("import_time", "ms", floor=10, budget=100)
+def import_time(options):
+    # A fresh interpreter for every sample, as for a short-lived script
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    samples = []
+    for _ in range(options.repeat):
+        output = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import atomacos"],
+            stderr=subprocess.PIPE,
+            env=env,
+            check=True,
+        ).stderr
+        for line in output.decode().splitlines():
+            fields = line.split("|")
+            if len(fields) == 3 and fields[2].strip() == "atomacos":
+                samples.append(int(fields[1]) / 1000.0)
+    return min(samples)
+
+
+@benchmark("attribute_read", "us")
+def attribute_read(options):
+    _, app = simulated_app(options)
+    button = app.findFirstR(AXRole="AXButton")
+    reads = 1000
+
+    def read():
+        for _ in range(reads):
+            button.AXTitle
+
+    return min(measure(read, options.repeat)) / reads * 1e6
+
+
+@benchmark("metrics_overhead", "ns", floor=200)
+def metrics_overhead(options):
+    calls = 100000
+
+    def call():
+        pass
+
+    timed = metrics.timed("benchmark")(call)
+
+    def run_plain():
+        for _ in range(calls):
+            call()
+
+    def run_timed():
+        for _ in range(calls):
+            timed()
+
+    plain = min(measure(run_plain, options.repeat))
+    return (min(measure(run_timed, options.repeat)) - plain) / calls * 1e9
+
+
+def search_benchmark(size):
+    def find_all_r(options):
+        _, app = simulated_app(options, size=size)
+        return min(measure(lambda: app.findAllR(AXRole="AXButton"), options.repeat))
+
+    return find_all_r
+
+
+for size in SEARCH_SIZES:
+    benchmark("find_all_r_%sk" % (size // 1000), "s")(search_benchmark(size))
+
+
+@benchmark("find_all_r_1k_traced", "s")
+def find_all_r_traced(options):
+    _, app = simulated_app(options)
+
+    def search():
+        with atomacos.trace():
+            app.findAllR(AXRole="AXButton")
+
+    return min(measure(search, options.repeat))
+
+
+@benchmark("convert_value", "values/s", better="higher")
+def convert_value(options):
+    simulator, _ = simulated_app(options)
+    elements = list(simulator.apps[100].root.walk())[:5]
+    values = [
+        "title",
+        Point(1.0, 2.0),
+        Size(3.0, 4.0),
+        Range(0, 5),
+        elements,
+        True,
+    ] * 1000
+    converter = _converter.Converter(atomacos.NativeUIElement)
+
+    def convert():
+        for value in values:
+            converter.convert_value(value)
+
+    return len(values) / min(measure(convert, options.repeat))
+
+
+@benchmark("spatial_hit_test", "us", floor=5)
+def spatial_hit_test(options):
+    _, app = simulated_app(options)
+    index = atomacos.spatial_index(app.snapshot())
+    points = [(x * 37 % 1920, x * 53 % 1080) for x in range(1000)]
+
+    def hit_test():
+        for point in points:
+            index.elements_at(point)
+
+    return min(measure(hit_test, options.repeat)) / len(points) * 1e6
+
+
+@benchmark("text_search", "us", floor=20)
+def text_search(options):
+    _, app = simulated_app(options)
+    index = atomacos.text_index(app.snapshot())
+    queries = ["button %d" % number for number in range(300)]
+
+    def search():
+        for query in queries:
+            index.search(query)
+
+    return min(measure(search, options.repeat)) / len(queries) * 1e6
+
+
+@benchmark("wait_for_latency", "ms", floor=0.5)
+def wait_for_latency(options):
+    simulator, app = simulated_app(options)
+    window = simulator.apps[100].root.children[0]
+    emitted = []
+
+    def create():
+        emitted.append(time.perf_counter())
+        window.add_child(SimulatedElement("AXSheet"))
+
+    latencies = []
+    for _ in range(options.repeat):
+        del emitted[:]
+        timer = threading.Timer(0.01, create)
+        timer.start()
+        app.waitForCreation(timeout=1)
+        latencies.append(time.perf_counter() - emitted[0])
+        timer.join()
+    return statistics.median(latencies) * 1e3
+
+
+@benchmark("wait_for_cpu", "%", floor=2.0)
+def wait_for_cpu(options):
+    _, app = simulated_app(options)
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    app.waitForCreation(timeout=0.25)
+    return (time.process_time() - cpu) / (time.perf_counter() - wall) * 100
+
+
+@benchmark("wrapper_memory", "bytes/element")
+def wrapper_memory(options):
+    _, app = simulated_app(options, size=10000)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        elements = app.findAllR()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return (after - before) / float(len(elements))
+
+
+def run(options):
+    """Run the selected benchmarks and return their results by name"""
+    results = collections.OrderedDict()
+    previous = backends.set_backend(None)
+    try:
+        for name, (function, unit, better, _, _) in BENCHMARKS.items():
+            if not any(fnmatch.fnmatch(name, p) for p in options.only):
+                continue
+            value = function(options)
+            results[name] = Result(value, unit, better)
+            print("%-20s %14.3f %s" % (name, value, unit))
+    finally:
+        backends.set_backend(previous)
+    return results
+
+
+def metadata(options):
+    try:
+        commit = subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL
+        )
+        commit = commit.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "latency": options.latency,
+        "repeat": options.repeat,
+    }
+
+
+def save(path, options, results):
+    data = {
+        "meta": metadata(options),
+        "results": {name: result._asdict() for name, result in results.items()},
+    }
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def over_budget(results):
+    """Return the names of the benchmarks whose result is over budget"""
+    over = []
+    for name, result in results.items():
+        budget = BENCHMARKS[name][4]
+        if budget is None:
+            continue
+        if result.value > budget if result.better == "lower" else result.value < budget:
+            print(
+                "%-20s %14.3f %s is over the budget of %s"
+                % (name, result.value, result.unit, budget)
+            )
+            over.append(name)
+    return over
+
+
+def compare(path, results, threshold):
+    """Print the change of every result against a baseline.
+
+    Returns: the names of the benchmarks that regressed
+    """
+    with open(path) as f:
+        baseline = json.load(f)["results"]
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        old = baseline[name]["value"]
+        change = (result.value - old) / old if old else 0.0
+        worsening = -change if result.better == "higher" else change
+        floor = BENCHMARKS[name][3]
+        worse = worsening > threshold and abs(result.value - old) > floor
+        if worse:
+            regressions.append(name)
+        print(
+            "%-20s %14.3f -> %14.3f %s %+7.1f%%%s"
+            % (
+                name,
+                old,
+                result.value,
+                result.unit,
+                change * 100,
+                "  REGRESSION" if worse else "",
+            )
+        )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.0,
+        help="seconds every simulated accessibility call takes",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--only",
+        action="append",
+        default=[],
+        help="only run the benchmarks matching this pattern",
+    )
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="compare with this JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    options = parser.parse_args(argv)
+    options.only = options.only or ["*"]
+
+    results = run(options)
+    if options.save:
+        save(options.save, options, results)
+    status = 1 if over_budget(results) else 0
+    if options.compare:
+        print("")
+        if compare(options.compare, results, options.threshold):
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
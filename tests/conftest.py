@@ -1,10 +1,19 @@
 import os
 import subprocess
+import sys
 import time
 
 import atomacos
 import pytest
-from atomacos import _converter
+from atomacos import _converter, backends
+from atomacos.backends.simulator import SimulatorBackend, generate_app
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "generated_app(**options): generate_app options of the app fixture",
+    )
 
 
 def pytest_exception_interact(node, call, report):
@@ -15,19 +24,7 @@ def pytest_exception_interact(node, call, report):
         subprocess.call("rm .env/{}".format(filename), shell=True)
 
         print("Printing all elements")
-        for app in atomacos.NativeUIElement.getRunningApps():
-            pid = app.processIdentifier()
-            app_ref = atomacos.NativeUIElement.from_pid(pid)
-            print("\n%s" % app_ref)
-            for child in app_ref._generateChildren(recursive=True):
-                print("%s" % child)
-                for attribute in child.ax_attributes:
-                    if attribute == "AXChildren":
-                        continue
-                    try:
-                        print({attribute: child._get_ax_attribute(attribute)})
-                    except atomacos.errors.AXError as e:
-                        print("Issue getting %s: %s" % (attribute, e))
+        atomacos.crawl_all(sys.stdout, per_app_budget=10.0)
 
 
 def app_by_bid(bid):
@@ -44,6 +41,24 @@ def app_by_bid(bid):
     return app
 
 
+@pytest.fixture
+def simulator():
+    simulator = SimulatorBackend()
+    previous = backends.set_backend(simulator)
+    yield simulator
+    backends.set_backend(previous)
+
+
+@pytest.fixture
+def app(simulator, request):
+    """The application of pid 100 on the simulator, generated with the
+    options of the closest generated_app marker"""
+    marker = request.node.get_closest_marker("generated_app")
+    options = marker.kwargs if marker is not None else {}
+    simulator.add_app(generate_app(pid=100, **options))
+    return atomacos.getAppRefByPid(100)
+
+
 @pytest.fixture(scope="module")
 def automator_app():
     bid = "com.apple.Automator"
@@ -0,0 +1,102 @@
+import pytest
+from atomacos import NativeUIElement, _batch, errors
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+
+    def perform(ref, action):
+        calls.append(("perform", ref, action))
+        if ref == "broken":
+            raise errors.AXErrorCannotComplete("broken")
+
+    def settable(ref, attribute):
+        calls.append(("settable", ref, attribute))
+        return ref != "readonly"
+
+    def set_value(ref, attribute, value):
+        calls.append(("set", ref, attribute, value))
+
+    monkeypatch.setattr(_batch, "PAXUIElementPerformAction", perform)
+    monkeypatch.setattr(_batch, "PAXUIElementIsAttributeSettable", settable)
+    monkeypatch.setattr(_batch, "PAXUIElementSetAttributeValue", set_value)
+    return calls
+
+
+@pytest.fixture
+def app(monkeypatch):
+    app = NativeUIElement("app")
+    app.activations = 0
+
+    def ensure_active():
+        app.activations += 1
+
+    monkeypatch.setattr(app, "_ensure_active", ensure_active)
+    return app
+
+
+def test_batch_runs_on_exit_with_one_activation(calls, app):
+    button, field = NativeUIElement("button"), NativeUIElement("field")
+    with app.batch() as b:
+        b.press(button)
+        b.set(field, "AXValue", "x")
+        b.perform(button, "Confirm")
+        assert calls == []
+
+    assert app.activations == 1
+    assert calls == [
+        ("settable", "field", "AXValue"),
+        ("perform", "button", "AXPress"),
+        ("set", "field", "AXValue", "x"),
+        ("perform", "button", "AXConfirm"),
+    ]
+    assert b.errors == []
+
+
+def test_batch_checks_settable_once_per_attribute(calls, app):
+    field = NativeUIElement("field")
+    with app.batch() as b:
+        b.set(field, "AXValue", "a")
+        b.set(field, "AXFocused", True)
+        b.set(field, "AXValue", "b")
+
+    assert [c for c in calls if c[0] == "settable"] == [
+        ("settable", "field", "AXValue"),
+        ("settable", "field", "AXFocused"),
+    ]
+    assert app.activations == 0
+
+
+def test_batch_coalesces_consecutive_sets(calls, app):
+    field = NativeUIElement("field")
+    with app.batch(check_settable=False) as b:
+        b.set(field, "AXValue", "a")
+        b.set(field, "AXValue", "ab")
+
+    assert calls == [("set", "field", "AXValue", "ab")]
+
+
+def test_batch_captures_errors_per_step(calls, app):
+    broken, readonly = NativeUIElement("broken"), NativeUIElement("readonly")
+    ok = NativeUIElement("ok")
+    with app.batch() as b:
+        b.press(broken)
+        b.set(readonly, "AXValue", "x")
+        b.press(ok)
+
+    assert ("perform", "ok", "AXPress") in calls
+    assert not any(c[0] == "set" for c in calls)
+    failed = b.errors
+    assert [step.element.ref for step in failed] == ["broken", "readonly"]
+    assert isinstance(failed[0].error, errors.AXErrorCannotComplete)
+    assert isinstance(failed[1].error, errors.AXErrorUnsupported)
+
+
+def test_batch_not_run_when_block_raises(calls, app):
+    with pytest.raises(RuntimeError):
+        with app.batch() as b:
+            b.press(NativeUIElement("button"))
+            raise RuntimeError
+
+    assert calls == []
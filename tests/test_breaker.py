@@ -0,0 +1,69 @@
+import atomacos
+import pytest
+from atomacos import _breaker
+from atomacos._macos import PAXUIElementCopyAttributeValue
+
+
+pytestmark = pytest.mark.generated_app(size=10)
+
+
+@pytest.fixture(autouse=True)
+def no_circuit_breaker():
+    yield
+    atomacos.set_circuit_breaker(None)
+
+
+def read_role(app):
+    return PAXUIElementCopyAttributeValue(app.ref, "AXRole")
+
+
+def test_circuit_opens_after_failures_in_a_row(app, simulator):
+    breaker = atomacos.set_circuit_breaker(failures=3, cooldown=60.0)
+    simulator.apps[100].failure = -25204
+    for _ in range(3):
+        with pytest.raises(atomacos.ErrorCannotComplete):
+            read_role(app)
+    assert breaker.state(100) == _breaker.OPEN
+
+    calls = sum(simulator.calls.values())
+    with pytest.raises(atomacos.ErrorAppNotResponding):
+        read_role(app)
+    assert simulator.calls["copy_attribute_value"] == 3
+    assert sum(simulator.calls.values()) == calls + 1  # the pid lookup
+
+
+def test_probe_after_cooldown_closes_or_reopens(app, simulator, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(_breaker.time, "monotonic", lambda: clock[0])
+    breaker = atomacos.set_circuit_breaker(failures=1, cooldown=10.0)
+    simulator.apps[100].failure = -25204
+    with pytest.raises(atomacos.ErrorCannotComplete):
+        read_role(app)
+
+    clock[0] += 11
+    with pytest.raises(atomacos.ErrorCannotComplete) as failed_probe:
+        read_role(app)
+    assert not isinstance(failed_probe.value, atomacos.ErrorAppNotResponding)
+    assert breaker.state(100) == _breaker.OPEN
+
+    simulator.apps[100].failure = None
+    with pytest.raises(atomacos.ErrorAppNotResponding):
+        read_role(app)
+    clock[0] += 11
+    assert read_role(app) == "AXApplication"
+    assert breaker.state(100) == _breaker.CLOSED
+    assert breaker.circuits == {}
+
+
+def test_other_errors_count_as_answers(app, simulator):
+    breaker = atomacos.set_circuit_breaker(failures=2)
+    simulator.apps[100].failure = -25204
+    with pytest.raises(atomacos.ErrorCannotComplete):
+        read_role(app)
+    simulator.apps[100].failure = -25205
+    with pytest.raises(atomacos.Error):
+        read_role(app)
+    simulator.apps[100].failure = -25204
+    with pytest.raises(atomacos.ErrorCannotComplete):
+        read_role(app)
+    assert breaker.state(100) == _breaker.CLOSED
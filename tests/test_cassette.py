@@ -0,0 +1,115 @@
+import threading
+
+import atomacos
+import pytest
+from atomacos import backends
+from atomacos.backends.cassette import CassetteError
+from atomacos.backends.simulator import SimulatedElement, generate_app
+from atomacos.errors import AXErrorCannotComplete
+
+
+@pytest.fixture
+def cassette(simulator, tmp_path):
+    simulator.add_app(generate_app(pid=100, size=100))
+    path = str(tmp_path / "cassette.json")
+    with atomacos.record_cassette(path):
+        app = atomacos.getAppRefByPid(100)
+        buttons = app.findAllR(AXRole="AXButton")
+        buttons[0].AXValue = "changed"
+        buttons[0].Press()
+        recorded = [(b.AXTitle, b.AXPosition) for b in buttons]
+    backends.set_backend(None)
+    return path, recorded
+
+
+def test_replay_without_backend(cassette):
+    path, recorded = cassette
+    with atomacos.replay_cassette(path) as player:
+        app = atomacos.getAppRefByPid(100)
+        buttons = app.findAllR(AXRole="AXButton")
+        buttons[0].AXValue = "changed"
+        buttons[0].Press()
+        assert [(b.AXTitle, b.AXPosition) for b in buttons] == recorded
+    assert player.unused == 0
+
+
+def test_strict_replay_rejects_other_calls(cassette):
+    path, _ = cassette
+    with atomacos.replay_cassette(path):
+        app = atomacos.getAppRefByPid(100)
+        with pytest.raises(CassetteError):
+            app.AXTitle = "other"
+
+
+def test_lenient_replay_reuses_answers(cassette):
+    path, _ = cassette
+    with atomacos.replay_cassette(path, strict=False):
+        app = atomacos.getAppRefByPid(100)
+        first = app.findAllR(AXRole="AXButton")
+        second = app.findAllR(AXRole="AXButton")
+        assert first == second
+        with pytest.raises(CassetteError):
+            app.AXTitle = "never recorded"
+
+
+def test_replay_notifications(simulator, tmp_path):
+    app = simulator.add_app(generate_app(pid=100, size=10))
+    window = app.root.children[0]
+    path = str(tmp_path / "wait.json")
+    with atomacos.record_cassette(path):
+        app_ref = atomacos.getAppRefByPid(100)
+        sheet = SimulatedElement("AXSheet", {"AXTitle": "Save"})
+        threading.Timer(0.05, window.add_child, (sheet,)).start()
+        assert app_ref.waitForCreation(timeout=2).AXTitle == "Save"
+    backends.set_backend(None)
+
+    with atomacos.replay_cassette(path):
+        app_ref = atomacos.getAppRefByPid(100)
+        assert app_ref.waitForCreation(timeout=2).AXTitle == "Save"
+
+
+def test_replay_raises_recorded_errors(simulator, tmp_path, monkeypatch):
+    def set_pasteboard_text(text):
+        raise AXErrorCannotComplete("Pasteboard busy")
+
+    def launch_app_by_bundle_id(bundle_id):
+        raise UnicodeDecodeError("utf-8", b"", 0, 1, "bad")
+
+    monkeypatch.setattr(simulator, "set_pasteboard_text", set_pasteboard_text)
+    monkeypatch.setattr(simulator, "launch_app_by_bundle_id", launch_app_by_bundle_id)
+    path = str(tmp_path / "errors.json")
+    with atomacos.record_cassette(path):
+        with pytest.raises(AXErrorCannotComplete):
+            backends.get_backend().set_pasteboard_text("text")
+        with pytest.raises(UnicodeDecodeError):
+            backends.get_backend().launch_app_by_bundle_id("com.example")
+    backends.set_backend(None)
+
+    with atomacos.replay_cassette(path):
+        with pytest.raises(AXErrorCannotComplete, match="Pasteboard busy"):
+            backends.get_backend().set_pasteboard_text("text")
+        # Classes which cannot be built from their message
+        with pytest.raises(RuntimeError):
+            backends.get_backend().launch_app_by_bundle_id("com.example")
+
+
+def test_replay_only_raises_atomacos_and_builtin_errors(
+    simulator, tmp_path, monkeypatch
+):
+    def set_pasteboard_text(text):
+        raise ValueError("Pasteboard busy")
+
+    monkeypatch.setattr(simulator, "set_pasteboard_text", set_pasteboard_text)
+    path = tmp_path / "errors.json"
+    with atomacos.record_cassette(str(path)):
+        with pytest.raises(ValueError):
+            backends.get_backend().set_pasteboard_text("text")
+    backends.set_backend(None)
+    text = path.read_text()
+    module = ValueError.__module__
+    assert '"module": "%s"' % module in text
+    path.write_text(text.replace('"module": "%s"' % module, '"module": "subprocess"'))
+
+    with atomacos.replay_cassette(str(path)):
+        with pytest.raises(CassetteError, match="subprocess.ValueError"):
+            backends.get_backend().set_pasteboard_text("text")
@@ -0,0 +1,44 @@
+import io
+
+import atomacos
+import pytest
+from atomacos import _crawl
+from atomacos.backends.simulator import generate_app
+
+pytestmark = pytest.mark.skipif(
+    _crawl.multiprocessing.get_start_method() != "fork",
+    reason="worker processes only inherit the simulator when forked",
+)
+
+
+@pytest.fixture
+def apps(simulator):
+    for pid in (100, 200, 300):
+        simulator.add_app(generate_app(pid=pid, size=100, seed=pid))
+    return simulator
+
+
+def test_crawl_all_merges_every_app(apps):
+    stream = io.StringIO()
+    statuses = atomacos.crawl_all(stream, processes=2)
+    assert [s["app"] for s in statuses] == [100, 200, 300]
+    assert {s["status"] for s in statuses} == {"complete"}
+
+    inventory = atomacos.load_dump(io.StringIO(stream.getvalue()))
+    assert len(inventory) == 303
+    assert {root.pid for root in inventory.roots} == {100, 200, 300}
+    assert inventory.findFirstR(AXRole="AXButton") is not None
+
+
+def test_hung_app_does_not_hold_back_the_others(apps, monkeypatch):
+    monkeypatch.setattr(_crawl, "GRACE", 0.0)
+    apps.apps[200].delay = 10.0
+    stream = io.StringIO()
+    statuses = atomacos.crawl_all(stream, processes=3, per_app_budget=1.0)
+    assert [s["status"] for s in statuses] == [
+        "complete",
+        "not responding",
+        "complete",
+    ]
+    inventory = atomacos.load_dump(io.StringIO(stream.getvalue()))
+    assert {root.pid for root in inventory.roots} == {100, 300}
@@ -0,0 +1,79 @@
+import io
+
+import atomacos
+import pytest
+from atomacos.backends.simulator import SimulatedElement
+
+
+pytestmark = pytest.mark.generated_app(size=300)
+
+
+@pytest.fixture
+def tree(app, simulator):
+    return simulator.apps[100].root
+
+
+def change_tree(tree):
+    """Change a title, remove a leaf, add a sheet and move a group"""
+    window = tree.children[0]
+    groups = [e for e in window.walk() if e.role == "AXGroup"]
+    leaf = next(e for e in groups[0].children if not e.children)
+    leaf.attributes["AXTitle"] = "Renamed"
+    removed = next(e for e in groups[1].children if not e.children)
+    removed.remove()
+    window.add_child(SimulatedElement("AXSheet", {"AXIdentifier": "sheet"}))
+    moved = groups[-1]
+    moved.parent.children.remove(moved)
+    window.children.insert(0, moved)
+    moved.parent = window
+    return leaf, removed, moved
+
+
+def summary(changes):
+    return sorted(
+        (c.kind, (c.new or c.old).AXIdentifier)
+        + ((tuple(sorted(c.attributes)),) if c.attributes else ())
+        for c in changes
+    )
+
+
+def dump(app):
+    stream = io.StringIO()
+    app.dump(stream)
+    stream.seek(0)
+    return atomacos.load_dump(stream)
+
+
+def test_identical_trees_have_no_changes(app):
+    assert atomacos.diff(dump(app), dump(app)) == []
+
+
+def test_diff_snapshots_matched_by_reference(app, tree):
+    with app.snapshot() as before:
+        leaf, removed, moved = change_tree(tree)
+        with app.snapshot() as after:
+            changes = atomacos.diff(before, after)
+    assert summary(changes) == [
+        ("added", "sheet"),
+        ("changed", leaf.attributes["AXIdentifier"], ("AXTitle",)),
+        ("moved", moved.attributes["AXIdentifier"]),
+        ("removed", removed.attributes["AXIdentifier"]),
+    ]
+    (changed,) = [c for c in changes if c.kind == "changed"]
+    assert changed.attributes["AXTitle"][1] == "Renamed"
+    assert changed.path.startswith("/AXApplication[0]/AXWindow[0]/")
+
+
+def test_diff_dumps_matched_by_heuristics(app, tree, tmpdir):
+    before = dump(app)
+    leaf, removed, moved = change_tree(tree)
+    path = str(tmpdir.join("after.axsnap"))
+    atomacos.save_snapshot(app, path)
+    with atomacos.open_snapshot(path) as after:
+        changes = atomacos.diff(before, after)
+        assert summary(changes) == [
+            ("added", "sheet"),
+            ("changed", leaf.attributes["AXIdentifier"], ("AXTitle",)),
+            ("moved", moved.attributes["AXIdentifier"]),
+            ("removed", removed.attributes["AXIdentifier"]),
+        ]
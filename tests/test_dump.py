@@ -0,0 +1,85 @@
+import io
+import json
+
+import atomacos
+import pytest
+from atomacos.backends.simulator import generate_app
+from atomacos.errors import kAXErrorAPIDisabled, kAXErrorCannotComplete
+
+
+pytestmark = pytest.mark.generated_app(size=200)
+
+
+@pytest.fixture
+def apps(app, simulator):
+    simulator.add_app(generate_app(pid=200, size=100, seed=1))
+    return simulator
+
+
+def test_dump_streams_nodes_with_batched_reads(apps):
+    app = atomacos.getAppRefByPid(100)
+    stream = io.StringIO()
+    apps.calls.clear()
+    (status,) = app.dump(stream)
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    nodes = [r for r in records if "id" in r]
+    assert status == records[-1]
+    assert status["status"] == "complete" and status["nodes"] == 201
+    assert len(nodes) == 201
+    assert nodes[0]["parent"] is None and nodes[0]["depth"] == 0
+    ids = set()
+    for node in nodes:
+        assert node["parent"] is None or node["parent"] in ids
+        ids.add(node["id"])
+    assert nodes[1]["attributes"]["AXRole"] == "AXWindow"
+    assert nodes[1]["attributes"]["AXSize"] == [1024.0, 768.0]
+    assert apps.calls["copy_multiple_attribute_values"] == 201
+    assert apps.calls["copy_attribute_value"] == 0
+
+
+def test_dump_depth_and_attributes(apps):
+    stream = io.StringIO()
+    atomacos.getAppRefByPid(100).dump(stream, depth=1, attributes=["AXRole"])
+    tree = atomacos.load_dump(io.StringIO(stream.getvalue()))
+    assert len(tree) == 2
+    assert [e.AXRole for e in tree.findAllR()] == ["AXApplication", "AXWindow"]
+    assert not hasattr(tree.findFirstR(AXRole="AXWindow"), "AXTitle")
+
+
+def test_dump_all_apps_skips_unresponsive_ones(apps, tmpdir):
+    apps.apps[200].failure = kAXErrorCannotComplete
+    path = str(tmpdir.join("tree.jsonl"))
+    with open(path, "w") as f:
+        statuses = atomacos.NativeUIElement.systemwide().dump(f, workers=2)
+    assert [(s["app"], s["status"]) for s in statuses] == [
+        (100, "complete"),
+        (200, "not responding"),
+    ]
+    tree = atomacos.load_dump(path)
+    assert len(tree.apps) == 2
+    buttons = tree.findAllR(AXRole="AXButton")
+    live = atomacos.getAppRefByPid(100).findAllR(AXRole="AXButton")
+    assert [b.AXTitle for b in buttons] == [b.AXTitle for b in live]
+    assert buttons[0].pid == 100
+    assert buttons[0].AXParent.AXChildren.count(buttons[0]) == 1
+
+
+def test_dump_all_apps_keeps_going_after_a_failed_app(apps):
+    apps.apps[200].failure = kAXErrorAPIDisabled
+    stream = io.StringIO()
+    statuses = atomacos.NativeUIElement.systemwide().dump(stream, workers=2)
+    assert statuses[0]["status"] == "complete"
+    assert statuses[1]["app"] == 200
+    assert statuses[1]["status"].startswith("failed: ")
+    tree = atomacos.load_dump(io.StringIO(stream.getvalue()))
+    assert len(tree.findAllR(AXRole="AXButton")) == len(
+        atomacos.getAppRefByPid(100).findAllR(AXRole="AXButton")
+    )
+
+
+def test_dump_stops_at_the_budget(apps):
+    apps.apps[100].delay = 0.01
+    stream = io.StringIO()
+    (status,) = atomacos.getAppRefByPid(100).dump(stream, budget=0.05)
+    assert status["status"] == "budget exceeded"
+    assert 0 < status["nodes"] < 201
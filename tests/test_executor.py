@@ -0,0 +1,60 @@
+import threading
+import time
+
+import atomacos
+import pytest
+from atomacos._macos import PAXUIElementCopyAttributeValue
+from atomacos.backends.simulator import generate_app
+
+
+pytestmark = pytest.mark.generated_app(size=50)
+
+
+@pytest.fixture
+def apps(app, simulator):
+    simulator.add_app(generate_app(pid=200, size=50))
+    return app, atomacos.getAppRefByPid(200)
+
+
+def test_hung_app_times_out_without_blocking_others(apps, simulator):
+    hung, healthy = apps
+    simulator.apps[100].delay = 1.0
+    with atomacos.app_workers(timeout=5.0) as workers:
+        start = time.perf_counter()
+        with atomacos.deadline(0.1):
+            with pytest.raises(atomacos.ErrorTimeout):
+                PAXUIElementCopyAttributeValue(hung.ref, "AXRole")
+        assert time.perf_counter() - start < 0.5
+        assert healthy.findFirstR(AXRole="AXButton") is not None
+        assert workers.abandoned == 1
+
+        # The next calls start on a fresh worker, not behind the stuck one
+        simulator.apps[100].delay = 0.0
+        with atomacos.deadline(0.5):
+            assert hung.AXRole == "AXApplication"
+
+
+def test_submit_runs_calls_on_the_worker_of_the_app(apps):
+    app = apps[0]
+    threads = []
+
+    def find():
+        threads.append(threading.current_thread().name)
+        return app.findFirstR(AXRole="AXButton")
+
+    with atomacos.app_workers() as workers:
+        future = workers.submit(app.pid, find)
+        assert future.result(timeout=5) is not None
+    assert threads == ["atomacos-app-100"]
+
+
+def test_calls_queued_past_their_deadline_expire(apps, simulator):
+    app = apps[0]
+    simulator.apps[100].delay = 0.3
+    with atomacos.app_workers(timeout=None) as workers:
+        with atomacos.deadline(0.1):
+            first = workers.submit(app.pid, lambda: app.AXRole)
+            second = workers.submit(app.pid, lambda: app.AXRole)
+        with pytest.raises(atomacos.ErrorTimeout):
+            second.result(timeout=5)
+        assert first.result(timeout=5) == "AXApplication"
@@ -0,0 +1,62 @@
+import time
+
+import atomacos
+import pytest
+from atomacos.backends.simulator import SimulatedElement, generate_app
+from atomacos.errors import kAXErrorInvalidUIElement
+
+
+@pytest.fixture
+def apps(simulator):
+    for pid in (100, 200, 300):
+        simulator.add_app(generate_app(pid=pid, size=100, seed=pid))
+    dialog = SimulatedElement("AXWindow", {"AXTitle": "Update available"})
+    simulator.apps[200].root.add_child(dialog)
+    return simulator
+
+
+def test_find_in_apps_yields_matches_of_every_app(apps):
+    found = list(atomacos.find_in_apps({"AXRole": "AXWindow"}))
+    assert sorted(app.pid for app, _ in found) == [100, 200, 200, 300]
+
+    found = list(
+        atomacos.find_in_apps({"AXRole": "AXWindow"}, bundle_ids=["com.example.app300"])
+    )
+    assert [app.pid for app, _ in found] == [300]
+
+
+def test_a_failing_subtree_does_not_end_the_search(apps, monkeypatch):
+    stale = SimulatedElement("AXGroup", children=[SimulatedElement("AXButton")])
+    apps.apps[200].root.add_child(stale, index=0)
+    copy_attribute_value = apps.copy_attribute_value
+
+    def copy_going_away(element, attribute):
+        # The group goes away after its attribute names were read
+        if element is stale:
+            return kAXErrorInvalidUIElement, None
+        return copy_attribute_value(element, attribute)
+
+    monkeypatch.setattr(apps, "copy_attribute_value", copy_going_away)
+    found = list(atomacos.find_in_apps({"AXTitle": "Update*"}))
+    assert [(app.pid, element.AXTitle) for app, element in found] == [
+        (200, "Update available")
+    ]
+
+
+def test_first_match_cancels_the_other_searches(apps):
+    apps.apps[100].delay = 0.005
+    apps.apps[300].delay = 0.005
+    start = time.perf_counter()
+    found = list(
+        atomacos.find_in_apps(
+            {"AXRole": "AXWindow", "AXTitle": "Update*"}, workers=3, first=True
+        )
+    )
+    assert [(app.pid, element.AXTitle) for app, element in found] == [
+        (200, "Update available")
+    ]
+    assert time.perf_counter() - start < 0.5
+    time.sleep(0.05)
+    calls = sum(apps.calls.values())
+    time.sleep(0.05)
+    assert sum(apps.calls.values()) == calls
@@ -0,0 +1,47 @@
+import io
+import subprocess
+import sys
+import types
+
+import atomacos
+
+# Modules which importing atomacos must not import
+DEFERRED = (
+    "AppKit",
+    "ApplicationServices",
+    "CoreFoundation",
+    "Quartz",
+    "objc",
+    "pyautogui",
+    "concurrent.futures",
+    "atomacos.backends.cassette",
+    "atomacos._dump",
+    "atomacos._diff",
+    "atomacos._snapshot_file",
+)
+
+
+def test_import_defers_frameworks_and_rare_modules():
+    output = subprocess.check_output(
+        [sys.executable, "-c", "import sys, atomacos; print(' '.join(sys.modules))"]
+    )
+    loaded = set(output.decode().split())
+    assert [name for name in DEFERRED if name in loaded] == []
+
+
+def test_deferred_functions_import_on_call():
+    dump = atomacos.load_dump(io.StringIO('{"app": 1, "status": "complete"}\n'))
+    assert dump.apps == [{"app": 1, "status": "complete"}]
+    assert atomacos.diff.__name__ == "diff"
+
+
+def test_input_functions_import_pyautogui_on_call(monkeypatch):
+    pyautogui = types.ModuleType("pyautogui")
+    pyautogui.KEY_NAMES = ["a", "b"]
+    pyautogui.press = lambda key: "press %s" % key
+    pyautogui.position = lambda: (1, 2)
+    monkeypatch.setitem(sys.modules, "pyautogui", pyautogui)
+    assert atomacos.keyboard.press("a") == "press a"
+    assert atomacos.mouse.position() == (1, 2)
+    assert "b" in atomacos.keyboard.KEY_NAMES
+    assert list(atomacos.keyboard.KEY_NAMES) == ["a", "b"]
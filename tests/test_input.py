@@ -1,6 +1,10 @@
 import subprocess
 import time
 
+import pytest
+from atomacos import NativeUIElement, _input_backend
+from atomacos._input_backend import KeyEvent, MouseEvent
+
 
 def calculate_center(size, position):
     center = (position.x + size.width / 2, position.y + size.height / 2)
@@ -82,3 +86,140 @@ def test_drag_folders(finder_app):
         "ls {}/helloworld".format(test_path), shell=True, universal_newlines=True
     )
     assert "helloworld2" in output
+
+
+@pytest.fixture
+def posted_batches():
+    batches = []
+    backend = _input_backend.QuartzBackend(poster=batches.append)
+    previous = _input_backend.set_input_backend(backend)
+    yield batches
+    _input_backend.set_input_backend(previous)
+
+
+def test_quartz_click_with_mods_posts_one_batch(posted_batches):
+    sut = NativeUIElement()
+    sut.clickMouseButtonLeftWithMods((10, 20), ["command", "shift"])
+
+    assert len(posted_batches) == 1
+    events = posted_batches[0]
+    assert [e.keycode for e in events if isinstance(e, KeyEvent)] == [
+        0x37,
+        0x38,
+        0x37,
+        0x38,
+    ]
+    clicks = [e for e in events if isinstance(e, MouseEvent) and e.clicks]
+    assert [(e.x, e.y) for e in clicks] == [(10, 20), (10, 20)]
+    assert all(e.flags == 0x120000 for e in clicks)
+
+
+def test_quartz_modifiers_released_after_batch(posted_batches):
+    sut = NativeUIElement()
+    sut.sendKeyWithModifiers("a", ["shift"])
+    sut.sendKey("a")
+
+    shifted, plain = posted_batches[0][1], posted_batches[1][0]
+    assert (shifted.keycode, shifted.flags) == (0x00, 0x20000)
+    assert (plain.keycode, plain.flags) == (0x00, 0)
+
+
+def test_quartz_types_unmapped_characters_as_unicode(posted_batches):
+    sut = NativeUIElement()
+    sut.sendKeys("hi!\n")
+
+    assert len(posted_batches) == 1
+    downs = [e for e in posted_batches[0] if e.down]
+    assert [(e.keycode, e.text) for e in downs] == [
+        (0x04, None),
+        (0x22, None),
+        (0, "!"),
+        (0x24, None),
+    ]
+
+
+def test_quartz_double_click_sets_click_state(posted_batches):
+    sut = NativeUIElement()
+    sut.doubleClickMouse((5, 5))
+
+    downs = [e for e in posted_batches[0] if e.type == 1]
+    assert [e.clicks for e in downs] == [1, 2]
+
+
+def test_quartz_drag_ends_at_destination(posted_batches):
+    sut = NativeUIElement()
+    sut.dragMouseButtonLeft((0, 0), (100, 50), interval=0)
+
+    events = posted_batches[0]
+    assert events[1].type == 1
+    assert events[-1].type == 2
+    assert (events[-1].x, events[-1].y) == (100, 50)
+
+
+def test_quartz_double_click_drag_sets_click_state(posted_batches):
+    sut = NativeUIElement()
+    sut.doubleClickDragMouseButtonLeft((0, 0), (100, 50), interval=0)
+
+    (events,) = posted_batches
+    buttons = [e for e in events if isinstance(e, MouseEvent) and e.type != 5]
+    assert [(e.type, e.clicks) for e in buttons[:3]] == [(1, 1), (2, 1), (1, 2)]
+    assert {(e.type, e.clicks) for e in buttons[3:]} == {(6, 2), (2, 2)}
+    assert (events[-1].type, events[-1].x, events[-1].y) == (2, 100, 50)
+
+
+def test_quartz_delay_posts_events_one_by_one():
+    batches = []
+    sut = _input_backend.QuartzBackend(poster=batches.append, delay=0.001)
+    sut.typewrite("ab")
+
+    assert [len(batch) for batch in batches] == [1, 1, 1, 1]
+
+
+def test_quartz_batch_dropped_on_error(posted_batches):
+    backend = _input_backend.get_input_backend()
+    with pytest.raises(RuntimeError):
+        with backend.batch():
+            backend.key_down("shift")
+            raise RuntimeError
+
+    backend.press("a")
+    assert len(posted_batches) == 1
+    assert posted_batches[0][0].flags == 0
+
+
+def test_quartz_unicode_chunks_keep_surrogate_pairs(posted_batches):
+    backend = _input_backend.get_input_backend()
+    backend.type_unicode("a" * 19 + "\U0001F600" + "b" * 25)
+
+    texts = [e.text for e in posted_batches[0] if e.down]
+    assert texts == ["a" * 19, "\U0001F600" + "b" * 18, "b" * 7]
+    assert all(_input_backend.utf16_length(text) <= 20 for text in texts)
+
+
+def test_enter_text_prefers_settable_value(monkeypatch, posted_batches):
+    sut = NativeUIElement()
+    values = {}
+    monkeypatch.setattr(sut, "_is_ax_attribute_settable", lambda name: True)
+    monkeypatch.setattr(sut, "_set_ax_attribute", values.__setitem__)
+    monkeypatch.setattr(sut, "_text_entered", lambda text, timeout: True)
+
+    assert sut.enter_text("x" * 5000) == "ax_value"
+    assert values == {"AXValue": "x" * 5000}
+    assert posted_batches == []
+
+
+def test_enter_text_falls_back_to_unicode_events(monkeypatch, posted_batches):
+    sut = NativeUIElement()
+    monkeypatch.setattr(sut, "_is_ax_attribute_settable", lambda name: False)
+    monkeypatch.setattr(sut, "_ensure_active", lambda: None)
+    monkeypatch.setattr(sut, "_text_entered", lambda text, timeout: True)
+
+    assert sut.enter_text("x" * 5000) == "unicode"
+    assert len(posted_batches) == 1
+    texts = [e.text for e in posted_batches[0] if e.text]
+    assert "".join(texts[::2]) == "x" * 5000
+
+
+def test_enter_text_unknown_strategy():
+    with pytest.raises(ValueError):
+        NativeUIElement().enter_text("x", strategy="telepathy")
@@ -0,0 +1,86 @@
+import pytest
+from atomacos import _locator
+from atomacos.backends.simulator import SimulatedElement
+
+
+pytestmark = pytest.mark.generated_app(size=1000)
+
+
+def rebuild(element):
+    """Replace a simulated element by a copy of its subtree"""
+
+    def copy(source):
+        return SimulatedElement(
+            source.role,
+            source.attributes,
+            [copy(child) for child in source.children],
+            source.actions,
+            source.settable,
+        )
+
+    parent = element.parent
+    index = parent.children.index(element)
+    element.remove()
+    return parent.add_child(copy(element), index)
+
+
+def deepest_button(simulator):
+    buttons = [
+        e
+        for e in simulator.apps[100].root.walk()
+        if e.role == "AXButton" and len(e.parent.children) > 1
+    ]
+    return max(buttons, key=lambda e: len(list(_ancestors(e))))
+
+
+def _ancestors(element):
+    while element.parent is not None:
+        element = element.parent
+        yield element
+
+
+def test_locator_finds_what_find_first_r_finds(app, simulator):
+    title = deepest_button(simulator).attributes["AXTitle"]
+    locator = app.locator(AXRole="AXButton", AXTitle=title)
+    assert locator.get() == app.findFirstR(AXRole="AXButton", AXTitle=title)
+    assert locator.resolved_by == _locator.SEARCH
+    assert locator.get() is locator.element
+    assert locator.resolved_by == _locator.CACHED
+    assert app.locator(AXTitle="missing").get() is None
+
+
+def test_stale_element_is_found_again_by_its_path(app, simulator):
+    button = deepest_button(simulator)
+    locator = app.locator(AXRole="AXButton", AXTitle=button.attributes["AXTitle"])
+    locator.get()
+    rebuild(button.parent)
+
+    simulator.calls.clear()
+    element = locator.get()
+    calls = simulator.calls.copy()
+    assert locator.resolved_by == _locator.PATH
+    assert element.ref is not button
+    assert element.AXTitle == button.attributes["AXTitle"]
+    # One batched read per level, the children of the root, the stale
+    # element and the two criteria
+    assert calls["copy_multiple_attribute_values"] == len(locator.path)
+    assert calls["copy_attribute_value"] == 4
+
+
+def test_moved_element_is_searched_from_the_nearest_valid_ancestor(app, simulator):
+    button = deepest_button(simulator)
+    locator = app.locator(AXRole="AXButton", AXTitle=button.attributes["AXTitle"])
+    locator.get()
+    group = button.parent
+    index = 0 if group.children.index(button) else len(group.children) - 1
+    group.children.remove(button)
+    group.add_child(button, index)
+    rebuild(group)
+
+    simulator.calls.clear()
+    element = locator.get()
+    assert locator.resolved_by == _locator.SEARCH
+    assert element.AXTitle == button.attributes["AXTitle"]
+    assert locator.path[-1] == index
+    # Only the subtree of the group was searched, not the whole application
+    assert simulator.calls["copy_attribute_value"] < 50
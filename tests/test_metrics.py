@@ -0,0 +1,107 @@
+import threading
+
+import atomacos
+import pytest
+from atomacos import errors, metrics
+from atomacos._macos import PAXUIElementCopyAttributeValue
+from atomacos.backends.simulator import generate_app
+
+
+@pytest.fixture
+def registry():
+    metrics.registry.reset()
+    yield metrics.registry
+    metrics.registry.reset()
+    metrics.set_enabled(True)
+
+
+def test_calls_and_errors_are_counted(simulator, registry):
+    app = simulator.add_app(generate_app(pid=100, size=10))
+    app_ref = atomacos.getAppRefByPid(100)
+    app_ref.AXTitle
+    app.failure = errors.kAXErrorCannotComplete
+    with pytest.raises(errors.AXErrorCannotComplete):
+        PAXUIElementCopyAttributeValue(app_ref.ref, "AXTitle")
+
+    assert metrics.ax_call_duration.count("AXUIElementCopyAttributeValue") == 2
+    assert (
+        metrics.ax_call_duration.count("AXUIElementCopyAttributeNames")
+        == simulator.calls["copy_attribute_names"]
+    )
+    assert metrics.ax_errors.value("AXErrorCannotComplete") == 1
+    snapshot = registry.snapshot()
+    (sample,) = snapshot["atomacos_ax_call_duration_seconds"][:1]
+    assert sample["value"]["buckets"]["+Inf"] == sample["value"]["count"]
+
+
+def test_cache_and_callbacks(registry):
+    metrics.count_cache("pid", False)
+    metrics.count_cache("pid", True)
+    metrics.count_cache("pid", True)
+    metrics.count_callback("AXCreated", True)
+    metrics.count_callback("AXCreated", False)
+    assert metrics.cache_hit_rate("pid") == pytest.approx(2 / 3.0)
+    assert metrics.cache_hit_rate("locator") is None
+    assert metrics.observer_callbacks.value("AXCreated") == 2
+    assert metrics.observer_callbacks_dropped.value("AXCreated") == 1
+
+
+def test_threads_are_added_up(registry):
+    threads = [
+        threading.Thread(target=metrics.count_cache, args=("pid", True))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    metrics.count_cache("pid", True)
+    assert metrics.cache_lookups.value("pid", "hit") == 5
+
+
+def test_shards_of_finished_threads_are_folded(registry):
+    for _ in range(20):
+        thread = threading.Thread(target=metrics.count_cache, args=("pid", True))
+        thread.start()
+        thread.join()
+    metrics.ax_call_duration.observe(0.001, "f")
+    threads = [
+        threading.Thread(target=metrics.ax_call_duration.observe, args=(1.0, "f"))
+        for _ in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(metrics.cache_lookups._shards) <= 1
+    assert len(metrics.ax_call_duration._shards) <= 1
+    assert metrics.cache_lookups.value("pid", "hit") == 20
+    assert metrics.ax_call_duration.count("f") == 4
+    registry.reset()
+    assert metrics.cache_lookups.value("pid", "hit") == 0
+
+
+def test_disabled(registry):
+    metrics.set_enabled(False)
+    metrics.count_cache("pid", True)
+    assert metrics.cache_lookups.value("pid", "hit") == 0
+
+
+def test_prometheus_text(registry):
+    metrics.ax_errors.inc('Odd "name"')
+    metrics.ax_call_duration.observe(0.003, "AXUIElementPerformAction")
+    text = registry.render_prometheus()
+    assert "# TYPE atomacos_ax_errors_total counter" in text
+    assert 'atomacos_ax_errors_total{error="Odd \\"name\\""} 1' in text
+    assert (
+        'atomacos_ax_call_duration_seconds_bucket{function="AXUIElementPerformAction"'
+        ',le="0.0025"} 0'
+    ) in text
+    assert (
+        'atomacos_ax_call_duration_seconds_bucket{function="AXUIElementPerformAction"'
+        ',le="0.005"} 1'
+    ) in text
+    assert (
+        'atomacos_ax_call_duration_seconds_count{function="AXUIElementPerformAction"}'
+        " 1"
+    ) in text
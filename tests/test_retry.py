@@ -0,0 +1,60 @@
+import logging
+
+import atomacos
+import pytest
+from atomacos import metrics
+from atomacos._macos import PAXUIElementCopyAttributeValue, PAXUIElementPerformAction
+
+
+pytestmark = pytest.mark.generated_app(size=10)
+
+
+@pytest.fixture(autouse=True)
+def no_retry_policy():
+    yield
+    atomacos.set_retry_policy(None)
+
+
+def fail_next(simulator, method, times):
+    """Make the next calls of a simulator method fail with CannotComplete"""
+    original = getattr(simulator, method)
+    left = [times]
+
+    def flaky(*args):
+        if left[0]:
+            left[0] -= 1
+            return (-25204, None) if method.startswith("copy") else -25204
+        return original(*args)
+
+    setattr(simulator, method, flaky)
+
+
+def test_transient_errors_of_reads_are_retried_and_logged(app, simulator, caplog):
+    caplog.set_level(logging.INFO, logger="atomacos.retry")
+    atomacos.set_retry_policy(attempts=3, backoff=0.001, max_backoff=0.002)
+    retries = metrics.ax_retries.value("AXUIElementCopyAttributeValue")
+    fail_next(simulator, "copy_attribute_value", 2)
+    assert PAXUIElementCopyAttributeValue(app.ref, "AXRole") == "AXApplication"
+    records = [r for r in caplog.records if r.name == "atomacos.retry"]
+    assert [r.retry["attempt"] for r in records] == [2, 3]
+    assert all(r.retry["delay"] <= 0.002 for r in records)
+    assert metrics.ax_retries.value("AXUIElementCopyAttributeValue") == retries + 2
+
+    fail_next(simulator, "copy_attribute_value", 3)
+    with pytest.raises(atomacos.ErrorCannotComplete):
+        PAXUIElementCopyAttributeValue(app.ref, "AXRole")
+
+
+def test_actions_are_not_retried(app, simulator):
+    atomacos.set_retry_policy(attempts=3, backoff=0.001)
+    fail_next(simulator, "perform_action", 1)
+    with pytest.raises(atomacos.ErrorCannotComplete):
+        PAXUIElementPerformAction(app.ref, "AXRaise")
+
+
+def test_no_retry_past_the_deadline(app, simulator):
+    policy = atomacos.set_retry_policy(attempts=10, backoff=0.05, deadline=0.01)
+    policy.jitter = 0
+    fail_next(simulator, "copy_attribute_value", 1)
+    with pytest.raises(atomacos.ErrorCannotComplete):
+        PAXUIElementCopyAttributeValue(app.ref, "AXRole")
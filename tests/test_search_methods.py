@@ -1,7 +1,8 @@
 import atomacos
+from atomacos.backends.simulator import SimulatedElement, generate_app
 
 
-def test_search_method_for_roles(monkeypatch):
+def test_search_method_for_roles(monkeypatch, simulator):
     sut = atomacos.NativeUIElement()
     monkeypatch.setattr(sut, "_findAll", lambda **kwargs: kwargs.items())
 
@@ -19,7 +20,7 @@ def test_search_method_for_roles(monkeypatch):
     assert ("AXRole", "AXSlider") in sut.sliders()
 
 
-def test_search_method_for_roles_recursive(monkeypatch):
+def test_search_method_for_roles_recursive(monkeypatch, simulator):
     sut = atomacos.NativeUIElement()
     monkeypatch.setattr(sut, "_findAll", lambda **kwargs: kwargs.items())
 
@@ -37,7 +38,7 @@ def test_search_method_for_roles_recursive(monkeypatch):
     assert ("AXRole", "AXSlider") in sut.slidersR()
 
 
-def test_search_extra_attributes(monkeypatch):
+def test_search_extra_attributes(monkeypatch, simulator):
     sut = atomacos.NativeUIElement()
     monkeypatch.setattr(sut, "_findAll", lambda **kwargs: kwargs.items())
 
@@ -54,7 +55,7 @@ def test_search_extra_attributes(monkeypatch):
     assert ("AXValue", 1) in sut.sliders(1)
 
 
-def test_search_extra_attributes_recursive(monkeypatch):
+def test_search_extra_attributes_recursive(monkeypatch, simulator):
     sut = atomacos.NativeUIElement()
     monkeypatch.setattr(sut, "_findAll", lambda **kwargs: kwargs.items())
 
@@ -69,3 +70,49 @@ def test_search_extra_attributes_recursive(monkeypatch):
     assert ("AXTitle", 1) in sut.popUpButtonsR(1)
     assert ("AXTitle", 1) in sut.rowsR(1)
     assert ("AXValue", 1) in sut.slidersR(1)
+
+
+def test_windows_use_the_windows_attribute_of_the_application(simulator):
+    simulator.add_app(generate_app(pid=100, size=200, windows=3))
+    app = atomacos.getAppRefByPid(100)
+    app.ref.add_child(SimulatedElement("AXMenuBar"))
+
+    simulator.calls.clear()
+    windows = app.windows()
+    assert simulator.calls["copy_attribute_value"] < 10
+    assert windows == app.findAll(AXRole="AXWindow")
+    assert len(windows) == 3
+
+    simulator.calls.clear()
+    found = app.windowsR("Window 1")
+    assert simulator.calls["copy_attribute_value"] < 10
+    assert found == app.windows("Window 1") and len(found) == 1
+    assert app.windowsR("Window 1") == app.findAllR(
+        AXRole="AXWindow", AXTitle="Window 1"
+    )
+
+
+def test_convenience_methods_crawl_without_relationship(simulator):
+    simulator.add_app(generate_app(pid=100, size=200))
+    window = atomacos.getAppRefByPid(100).windows()[0]
+    assert "AXRows" not in window.ax_attributes
+    assert window.rowsR() == window.findAllR(AXRole="AXRow")
+    assert window.groups() == window.findAll(AXRole="AXGroup")
+
+
+def test_rows_and_radio_buttons_are_children_only(simulator):
+    simulator.add_app(generate_app(pid=100, size=200))
+    app = atomacos.getAppRefByPid(100)
+    nested_row = SimulatedElement("AXRow", {"AXTitle": "Nested"})
+    tab = SimulatedElement("AXRadioButton", {"AXTitle": "Tab"})
+    child_row = SimulatedElement("AXRow", {"AXTitle": "Child"})
+    radio = SimulatedElement("AXRadioButton", {"AXTitle": "Radio"})
+    table = SimulatedElement(
+        "AXTable",
+        {"AXRows": [child_row, nested_row], "AXTabs": [tab]},
+        [child_row, radio, SimulatedElement("AXGroup", children=[nested_row, tab])],
+    )
+    app.ref.children[0].add_child(table)
+    element = app.findFirstR(AXRole="AXTable")
+    assert [row.AXTitle for row in element.rows()] == ["Child"]
+    assert [button.AXTitle for button in element.radioButtons()] == ["Radio"]
@@ -0,0 +1,164 @@
+import threading
+
+import atomacos
+import pytest
+from atomacos import errors
+from atomacos._macos import PAXUIElementCopyAttributeValue
+from atomacos.backends.simulator import (
+    Point,
+    SimulatedApp,
+    SimulatedElement,
+    Size,
+    generate_app,
+)
+
+
+@pytest.fixture
+def editor(simulator):
+    field = SimulatedElement(
+        "AXTextField",
+        {
+            "AXTitle": "Name",
+            "AXValue": "",
+            "AXFocused": False,
+            "AXPosition": Point(10.0, 10.0),
+            "AXSize": Size(200.0, 20.0),
+        },
+        settable=("AXValue", "AXFocused"),
+    )
+    pressed = []
+    button = SimulatedElement(
+        "AXButton",
+        {"AXTitle": "OK", "AXPosition": Point(10.0, 40.0), "AXSize": Size(80, 20)},
+        actions={"AXPress": pressed.append},
+    )
+    window = SimulatedElement(
+        "AXWindow",
+        {"AXTitle": "Untitled", "AXPosition": Point(0, 0), "AXSize": Size(400, 300)},
+        children=[field, button],
+    )
+    new_item = SimulatedElement("AXMenuItem", {"AXTitle": "New"})
+    menu = SimulatedElement("AXMenu", children=[new_item])
+    file_item = SimulatedElement("AXMenuBarItem", {"AXTitle": "File"}, [menu])
+    menu_bar = SimulatedElement("AXMenuBar", children=[file_item])
+    app = SimulatedApp(42, "com.example.editor", "Editor", [window, menu_bar])
+    app.root.attributes["AXMenuBar"] = menu_bar
+    app.pressed = pressed
+    simulator.add_app(app)
+    return app
+
+
+def test_app_lookup(editor):
+    assert atomacos.getAppRefByBundleId("com.example.editor").AXTitle == "Editor"
+    assert atomacos.getAppRefByLocalizedName("Edit*").pid == 42
+    assert atomacos.getFrontmostApp() == atomacos.getAppRefByPid(42)
+
+
+def test_attributes_are_converted(editor):
+    field = atomacos.getAppRefByPid(42).findFirstR(AXRole="AXTextField")
+    assert field.AXPosition == (10.0, 10.0)
+    assert field.AXSize.width == 200.0
+    assert field.AXParent.AXTitle == "Untitled"
+    assert "AXValue" in field.ax_attributes
+
+
+def test_search(simulator):
+    simulator.add_app(generate_app(pid=100, size=500, seed=3))
+    app_ref = atomacos.getAppRefByPid(100)
+    buttons = app_ref.findAllR(AXRole="AXButton")
+    expected = [
+        element
+        for element in simulator.apps[100].root.walk()
+        if element.role == "AXButton"
+    ]
+    assert len(buttons) == len(expected) > 0
+    assert len(app_ref.windows()) == 1
+
+
+def test_set_attribute_and_errors(editor):
+    field = atomacos.getAppRefByPid(42).findFirstR(AXRole="AXTextField")
+    field.AXValue = "hello"
+    assert editor.root.children[0].children[0].attributes["AXValue"] == "hello"
+    assert field.AXValue == "hello"
+    with pytest.raises(errors.AXErrorUnsupported):
+        field.AXTitle = "other"
+    with pytest.raises(AttributeError):
+        field.AXDescription
+
+
+def test_invalid_element_after_remove(editor):
+    button = atomacos.getAppRefByPid(42).findFirstR(AXRole="AXButton")
+    simulated = editor.root.children[0].children[1]
+    simulated.remove()
+    with pytest.raises(errors.AXErrorInvalidUIElement):
+        PAXUIElementCopyAttributeValue(button.ref, "AXTitle")
+
+
+def test_press_and_batch(editor):
+    app_ref = atomacos.getAppRefByPid(42)
+    button = app_ref.findFirstR(AXRole="AXButton")
+    field = app_ref.findFirstR(AXRole="AXTextField")
+    with app_ref.batch() as batch:
+        batch.press(button)
+        batch.set(field, "AXValue", "x")
+    assert batch.errors == []
+    assert len(editor.pressed) == 1
+    assert field.AXValue == "x"
+
+
+def test_enter_text_sets_value(editor):
+    field = atomacos.getAppRefByPid(42).findFirstR(AXRole="AXTextField")
+    assert field.enter_text("typed", strategy="ax_value") == "ax_value"
+    assert field.AXValue == "typed"
+
+
+def test_menu_item(editor, simulator):
+    app_ref = atomacos.getAppRefByPid(42)
+    assert app_ref.menuItem("File", "New").AXTitle == "New"
+    assert simulator.frontmost_pid == 42
+
+
+def test_wait_for_notification(editor, simulator):
+    app_ref = atomacos.getAppRefByPid(42)
+    window = editor.root.children[0]
+    dialog = SimulatedElement("AXSheet", {"AXTitle": "Save"})
+    threading.Timer(0.05, window.add_child, (dialog,)).start()
+    created = app_ref.waitForCreation(timeout=2)
+    assert created.AXTitle == "Save"
+
+
+def test_wait_for_times_out(editor):
+    app_ref = atomacos.getAppRefByPid(42)
+    assert app_ref.waitForCreation(timeout=0.05) is None
+
+
+def test_element_at_position(editor):
+    app_ref = atomacos.getAppRefByPid(42)
+    assert app_ref.get_element_at_position(20, 45).AXTitle == "OK"
+
+
+def test_launch_and_terminate(editor, simulator):
+    simulator.remove_app(42)
+    with pytest.raises(ValueError):
+        atomacos.getAppRefByBundleId("com.example.editor")
+    atomacos.launchAppByBundleId("com.example.editor")
+    assert atomacos.getAppRefByBundleId("com.example.editor").pid == 42
+    assert atomacos.terminateAppByBundleId("com.example.editor")
+    assert 42 not in simulator.apps
+
+
+def test_latency_and_failures(editor, simulator):
+    app_ref = atomacos.getAppRefByPid(42)
+    editor.failure = errors.kAXErrorCannotComplete
+    with pytest.raises(errors.AXErrorCannotComplete):
+        PAXUIElementCopyAttributeValue(app_ref.ref, "AXTitle")
+    editor.failure = None
+    assert app_ref.AXTitle == "Editor"
+    assert simulator.calls["copy_attribute_value"] >= 2
+
+
+def test_generate_app_is_deterministic():
+    first = [e.attributes for e in generate_app(size=200, seed=1).root.walk()]
+    second = [e.attributes for e in generate_app(size=200, seed=1).root.walk()]
+    assert first == second
+    assert 195 <= len(first) - 1 <= 200
@@ -0,0 +1,69 @@
+import logging
+
+import atomacos
+import pytest
+
+
+pytestmark = pytest.mark.generated_app(size=50)
+
+
+@pytest.fixture(autouse=True)
+def no_threshold():
+    yield
+    atomacos.set_slow_search_threshold(None)
+
+
+def slow_records(caplog):
+    return [r for r in caplog.records if r.name == "atomacos.slow_search"]
+
+
+def test_slow_search_is_logged_with_stats(app, caplog):
+    caplog.set_level(logging.WARNING)
+    assert atomacos.set_slow_search_threshold(0) is None
+    app.findAllR(AXRole="AXButton")
+    (record,) = slow_records(caplog)
+    search = record.search
+    assert search["call"] == "findAllR"
+    assert search["criteria"] == {"AXRole": "AXButton"}
+    assert search["root"] is app
+    assert search["nodes_visited"] == 50
+    assert search["attributes_fetched"] >= 50
+    assert search["max_depth"] > 1
+    assert search["wall_time"] >= 0
+    assert "findAllR" in record.getMessage()
+
+
+def test_logging_asks_the_application_nothing(app, simulator, caplog):
+    caplog.set_level(logging.WARNING)
+    app.findAllR(AXRole="AXButton")
+    simulator.calls.clear()
+    app.findAllR(AXRole="AXButton")
+    unwatched = simulator.calls.copy()
+    simulator.calls.clear()
+    atomacos.set_slow_search_threshold(0)
+    app.findAllR(AXRole="AXButton")
+    # Only the pid, which the reference holds
+    assert simulator.calls - unwatched == {"get_pid": 1}
+    assert unwatched - simulator.calls == {}
+    (record,) = slow_records(caplog)
+    assert record.search["pid"] == 100
+    assert "pid=100" in record.getMessage()
+
+
+def test_nested_searches_are_logged_once(app, caplog):
+    caplog.set_level(logging.WARNING)
+    atomacos.set_slow_search_threshold(0)
+    window = app.findFirst(AXRole="AXWindow")
+    del caplog.records[:]
+    app._menuItem(window, 0, "missing")
+    (record,) = slow_records(caplog)
+    assert record.search["call"] == "menuItem"
+
+
+def test_fast_or_unwatched_searches_are_not_logged(app, caplog):
+    caplog.set_level(logging.WARNING)
+    atomacos.set_slow_search_threshold(60)
+    app.findAllR(AXRole="AXButton")
+    atomacos.set_slow_search_threshold(None)
+    app.findAllR(AXRole="AXButton")
+    assert slow_records(caplog) == []
@@ -0,0 +1,95 @@
+import pytest
+from atomacos.backends.simulator import Point, SimulatedElement
+
+
+pytestmark = pytest.mark.generated_app(size=500)
+
+
+@pytest.fixture
+def snapshot(app):
+    with app.snapshot() as snapshot:
+        yield snapshot
+
+
+def identifiers(element):
+    return [getattr(e, "AXIdentifier", None) for e in element.findAllR()]
+
+
+def test_snapshot_matches_the_tree(app, snapshot):
+    assert len(snapshot) == 501
+    assert identifiers(snapshot) == [None] + identifiers(app)
+    assert snapshot.roots[0].AXRole == "AXApplication"
+    assert snapshot.refresh() == {}
+
+
+def test_refresh_applies_changes_with_few_calls(app, simulator, snapshot):
+    tree = simulator.apps[100].root
+    window = tree.children[0]
+    group = window.children[0]
+    leaves = [e for c in window.children[1:] for e in c.walk()]
+    button = next(e for e in leaves if "AXValue" in e.attributes)
+    simulator.calls.clear()
+
+    removed = len(list(group.walk()))
+    group.remove()
+    sheet = SimulatedElement("AXSheet", {"AXIdentifier": "sheet"})
+    sheet.add_child(SimulatedElement("AXButton", {"AXIdentifier": "ok"}))
+    window.add_child(sheet)
+    for value in ("a", "ab", "abc"):
+        button.attributes["AXValue"] = value
+        simulator.emit(button, "AXValueChanged")
+    button.attributes["AXPosition"] = Point(5.0, 6.0)
+    simulator.emit(button, "AXMoved")
+
+    counts = snapshot.refresh()
+    assert sum(simulator.calls.values()) < 20
+    assert counts == {"removed": removed, "added": 2, "updated": 2}
+    assert identifiers(snapshot) == [None] + identifiers(app)
+    node = snapshot.findFirstR(AXIdentifier=button.attributes["AXIdentifier"])
+    assert node.AXValue == "abc" and node.AXPosition == [5.0, 6.0]
+    assert snapshot.findFirstR(AXIdentifier="ok").depth == 3
+
+
+def test_refresh_moves_the_descendants_of_a_moved_window(simulator, snapshot):
+    window = simulator.apps[100].root.children[0]
+    elements = list(window.walk())
+    for element in elements:
+        x, y = element.attributes["AXPosition"]
+        element.attributes["AXPosition"] = Point(x + 100.0, y + 50.0)
+    simulator.calls.clear()
+    simulator.emit(window, "AXMoved")
+
+    counts = snapshot.refresh()
+    assert counts == {"updated": len(elements)}
+    # One batched read per descendant, besides the window itself
+    assert simulator.calls["copy_multiple_attribute_values"] == len(elements)
+    positions = [list(e.attributes["AXPosition"]) for e in elements]
+    assert [n.AXPosition for n in snapshot.roots[0].children[0].findAllR()] == (
+        positions[1:]
+    )
+
+
+def test_refresh_moves_known_elements_to_their_new_parent(app, simulator, snapshot):
+    window = simulator.apps[100].root.children[0]
+    source, target = window.children[0], window.children[1]
+    moved = source.children[0]
+    source.children.remove(moved)
+    target.children.append(moved)
+    moved.parent = target
+    target.add_child(SimulatedElement("AXButton", {"AXIdentifier": "new"}))
+    simulator.calls.clear()
+
+    counts = snapshot.refresh()
+    assert counts == {"added": 1, "updated": 1}
+    assert simulator.calls["copy_multiple_attribute_values"] == 2
+    assert len(snapshot) == 502
+    node = snapshot.findFirstR(AXIdentifier=moved.attributes["AXIdentifier"])
+    assert node.parent.AXIdentifier == target.attributes["AXIdentifier"]
+    assert node.depth == 3 and snapshot.node(node.ref) is node
+    assert identifiers(snapshot) == [None] + identifiers(app)
+
+
+def test_close_stops_notifications(app, simulator, snapshot):
+    snapshot.close()
+    simulator.apps[100].root.children[0].add_child(SimulatedElement("AXSheet"))
+    assert snapshot.refresh() == {}
@@ -0,0 +1,60 @@
+import io
+
+import atomacos
+import pytest
+
+
+pytestmark = pytest.mark.generated_app(size=300)
+
+
+@pytest.fixture
+def snapshot(app, tmpdir):
+    path = str(tmpdir.join("app.axsnap"))
+    assert atomacos.save_snapshot(app, path) == 301
+    with atomacos.open_snapshot(path) as snapshot:
+        yield snapshot
+
+
+def test_snapshot_search_matches_live_search(app, snapshot):
+    assert len(snapshot) == 301
+    for criteria in (
+        {"AXRole": "AXButton"},
+        {"AXRole": "AX*Button", "AXEnabled": True},
+        {"AXTitle": "Group 1*"},
+        {"AXValue": "value 2?"},
+    ):
+        found = snapshot.findAllR(**criteria)
+        live = app.findAllR(**criteria)
+        assert found
+        assert [e.AXIdentifier for e in found] == [e.AXIdentifier for e in live]
+    assert snapshot.findAllR(AXRole="AXNothing") == []
+
+
+def test_snapshot_elements(app, snapshot):
+    (root,) = snapshot.AXChildren
+    assert root.AXRole == "AXApplication" and root.pid == 100
+    window = root.findFirst(AXRole="AXWindow")
+    assert window.AXParent == root
+    assert window.AXPosition == [0.0, 0.0] and window.AXSize == [1024.0, 768.0]
+    button = window.findFirstR(AXRole="AXButton")
+    live = app.findFirstR(AXRole="AXButton")
+    assert button.AXTitle == live.AXTitle
+    assert button.AXFocused is False
+    assert [c.AXIdentifier for c in window.AXChildren] == [
+        c.AXIdentifier for c in app.AXChildren[0].AXChildren
+    ]
+    assert not hasattr(root, "AXPosition")
+    assert window.buttons() == window.findAll(AXRole="AXButton")
+
+
+def test_snapshot_from_dump(app, tmpdir):
+    stream = io.StringIO()
+    app.dump(stream)
+    path = str(tmpdir.join("dump.axsnap"))
+    stream.seek(0)
+    assert atomacos.save_snapshot(stream, path) == 301
+    with atomacos.open_snapshot(path) as snapshot:
+        assert len(snapshot.findAllR(AXRole="AXButton")) == len(
+            app.findAllR(AXRole="AXButton")
+        )
+    assert tmpdir.join("dump.axsnap").size() < len(stream.getvalue())
@@ -0,0 +1,59 @@
+import io
+import math
+import random
+
+import atomacos
+import pytest
+from atomacos import _spatial
+
+
+pytestmark = pytest.mark.generated_app(size=2000, windows=3)
+
+
+@pytest.fixture
+def tree(app):
+    stream = io.StringIO()
+    app.dump(stream)
+    stream.seek(0)
+    return atomacos.load_dump(stream)
+
+
+def frame(element):
+    (x, y), (width, height) = element.AXPosition, element.AXSize
+    return x, y, width, height
+
+
+def points(count=200):
+    rng = random.Random(3)
+    return [(rng.uniform(-50, 2000), rng.uniform(-50, 1200)) for _ in range(count)]
+
+
+def test_elements_at_and_in_rect_match_a_linear_scan(tree):
+    index = atomacos.spatial_index(tree, cell=64)
+    elements = [e for e in tree.findAllR() if "AXPosition" in e.attributes]
+    assert len(index) == len(elements)
+    for x, y in points():
+        expected = [e for e in elements if _spatial._contains(frame(e), x, y)]
+        assert index.elements_at((x, y)) == expected[::-1]
+    rect = (100, 100, 400, 300)
+    assert index.elements_in_rect(rect, AXRole="AXButton") == [
+        e
+        for e in elements
+        if e.AXRole == "AXButton"
+        and rect[0] <= e.AXPosition[0]
+        and e.AXPosition[0] + e.AXSize[0] <= rect[0] + rect[2]
+        and rect[1] <= e.AXPosition[1]
+        and e.AXPosition[1] + e.AXSize[1] <= rect[1] + rect[3]
+    ]
+    overlapping = index.elements_in_rect(rect, partial=True)
+    assert len(overlapping) > len(index.elements_in_rect(rect))
+
+
+def test_nearest_matches_a_linear_scan(tree):
+    index = atomacos.spatial_index(tree, cell=64)
+    buttons = tree.findAllR(AXRole="AXButton")
+    for x, y in points(50) + [(10000, -10000)]:
+        nearest = index.nearest((x, y), role="AXButton")
+        best = min(_spatial._distance(frame(e), x, y) for e in buttons)
+        assert math.isclose(_spatial._distance(frame(nearest), x, y), best)
+    assert index.nearest((0, 0), role="AXNoSuchRole") is None
@@ -0,0 +1,59 @@
+import io
+
+import atomacos
+import pytest
+from atomacos import _text_index
+
+
+pytestmark = pytest.mark.generated_app(size=1000)
+
+
+@pytest.fixture
+def tree(app):
+    stream = io.StringIO()
+    app.dump(stream)
+    stream.seek(0)
+    return atomacos.load_dump(stream)
+
+
+def titles(matches):
+    return [match.text for match in matches]
+
+
+def a_button_title(tree):
+    return min(
+        (e.AXTitle for e in tree.findAllR(AXRole="AXButton")),
+        key=lambda title: (len(title), title),
+    )
+
+
+def test_search_finds_substrings_in_any_case(tree):
+    index = atomacos.text_index(tree)
+    title = a_button_title(tree)
+    matches = index.search(title.lower())
+    expected = [e.AXTitle for e in tree.findAllR() if title in e.AXTitle]
+    assert sorted(titles(matches)) == sorted(expected)
+    best = matches[0]
+    assert best.score == 1.0 and best.text == title and best.distance == 0
+    assert index.search(title.lower(), case_sensitive=True) == []
+    assert index.search(title, case_sensitive=True, limit=3) == matches[:3]
+
+
+def test_fuzzy_search_ranks_closer_texts_first(tree):
+    index = atomacos.text_index(tree)
+    title = a_button_title(tree)
+    typo = title.replace("Button", "Buton")
+    assert index.search(typo) == []
+    matches = index.search(typo, distance=1)
+    assert title in titles(matches)
+    assert all(match.distance == 1 for match in matches)
+    assert titles(index.search(title, distance=1))[0] == title
+
+
+def test_substring_distance():
+    distance = _text_index._substring_distance
+    assert distance("save", "Save As...".casefold(), 2) == 0
+    assert distance("sve", "save as", 2) == 1
+    assert distance("sav as", "save as", 2) == 1
+    assert distance("xyz", "save", 5) == 3
+    assert distance("xyz", "save", 1) == 2
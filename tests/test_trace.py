@@ -0,0 +1,95 @@
+import io
+import json
+
+import atomacos
+import pytest
+from atomacos import _trace, backends
+
+
+pytestmark = pytest.mark.generated_app(size=50)
+
+
+def test_trace_records_calls_with_cause(app, simulator):
+    with atomacos.trace() as t:
+        buttons = app.findAllR(AXRole="AXButton")
+    assert buttons
+    reads = [c for c in t.calls if c.name == "AXUIElementCopyAttributeValue"]
+    assert {"AXChildren", "AXRole"} <= {c.detail for c in reads}
+    assert all(c.api == "findAllR" for c in t.calls)
+    assert {c.role for c in t.calls} >= {"AXApplication", "AXWindow"}
+    api = [e for e in t.events if e.category == "api"]
+    assert [e.name for e in api] == ["findAllR"]
+
+
+def test_trace_records_errors_and_nesting(app, simulator):
+    @_trace.api_call
+    def _press_ok():
+        return app.findFirstR(AXRole="AXButton")
+
+    simulator.apps[100].failure = -25204
+    with atomacos.trace(roles=False) as t:
+        _press_ok()
+    assert t.calls and all(c.error == -25204 for c in t.calls)
+    assert all(c.role is None for c in t.calls)
+    assert all(c.api == "findFirstR" for c in t.calls)
+    assert [(e.name, e.api) for e in t.events if e.category == "api"] == [
+        ("findFirstR", "press_ok"),
+        ("press_ok", None),
+    ]
+
+
+def test_trace_removed_after_block(app, simulator):
+    with atomacos.trace():
+        with pytest.raises(RuntimeError):
+            with atomacos.trace():
+                pass
+    assert backends.get_backend() is simulator
+    assert _trace._tracer is None
+
+
+def test_trace_keeps_backend_set_inside_block(app, simulator):
+    t = atomacos.trace()
+    t.__enter__()
+    inner = backends.BackendProxy(backends.get_backend())
+    previous = backends.set_backend(inner)
+    t.__exit__(None, None, None)
+    assert backends.get_backend() is inner
+    app.findAllR(AXRole="AXButton")
+    backends.set_backend(previous)
+    app.findAllR(AXRole="AXButton")
+    assert len(t.calls) == 0
+
+
+def test_trace_roles_come_from_traced_reads(app, simulator):
+    app.findAllR(AXRole="AXButton")
+    untraced = sum(simulator.calls.values())
+    simulator.calls.clear()
+    with atomacos.trace() as t:
+        app.findAllR(AXRole="AXButton")
+        assert sum(simulator.calls.values()) == untraced
+    reads = [c for c in t.calls if c.name == "AXUIElementCopyAttributeValue"]
+    # Only the role of the application, which the search never reads
+    assert simulator.calls["copy_attribute_value"] == len(reads) + 1
+    assert all(c.role is not None for c in t.calls)
+    assert {c.role for c in t.calls} >= {"AXApplication", "AXWindow", "AXButton"}
+
+
+def test_trace_remembers_a_bounded_number_of_roles(app, monkeypatch):
+    monkeypatch.setattr(_trace, "ROLE_CACHE_SIZE", 10)
+    with atomacos.trace() as t:
+        app.findAllR(AXRole="AXButton")
+    assert len(t._roles) == 10
+
+
+def test_chrome_export_and_summary(app):
+    with atomacos.trace() as t:
+        app.findAllR(AXRole="AXButton")
+    stream = io.StringIO()
+    t.to_chrome(stream)
+    events = json.loads(stream.getvalue())["traceEvents"]
+    assert len(events) == len(t.events)
+    assert {e["ph"] for e in events} == {"X"}
+    assert events[-1]["name"] == "findAllR"
+    summary = t.summary(top=3).splitlines()
+    assert summary[0].startswith("%d calls" % len(t.calls))
+    assert len(summary) == 5
@@ -1,6 +1,10 @@
 # -*- coding: utf-8 -*-
+import threading
+
+import atomacos
 import pytest
-from atomacos import _a11y, errors
+from atomacos import _a11y, _activation, errors
+from atomacos.backends.simulator import generate_app
 
 
 class TestErrors:
@@ -92,3 +96,68 @@ class TestToPythonConversion:
         result = axconverter.convert_value(num)
         assert result == 1.5
         assert isinstance(result, float)
+
+
+class FakeElement:
+    def __init__(self, pid):
+        self.pid = pid
+        self.activations = 0
+
+    def _activate(self):
+        self.activations += 1
+
+
+class TestActivationTracker:
+    @pytest.fixture
+    def tracker(self, simulator):
+        simulator.add_app(generate_app(pid=42, size=1))
+        tracker = _activation.ActivationTracker()
+        tracker.frontmost_pid()
+        return tracker
+
+    def test_skips_frontmost_app(self, tracker):
+        element = FakeElement(42)
+        tracker.ensure_active(element)
+        assert element.activations == 0
+
+    def test_activates_background_app(self, tracker):
+        element = FakeElement(7)
+        tracker.ensure_active(element)
+        assert element.activations == 1
+
+    def test_activates_after_reset(self, tracker):
+        element = FakeElement(42)
+        tracker.reset()
+        tracker.ensure_active(element)
+        assert element.activations == 1
+
+    def test_follows_activations(self, tracker, simulator):
+        simulator.add_app(generate_app(pid=7, size=1))
+        tracker.frontmost_pid()
+        simulator.activate(7)
+        element = FakeElement(7)
+        tracker.ensure_active(element)
+        assert element.activations == 0
+
+    def test_observes_once_across_proxies(self, tracker, simulator):
+        for _ in range(5):
+            with atomacos.trace():
+                tracker.frontmost_pid()
+            tracker.frontmost_pid()
+        assert len(simulator._activation_callbacks) == 1
+
+    def test_asks_the_backend_off_the_main_thread(self, tracker, simulator):
+        simulator.add_app(generate_app(pid=7, size=1))
+        # The notification of the change only reaches the main run loop
+        simulator.frontmost_pid = 7
+        pids = []
+        thread = threading.Thread(target=lambda: pids.append(tracker.frontmost_pid()))
+        thread.start()
+        thread.join()
+        assert pids == [7]
+
+    def test_disabled(self, tracker):
+        element = FakeElement(7)
+        tracker.auto_activate = False
+        tracker.ensure_active(element)
+        assert element.activations == 0
@@ -0,0 +1,83 @@
+import io
+
+import atomacos
+import pytest
+from atomacos.backends.simulator import Point, SimulatedElement, Size
+
+
+pytestmark = pytest.mark.generated_app(size=200)
+
+
+def add_list(simulator, rows=50):
+    """Add a 100x100 scroll area holding rows of 20 pixels to the first
+    window, of which the first five show"""
+    window = next(e for e in simulator.apps[100].root.walk() if e.role == "AXWindow")
+    x, y = window.attributes["AXPosition"]
+    area = SimulatedElement(
+        "AXScrollArea",
+        {"AXPosition": Point(x, y), "AXSize": Size(100.0, 100.0)},
+        [
+            SimulatedElement(
+                "AXRow",
+                {
+                    "AXTitle": "Row %d" % index,
+                    "AXPosition": Point(x, y + index * 20.0),
+                    "AXSize": Size(100.0, 20.0),
+                },
+            )
+            for index in range(rows)
+        ],
+    )
+    window.add_child(area, 0)
+    return area
+
+
+def test_visible_only_prunes_elements_off_screen(app, simulator):
+    group = next(e for e in simulator.apps[100].root.walk() if e.role == "AXGroup")
+    group.attributes["AXPosition"] = Point(5000.0, 0.0)
+    hidden = {id(e) for e in group.walk()}
+    everything = app.findAllR()
+    visible = app.findAllR(visible_only=True)
+    assert len(visible) == len(everything) - len(hidden)
+    assert not any(id(e.ref) in hidden for e in visible)
+
+
+def test_visible_only_clips_rows_to_their_scroll_area(app, simulator):
+    add_list(simulator)
+    rows = app.findAllR(AXRole="AXRow", visible_only=True)
+    assert [row.AXTitle for row in rows] == ["Row %d" % i for i in range(5)]
+    assert len(app.findAllR(AXRole="AXRow")) == 50
+
+
+def test_dump_visible_only(app, simulator):
+    add_list(simulator)
+    stream = io.StringIO()
+    app.dump(stream, visible_only=True)
+    stream.seek(0)
+    tree = atomacos.load_dump(stream)
+    assert len(tree.findAllR(AXRole="AXRow")) == 5
+    assert len(tree) == len(app.findAllR(visible_only=True)) + 1
+
+
+@pytest.mark.parametrize("kind", ["dump", "snapshot", "snapshot_file"])
+def test_visible_only_on_stored_frames(app, simulator, tmp_path, kind):
+    add_list(simulator)
+    if kind == "dump":
+        stream = io.StringIO()
+        app.dump(stream)
+        stream.seek(0)
+        tree = atomacos.load_dump(stream)
+    elif kind == "snapshot":
+        tree = app.snapshot()
+        tree.close()
+    else:
+        path = str(tmp_path / "app.axsnap")
+        atomacos.save_snapshot(app, path)
+        tree = atomacos.open_snapshot(path)
+    simulator.calls.clear()
+    rows = tree.findAllR(AXRole="AXRow", visible_only=True)
+    assert [row.AXTitle for row in rows] == ["Row %d" % i for i in range(5)]
+    area = tree.findFirstR(AXRole="AXScrollArea")
+    assert len(area.findAll(visible_only=True)) == 5
+    assert len(tree.findAllR(AXRole="AXRow")) == 50
+    assert sum(simulator.calls.values()) == 0